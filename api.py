@@ -0,0 +1,147 @@
+"""HTTP API for generating documents from the CRM and the Cashfree webhook.
+
+POST /render with a JSON body of form fields (see engine.py) returns the
+document bytes; add "format": "pdf" for a PDF. Validation errors come back as
+422 with {"error": ...}, a full render queue as 503 with Retry-After.
+GET /health returns the render service metrics and GET /metrics the
+Prometheus metrics (see metrics.py). GET /export?from=YYYY-MM-DD&to=YYYY-MM-DD
+[&kind=partial&kind=full] streams a ZIP of the documents issued in that range
+(see export.py).
+
+Set ORBIT_API_TOKEN to require "Authorization: Bearer <token>" on every
+endpoint, /health and /metrics included (give the Prometheus scrape job the
+token as its bearer credentials).
+
+Usage:
+    python api.py [--host 0.0.0.0] [--port 8600] [--workers 1]
+"""
+import argparse
+import asyncio
+import hmac
+import os
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+import engine
+import metrics
+from render_service import RenderServiceBusy, RenderTimeout, get_render_service
+
+API_TOKEN = os.environ.get("ORBIT_API_TOKEN", "")
+
+
+def _error(status, message, **headers):
+    return JSONResponse({"error": message}, status_code=status, headers=headers)
+
+
+def _authorised(request):
+    if not API_TOKEN:
+        return True
+    supplied = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+    return hmac.compare_digest(supplied, API_TOKEN)
+
+
+async def render(request):
+    if not _authorised(request):
+        return _error(401, "Missing or invalid API token.")
+    try:
+        fields = await request.json()
+    except ValueError:
+        return _error(400, "Request body must be a JSON object.")
+    if not isinstance(fields, dict):
+        return _error(400, "Request body must be a JSON object.")
+
+    output_format = str(fields.pop("format", "DOCX")).upper()
+    if output_format not in engine.OUTPUT_FORMATS:
+        return _error(422, f"Unknown format {output_format!r}.")
+    record = fields.pop("record", True) is not False
+    try:
+        # Validation, template lookups and cache/storage reads block; keep them off the event loop
+        kind, _, context = await run_in_threadpool(engine.build_context, fields)
+        job = await run_in_threadpool(engine.submit, kind, context, output_format)
+    except ValueError as e:
+        return _error(422, str(e))
+    except RenderServiceBusy as e:
+        return _error(503, str(e), **{"Retry-After": "1"})
+    try:
+        # Wait on the worker without tying up a thread or the event loop
+        data = await asyncio.wait_for(asyncio.wrap_future(job.future), job.remaining())
+    except (asyncio.TimeoutError, RenderTimeout):
+        return _error(504, str(job.expire()))
+
+    role = engine.form_role(fields)
+    if record:
+        # Writes to the SQLite ledger
+        await run_in_threadpool(engine.record, kind, context, output_format, role)
+    metrics.count_document(kind, output_format, role)
+    filename, mime = engine.output_file(kind, context, output_format)
+    return Response(data, media_type=mime, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+async def export(request):
+    from datetime import date
+
+    from export import FOLDERS, export_range
+
+    if not _authorised(request):
+        return _error(401, "Missing or invalid API token.")
+    try:
+        date_from = date.fromisoformat(request.query_params["from"])
+        date_to = date.fromisoformat(request.query_params["to"])
+    except (KeyError, ValueError):
+        return _error(422, "from and to must be dates as YYYY-MM-DD.")
+    kinds = request.query_params.getlist("kind")
+    unknown = [kind for kind in kinds if kind not in FOLDERS]
+    if unknown:
+        return _error(422, f"Unknown document type {unknown[0]!r}.")
+    # A sync generator: Starlette runs it on its thread pool chunk by chunk
+    filename = f"Orbit_Agritech_Documents_{date_from}_{date_to}.zip"
+    return StreamingResponse(export_range(date_from, date_to, kinds or None), media_type="application/zip",
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+async def health(request):
+    if not _authorised(request):
+        return _error(401, "Missing or invalid API token.")
+    return JSONResponse(get_render_service().metrics())
+
+
+async def prometheus(request):
+    if not _authorised(request):
+        return _error(401, "Missing or invalid API token.")
+    return Response(metrics.prometheus_text(), media_type=metrics.PROMETHEUS_MIME)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Parse the templates before the first request comes in
+    from warmup import warm_up
+
+    await asyncio.to_thread(warm_up)
+    yield
+
+
+app = Starlette(
+    routes=[Route("/render", render, methods=["POST"]), Route("/health", health),
+            Route("/metrics", prometheus), Route("/export", export)],
+    lifespan=lifespan,
+)
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the Orbit document API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--workers", type=int, default=1, help="server processes (each has its own render pool)")
+    args = parser.parse_args(argv)
+    uvicorn.run("api:app", host=args.host, port=args.port, workers=args.workers,
+                timeout_keep_alive=75, log_level="info")
+
+
+if __name__ == "__main__":
+    main()
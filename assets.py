@@ -0,0 +1,381 @@
+"""Smaller copies of the .docx templates and the letterhead, built once and cached on disk.
+
+Every rendered document carries whatever its template embeds: the letterhead
+at over 300 dpi, logos scaled down from much larger PNGs, around 170 styles
+and a font table, of which each template uses a handful. The optimized copy
+of a template has
+
+* images downsampled to ORBIT_ASSET_DPI (default 150) at the largest size
+  they are shown, re-encoded (JPEG at ORBIT_ASSET_JPEG_QUALITY) when that
+  comes out smaller;
+* styles that nothing refers to removed, and fonts no text or style uses
+  dropped from the font table;
+* every XML part deflated at the highest level.
+
+Copies go in .optimized/ next to the originals, named by a hash of the
+original and the settings, so editing a template or a setting rebuilds them.
+template_cache loads them in place of the originals, so the Streamlit app,
+batch.py and the API all render from them, and pdf_export draws the
+optimized letterhead. ORBIT_OPTIMIZE_ASSETS=0 uses the originals.
+
+Usage:
+    python assets.py [--runs 20]
+
+builds the copies and prints their sizes, rendered sizes and render times
+against the originals, and checks that the rendered text is unchanged.
+"""
+import argparse
+import hashlib
+import io
+import logging
+import os
+import re
+import sys
+import time
+import zipfile
+
+from storage import write_atomic
+
+ASSETS_ENABLED = os.environ.get("ORBIT_OPTIMIZE_ASSETS", "1") != "0"
+ASSET_DPI = int(os.environ.get("ORBIT_ASSET_DPI", "150"))
+JPEG_QUALITY = int(os.environ.get("ORBIT_ASSET_JPEG_QUALITY", "85"))
+CACHE_DIRNAME = ".optimized"
+
+# Bump when the optimizations below change so cached copies are rebuilt
+PIPELINE_VERSION = "2"
+
+_logger = logging.getLogger(__name__)
+
+_W = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_R = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_WP = "http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing"
+_A = "http://schemas.openxmlformats.org/drawingml/2006/main"
+_PKG_R = "http://schemas.openxmlformats.org/package/2006/relationships"
+_EMU_PER_INCH = 914400
+
+# Parts whose text ends up in the rendered document
+_TEXT_PARTS = re.compile(r"word/(document|header\d*|footer\d*|footnotes|endnotes)\.xml$")
+
+
+def _w(name):
+    return f"{{{_W}}}{name}"
+
+
+# Elements outside styles.xml whose w:val is a style id: paragraph, run and
+# table styles in the document parts, numbering styles linked from
+# numbering.xml, and the defaults named in settings.xml
+_STYLE_REFS = frozenset(_w(tag) for tag in (
+    "pStyle", "rStyle", "tblStyle", "styleLink", "numStyleLink", "defaultTableStyle", "clickAndTypeStyle",
+))
+
+
+def asset_tag():
+    """Short description of the settings, for cache keys of anything built from the assets."""
+    if not ASSETS_ENABLED:
+        return "original"
+    return f"assets{PIPELINE_VERSION}-{ASSET_DPI}dpi-q{JPEG_QUALITY}"
+
+
+def _parse(data):
+    from lxml import etree
+
+    return etree.fromstring(data)
+
+
+def _serialize(root):
+    from lxml import etree
+
+    return etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+
+def recompress_image(data, size_in, dpi=ASSET_DPI, quality=JPEG_QUALITY):
+    """``data`` (JPEG or PNG) resampled to ``dpi`` when shown at ``size_in`` inches.
+
+    Images are only ever scaled down, keeping their aspect ratio. The original
+    bytes come back when re-encoding does not make them smaller.
+    """
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(data))
+    image_format = image.format
+    if image_format not in ("JPEG", "PNG"):
+        return data
+    scale = max(size_in[0] * dpi / image.width, size_in[1] * dpi / image.height)
+    if scale < 1:
+        image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                             Image.LANCZOS)
+    options = {"dpi": (dpi, dpi), "optimize": True}
+    if image.info.get("icc_profile"):
+        options["icc_profile"] = image.info["icc_profile"]
+    if image_format == "JPEG":
+        options["quality"] = quality
+    out = io.BytesIO()
+    image.save(out, image_format, **options)
+    return out.getvalue() if out.tell() < len(data) else data
+
+
+def _relationships(parts, name):
+    """{rId: part name} for the relationships of part ``name``."""
+    directory, base = os.path.split(name)
+    rels = parts.get(f"{directory}/_rels/{base}.rels")
+    if rels is None:
+        return {}
+    targets = {}
+    for rel in _parse(rels).iter(f"{{{_PKG_R}}}Relationship"):
+        if rel.get("TargetMode") != "External":
+            targets[rel.get("Id")] = os.path.normpath(os.path.join(directory, rel.get("Target")))
+    return targets
+
+
+def image_sizes(parts):
+    """{media part name: (width, height) in inches} at the largest size each image is drawn."""
+    sizes = {}
+    for name, data in parts.items():
+        if not (name.startswith("word/") and name.endswith(".xml")) or b"blip" not in data:
+            continue
+        targets = _relationships(parts, name)
+        for drawing in _parse(data).iter(f"{{{_WP}}}inline", f"{{{_WP}}}anchor"):
+            extent = drawing.find(f"{{{_WP}}}extent")
+            if extent is None:
+                continue
+            size = (int(extent.get("cx")) / _EMU_PER_INCH, int(extent.get("cy")) / _EMU_PER_INCH)
+            for blip in drawing.iter(f"{{{_A}}}blip"):
+                target = targets.get(blip.get(f"{{{_R}}}embed"))
+                if target is not None:
+                    old = sizes.get(target, (0, 0))
+                    sizes[target] = (max(old[0], size[0]), max(old[1], size[1]))
+    return sizes
+
+
+def strip_styles(parts):
+    """styles.xml without the styles that no part refers to, directly or through other styles."""
+    styles = _parse(parts["word/styles.xml"])
+    used = set()
+    for name, data in parts.items():
+        if name.startswith("word/") and name.endswith(".xml") and name != "word/styles.xml":
+            for element in _parse(data).iter(*_STYLE_REFS):
+                if element.get(_w("val")):
+                    used.add(element.get(_w("val")))
+    by_id = {style.get(_w("styleId")): style for style in styles.iter(_w("style"))}
+    used |= {style_id for style_id, style in by_id.items() if style.get(_w("default")) in ("1", "true")}
+    pending = list(used)
+    while pending:
+        style = by_id.get(pending.pop())
+        if style is None:
+            continue
+        for tag in ("basedOn", "next", "link"):
+            ref = style.find(_w(tag))
+            if ref is not None and ref.get(_w("val")) not in used:
+                used.add(ref.get(_w("val")))
+                pending.append(ref.get(_w("val")))
+    for style_id, style in by_id.items():
+        if style_id not in used:
+            style.getparent().remove(style)
+    return _serialize(styles)
+
+
+def strip_fonts(parts):
+    """fontTable.xml without the fonts that no run, style or theme font uses."""
+    fonts = _parse(parts["word/fontTable.xml"])
+    used = set()
+    for name, data in parts.items():
+        if name.startswith("word/theme/"):
+            for slot in ("latin", "ea", "cs"):
+                used.update(element.get("typeface") for element in _parse(data).iter(f"{{{_A}}}{slot}"))
+        elif name.startswith("word/") and name.endswith(".xml") and name != "word/fontTable.xml":
+            for element in _parse(data).iter(_w("rFonts"), _w("sym")):
+                used.update(value for key, value in element.attrib.items()
+                            if key in (_w("ascii"), _w("hAnsi"), _w("eastAsia"), _w("cs"), _w("font")))
+    for font in list(fonts.iter(_w("font"))):
+        embedded = any(child.tag.startswith(_w("embed")) for child in font)
+        if font.get(_w("name")) not in used and not embedded:
+            fonts.remove(font)
+    return _serialize(fonts)
+
+
+def optimize_docx(data, dpi=ASSET_DPI, quality=JPEG_QUALITY):
+    """The optimized copy of the .docx file ``data`` (see the module docstring)."""
+    with zipfile.ZipFile(io.BytesIO(data)) as source:
+        infos = source.infolist()
+        parts = {info.filename: source.read(info) for info in infos}
+    optimized = dict(parts)
+    for name, size_in in image_sizes(parts).items():
+        if name in parts:
+            optimized[name] = recompress_image(parts[name], size_in, dpi, quality)
+    if "word/styles.xml" in parts:
+        optimized["word/styles.xml"] = strip_styles(parts)
+        parts["word/styles.xml"] = optimized["word/styles.xml"]
+    if "word/fontTable.xml" in parts:
+        optimized["word/fontTable.xml"] = strip_fonts(parts)
+
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w") as archive:
+        for info in infos:
+            member = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+            member.external_attr = info.external_attr
+            if info.filename.startswith("word/media/"):
+                # Already compressed; deflating gains nothing
+                member.compress_type = zipfile.ZIP_STORED
+                archive.writestr(member, optimized[info.filename])
+            else:
+                member.compress_type = zipfile.ZIP_DEFLATED
+                archive.writestr(member, optimized[info.filename], compresslevel=9)
+    return out.getvalue()
+
+
+def optimize_letterhead(data, dpi=ASSET_DPI, quality=JPEG_QUALITY):
+    """The letterhead image resampled to ``dpi`` at the page size its own dpi gives."""
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(data))
+    source_dpi = image.info.get("dpi")
+    if not source_dpi or not source_dpi[0] or not source_dpi[1]:
+        return data
+    return recompress_image(data, (image.width / source_dpi[0], image.height / source_dpi[1]), dpi, quality)
+
+
+def _cached(path, data, build):
+    """(path, bytes) of the copy of ``path`` made by ``build(data)``, from .optimized/ when there."""
+    directory = os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIRNAME)
+    stem, suffix = os.path.splitext(os.path.basename(path))
+    key = hashlib.sha256(f"{asset_tag()}:".encode("ascii") + data).hexdigest()[:16]
+    cached = os.path.join(directory, f"{stem}.{key}{suffix}")
+    try:
+        with open(cached, "rb") as fh:
+            return cached, fh.read()
+    except FileNotFoundError:
+        pass
+
+    start = time.perf_counter()
+    optimized = build(data)
+    _logger.info("Optimized %s: %d -> %d bytes in %.2fs", path, len(data), len(optimized),
+                 time.perf_counter() - start)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        write_atomic(cached, optimized)
+        # Copies made from older versions of the file or other settings
+        stale = re.compile(re.escape(stem) + r"\.[0-9a-f]{16}" + re.escape(suffix) + "$")
+        for name in os.listdir(directory):
+            if stale.match(name) and name != os.path.basename(cached):
+                os.unlink(os.path.join(directory, name))
+    except OSError as e:
+        # A read-only install still gets the smaller assets, rebuilt per process
+        _logger.warning("Could not cache the optimized %s: %s", path, e)
+    return cached, optimized
+
+
+def optimized_template(path, data):
+    """(path, bytes) of the template to render for the .docx at ``path`` with contents ``data``.
+
+    The original comes back when optimizing is off or fails.
+    """
+    if not ASSETS_ENABLED:
+        return path, data
+    try:
+        return _cached(path, data, optimize_docx)
+    except Exception:
+        _logger.exception("Could not optimize %s; using it as it is", path)
+        return path, data
+
+
+def optimized_letterhead(path):
+    """Bytes of the letterhead image to draw for the image at ``path``."""
+    with open(path, "rb") as fh:
+        data = fh.read()
+    if not ASSETS_ENABLED:
+        return data
+    try:
+        return _cached(path, data, optimize_letterhead)[1]
+    except Exception:
+        _logger.exception("Could not optimize %s; using it as it is", path)
+        return data
+
+
+def document_text(data):
+    """{part name: [paragraph text, ...]} for the body, headers, footers and notes of a .docx."""
+    text = {}
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        for name in archive.namelist():
+            if _TEXT_PARTS.match(name):
+                root = _parse(archive.read(name))
+                text[name] = ["".join(t.text or "" for t in p.iter(_w("t"))) for p in root.iter(_w("p"))]
+    return text
+
+
+def _render_timed(data, context, runs):
+    """Render ``data`` with docxtpl (from a parsed copy, as template_cache does) and compiled.
+
+    Returns (docxtpl bytes, compiled bytes or None, docxtpl ms, compiled ms).
+    """
+    import copy
+
+    from docx import Document
+    from docxtpl import DocxTemplate
+
+    from fast_template import CompiledTemplate, UnsupportedTemplate
+    from rendering import render_docx
+
+    parsed = Document(io.BytesIO(data))
+    start = time.perf_counter()
+    for _ in range(runs):
+        doc = DocxTemplate(io.BytesIO(data))
+        doc.docx = copy.deepcopy(parsed)
+        rendered = render_docx(doc, context)
+    docxtpl_ms = (time.perf_counter() - start) * 1000 / runs
+
+    try:
+        compiled = CompiledTemplate(data)
+    except UnsupportedTemplate:
+        return rendered, None, docxtpl_ms, None
+    start = time.perf_counter()
+    for _ in range(runs):
+        fast = compiled.render(context)
+    return rendered, fast, docxtpl_ms, (time.perf_counter() - start) * 1000 / runs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the optimized templates and letterhead and compare them.")
+    parser.add_argument("--runs", type=int, default=20, help="renders timed per template")
+    args = parser.parse_args(argv)
+    if not ASSETS_ENABLED:
+        print("ORBIT_OPTIMIZE_ASSETS=0: nothing to build")
+        return 0
+
+    import engine
+    from documents import TEMPLATES, template_path
+    from pdf_export import LETTERHEAD_PATH
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    print(f"{asset_tag()}\n")
+    print(f"{'':<38} {'template KB':>17} {'rendered KB':>17} {'docxtpl ms':>15} {'compiled ms':>15}  text")
+    failed = False
+    for kind in TEMPLATES:
+        path = template_path(kind)
+        with open(path, "rb") as fh:
+            original = fh.read()
+        _, optimized = optimized_template(path, original)
+        fields = {"document": kind, "receipt_no": "0042", "phone": "9876543210",
+                  "customer_name": "Asset Check", "amount_received": "50,000"}
+        context = engine.build_context(fields)[2]
+        before = _render_timed(original, context, args.runs)
+        after = _render_timed(optimized, context, args.runs)
+        same = all(document_text(a) == document_text(b)
+                   for a, b in zip(before[:2], after[:2]) if a is not None and b is not None)
+        failed |= not same
+        compiled = (f"{before[3]:6.1f} -> {after[3]:5.1f}" if before[3] is not None and after[3] is not None
+                    else f"{'n/a':>15}")
+        print(f"{os.path.basename(path):<38} {len(original) / 1024:7.0f} -> {len(optimized) / 1024:6.0f} "
+              f"{len(before[0]) / 1024:7.0f} -> {len(after[0]) / 1024:6.0f} "
+              f"{before[2]:6.1f} -> {after[2]:5.1f} {compiled}  {'same' if same else 'CHANGED'}")
+
+    with open(LETTERHEAD_PATH, "rb") as fh:
+        letterhead = len(fh.read())
+    print(f"{os.path.basename(LETTERHEAD_PATH):<38} {letterhead / 1024:7.0f} -> "
+          f"{len(optimized_letterhead(LETTERHEAD_PATH)) / 1024:6.0f}")
+    if failed:
+        print("Rendered text differs between the original and optimized templates", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""Generate quotations and proforma receipts in bulk from a CSV or Excel sheet.
+
+Each row is validated with the same rules as the Streamlit form, rendered in a
+process pool and written into a single ZIP on disk as soon as it is ready, so
+memory stays flat however many rows the sheet has.
+
+Usage:
+    python batch.py customers.xlsx -o quotations.zip [--document quotation] [--workers 4]
+
+Columns (case-insensitive, only receipt_no and phone are mandatory):
+    document      quotation / partial / full (defaults to --document)
+    receipt_no, date, customer_name, address, phone, email
+    role, subsidy                                    (quotations)
+    amount_received, payment_mode, reference_id,
+    payment_date, balance_due, delivery_date         (receipts)
+    quantity_pt_pro, quantity_battery, ...           (blank = form default)
+"""
+import argparse
+import csv
+import io
+import multiprocessing
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from documents import FULL_RECEIPT, PARTIAL_RECEIPT, QUOTATION, TEMPLATES
+from engine import build_context, form_role
+from metrics import count_document
+
+# Keep at most this many rows per worker in flight, which bounds how many
+# rendered documents can pile up in memory before they reach the ZIP.
+_IN_FLIGHT_PER_WORKER = 4
+
+# Generated documents are added to the ledger in transactions of this many rows
+_LEDGER_CHUNK = 500
+
+
+class BatchResult:
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.rows = 0
+        self.generated = 0
+        self.errors = []  # (row number, receipt_no, message)
+        self.bytes_written = 0
+        self.elapsed = 0.0
+
+    @property
+    def throughput(self):
+        return self.generated / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        return (f"{self.generated}/{self.rows} documents in {self.elapsed:.1f}s "
+                f"({self.throughput:.1f} docs/s), {len(self.errors)} errors, "
+                f"{self.bytes_written / 1e6:.1f} MB -> {self.output_path}")
+
+
+def read_rows(source, filename=None):
+    """Read a CSV/XLSX path or uploaded file into a list of dicts with lower-case keys."""
+    return read_frame(source, filename).to_dict("records")
+
+
+def read_frame(source, filename=None):
+    """Read a CSV/XLSX path or uploaded file into a DataFrame of strings with lower-case columns."""
+    import pandas as pd
+
+    name = (filename or getattr(source, "name", None) or str(source)).lower()
+    if name.endswith((".xlsx", ".xls")):
+        frame = pd.read_excel(source, dtype=str)
+    else:
+        frame = pd.read_csv(source, dtype=str)
+    frame.columns = [str(c).strip().lower().replace(" ", "_") for c in frame.columns]
+    return frame.fillna("")
+
+
+def _warm_templates(template_dir):
+    from template_cache import template_cache
+
+    for path in TEMPLATES.values():
+        template_cache.version(os.path.join(template_dir, path))
+
+
+def _render(template_dir, kind, context):
+    from render_service import render_template
+
+    return render_template(os.path.join(template_dir, TEMPLATES[kind]), context)
+
+
+def _errors_csv(errors):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["row", "receipt_no", "error"])
+    writer.writerows(errors)
+    return out.getvalue()
+
+
+def generate_batch(rows, output_path, default_document=QUOTATION, workers=None,
+                   template_dir=None, progress=None, ledger=None):
+    """Render every valid row into the ZIP at ``output_path``.
+
+    Invalid rows and render failures are collected on the result (and written
+    to errors.csv inside the ZIP) rather than stopping the run. ``progress`` is
+    called as ``progress(done, total)`` after each row. Generated documents are
+    recorded in ``ledger`` (a ledger.Ledger) when one is given.
+    """
+    template_dir = template_dir or os.path.dirname(os.path.abspath(__file__))
+    entries = []
+    versions = {}
+    if ledger is not None:
+        from ledger import make_entry
+        from template_cache import template_cache
+
+        versions = {kind: template_cache.version(os.path.join(template_dir, path))
+                    for kind, path in TEMPLATES.items()}
+    workers = workers or os.cpu_count() or 1
+    result = BatchResult(output_path)
+    result.rows = len(rows)
+    start = time.perf_counter()
+
+    # Docx members are already deflated internally and the images do not
+    # compress, so store them as-is and spend the CPU on rendering instead
+    with zipfile.ZipFile(output_path, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive, \
+            ProcessPoolExecutor(max_workers=workers,
+                                mp_context=multiprocessing.get_context("spawn"),
+                                initializer=_warm_templates,
+                                initargs=(template_dir,)) as pool:
+        names = set()
+        pending = {}
+        done = 0
+
+        def drain():
+            nonlocal done
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                row_no, kind, context, filename, role = pending.pop(future)
+                receipt_no = context["receipt_no"]
+                try:
+                    data = future.result()
+                except Exception as e:
+                    result.errors.append((row_no, receipt_no, f"Error rendering document: {e}"))
+                else:
+                    archive.writestr(filename, data)
+                    result.generated += 1
+                    result.bytes_written += len(data)
+                    count_document(kind, "DOCX", role)
+                    if ledger is not None:
+                        entries.append(make_entry(kind, context, "DOCX", versions[kind], role))
+                        if len(entries) >= _LEDGER_CHUNK:
+                            ledger.record_many(entries)
+                            entries.clear()
+                done += 1
+                if progress:
+                    progress(done, result.rows)
+
+        for row_no, row in enumerate(rows, start=2):  # row 1 is the header
+            try:
+                kind, filename, context = build_context(row, default_document)
+                if filename in names:
+                    raise ValueError(f"Duplicate document {filename} in this batch.")
+            except (ValueError, KeyError) as e:
+                result.errors.append((row_no, str(row.get("receipt_no", "")).strip(), str(e)))
+                done += 1
+                if progress:
+                    progress(done, result.rows)
+                continue
+            names.add(filename)
+            future = pool.submit(_render, template_dir, kind, context)
+            pending[future] = (row_no, kind, context, filename, form_role(row))
+            while len(pending) >= workers * _IN_FLIGHT_PER_WORKER:
+                drain()
+        while pending:
+            drain()
+        if entries:
+            ledger.record_many(entries)
+
+        if result.errors:
+            result.errors.sort()
+            archive.writestr("errors.csv", _errors_csv(result.errors))
+
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate Orbit documents in bulk from a CSV/XLSX sheet.")
+    parser.add_argument("input", help="CSV or XLSX file, one document per row")
+    parser.add_argument("-o", "--output", default="orbit_documents.zip", help="ZIP file to write")
+    parser.add_argument("--document", default=QUOTATION, choices=[QUOTATION, PARTIAL_RECEIPT, FULL_RECEIPT],
+                        help="document type for rows without a 'document' column")
+    parser.add_argument("--workers", type=int, default=None, help="render processes (default: CPU count)")
+    parser.add_argument("--no-ledger", action="store_true", help="do not record the documents in the ledger")
+    args = parser.parse_args(argv)
+
+    rows = read_rows(args.input)
+    ledger = None
+    if not args.no_ledger:
+        from ledger import get_ledger
+
+        ledger = get_ledger()
+    result = generate_batch(rows, args.output, default_document=args.document, workers=args.workers,
+                            ledger=ledger)
+    for row_no, receipt_no, message in result.errors:
+        print(f"row {row_no} ({receipt_no or 'no number'}): {message}", file=sys.stderr)
+    print(result.summary())
+    return 1 if result.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
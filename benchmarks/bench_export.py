@@ -0,0 +1,104 @@
+"""Memory and time of the streaming export as the number of documents grows.
+
+Fills a temporary ledger with distinct quotations and receipts (so every
+document is actually rendered), streams the export into a sink that only
+counts bytes and samples the process RSS meanwhile. Templates are loaded and
+the render cache emptied before each run. Peak RSS growth should stay flat
+whatever the document count, apart from the render cache filling up to
+ORBIT_RENDER_CACHE_MB; the archive is checked to open and list every
+document.
+
+Usage:
+    python benchmarks/bench_export.py [--documents 200 1000] [--prefetch 1 4]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def rss_mb():
+    with open("/proc/self/statm") as fh:
+        return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+
+
+class Sampler(threading.Thread):
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.peak = rss_mb()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(0.01):
+            self.peak = max(self.peak, rss_mb())
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        return self.peak
+
+
+def fill_ledger(ledger, count):
+    import engine
+    from ledger import make_entry
+
+    kinds = ("quotation", "partial", "full")
+    entries = []
+    for i in range(count):
+        fields = {"document": kinds[i % 3], "receipt_no": f"{i % 9999 + 1:04d}", "phone": "9876543210",
+                  "customer_name": f"Export Test {i + 1}", "amount_received": "50,000"}
+        kind, _, context = engine.build_context(fields)
+        entries.append(make_entry(kind, context, "DOCX"))
+    ledger.record_many(entries)
+    ledger.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, nargs="+", default=[200, 1000])
+    parser.add_argument("--prefetch", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args(argv)
+
+    from export import export_range
+    from ledger import Ledger
+    from render_cache import render_cache
+    from render_service import RenderService
+
+    today = date.today()
+    for count in args.documents:
+        with tempfile.TemporaryDirectory() as directory:
+            ledger = Ledger(os.path.join(directory, "ledger.sqlite3"))
+            fill_ledger(ledger, count)
+            # Load and compile the templates outside the measured runs
+            for _ in export_range(today, today, ledger=ledger):
+                break
+            for prefetch in args.prefetch:
+                render_cache.clear()
+                service = RenderService()
+                path = os.path.join(directory, "export.zip")
+                before = rss_mb()
+                sampler = Sampler()
+                sampler.start()
+                start, written = time.perf_counter(), 0
+                with open(path, "wb") as fh:
+                    for chunk in export_range(today, today, ledger=ledger, service=service, prefetch=prefetch):
+                        fh.write(chunk)
+                        written += len(chunk)
+                elapsed = time.perf_counter() - start
+                peak = sampler.stop()
+                service.shutdown()
+                with zipfile.ZipFile(path) as archive:
+                    assert len(archive.namelist()) == count + 1, "documents missing from the export"
+                    assert archive.testzip() is None
+                print(f"{count:>6} documents  prefetch {prefetch}  {written / 1e6:7.1f} MB in {elapsed:6.1f}s "
+                      f"({count / elapsed:5.1f} docs/s)  peak RSS +{peak - before:5.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Check the compiled templates against docxtpl byte for byte and time both.
+
+Each template is rendered with several contexts through the cached docxtpl
+path and through fast_template.CompiledTemplate, with the zip timestamps
+pinned so the outputs can be compared exactly. Exits non-zero on a mismatch.
+
+Usage:
+    python benchmarks/bench_fast_template.py [--repeat 50]
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from documents import (FULL_RECEIPT, PARTIAL_RECEIPT, QUOTATION, TEMPLATES,  # noqa: E402
+                       default_quantities, quotation_context, receipt_context)
+from fast_template import CompiledTemplate  # noqa: E402
+from template_cache import get_template, template_cache  # noqa: E402
+
+DATE_TIME = (2026, 10, 17, 12, 30, 44)
+
+
+def contexts(kind):
+    """A few contexts per document, including non-ASCII and multi-line values."""
+    for number, name, address in (("0042", "Ramesh Patil", "At Post Wadgaon, Tal. Haveli, Pune"),
+                                  ("0043", "रमेश पाटील", "Flat 4\nShivaji Nagar\nPune"),
+                                  ("9999", "", "")):
+        common = dict(receipt_no=number, date="17/10/2026", customer_name=name, address=address,
+                      phone="9876543210", email="ramesh@example.com", quantities=default_quantities())
+        if kind == QUOTATION:
+            yield quotation_context(subsidy=65000, form_filled_by="Manager", **common)
+        else:
+            yield receipt_context(kind, amount_received="50,000", payment_mode="Cashfree", reference_id="CF12345",
+                                  payment_date="17/10/2026", balance_due="1,31,000", delivery_date="01/11/2026",
+                                  **common)
+
+
+def docxtpl_render(template, context, pin_time=False):
+    doc = get_template(template)
+    doc.render(context)
+    buffer = io.BytesIO()
+    if pin_time:
+        # zipfile stamps every member with time.localtime(time.time())
+        with mock.patch("time.localtime", lambda *args: time.struct_time(DATE_TIME + (0, 0, -1))):
+            doc.save(buffer)
+    else:
+        doc.save(buffer)
+    return buffer.getvalue()
+
+
+def timed(fn, repeat):
+    fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), sorted(times)[int(0.95 * (len(times) - 1))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    mismatches = 0
+    print(f"{'document':<10} {'identical':>10} {'docxtpl ms':>11} {'p95':>7} {'compiled ms':>12} {'p95':>7} "
+          f"{'speedup':>8} {'compile ms':>11}")
+    for kind in (QUOTATION, PARTIAL_RECEIPT, FULL_RECEIPT):
+        template = os.path.join(root, TEMPLATES[kind])
+        # The bytes get_template renders from (the optimized copy, see assets.py)
+        data = template_cache.data(template)
+        start = time.perf_counter()
+        compiled = CompiledTemplate(data)
+        compile_ms = (time.perf_counter() - start) * 1000
+
+        identical = 0
+        samples = list(contexts(kind))
+        for context in samples:
+            same = docxtpl_render(template, context, pin_time=True) == compiled.render(context, DATE_TIME)
+            identical += same
+            mismatches += not same
+
+        context = samples[0]
+        slow, slow_p95 = timed(lambda: docxtpl_render(template, context), args.repeat)
+        fast, fast_p95 = timed(lambda: compiled.render(context), args.repeat)
+        print(f"{kind:<10} {f'{identical}/{len(samples)}':>10} {slow * 1000:>11.1f} {slow_p95 * 1000:>7.1f} "
+              f"{fast * 1000:>12.2f} {fast_p95 * 1000:>7.2f} {slow / fast:>7.1f}x {compile_ms:>11.0f}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
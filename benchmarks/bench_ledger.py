@@ -0,0 +1,79 @@
+"""Fill a scratch ledger with synthetic documents and time the indexed lookups.
+
+Usage:
+    python benchmarks/bench_ledger.py [--rows 1000000] [--repeat 200]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from documents import FULL_RECEIPT, PARTIAL_RECEIPT, QUOTATION  # noqa: E402
+from ledger import Ledger, series_for  # noqa: E402
+
+KINDS = (QUOTATION, PARTIAL_RECEIPT, FULL_RECEIPT)
+
+
+def synthetic_entries(count, seed=1):
+    rng = random.Random(seed)
+    start = date(2024, 1, 1)
+    context = json.dumps({"customer_name": "Synthetic", "quantity_pt_pro": 1})
+    for i in range(count):
+        kind = rng.choice(KINDS)
+        number = rng.randint(1, 9999)
+        issued = (start + timedelta(days=rng.randint(0, 1000))).isoformat()
+        yield (kind, series_for(kind), f"{number:04d}", number, issued, issued + "T12:00:00",
+               f"Customer {i}", f"9{rng.randint(0, 999_999_999):09d}", "", "{}", None, 181000, None,
+               "DOCX", "bench", context)
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return statistics.median(times) * 1000, times[int(0.95 * (len(times) - 1))] * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = Ledger(os.path.join(tmp, "ledger.sqlite3"))
+        start = time.perf_counter()
+        entries = synthetic_entries(args.rows)
+        while True:
+            chunk = [entry for _, entry in zip(range(50_000), entries)]
+            if not chunk:
+                break
+            ledger.record_many(chunk)
+        print(f"inserted {args.rows} rows in {time.perf_counter() - start:.1f}s")
+
+        rng = random.Random(2)
+        phone = ledger.get(args.rows // 2)["phone"]
+        cases = {
+            "number": lambda: ledger.search(receipt_no=str(rng.randint(1, 9999))),
+            "number + type": lambda: ledger.find_number(QUOTATION, str(rng.randint(1, 9999))),
+            "phone": lambda: ledger.search(phone=phone),
+            "one day": lambda: ledger.search(date_from=date(2025, 3, 1), date_to=date(2025, 3, 1)),
+            "next number": lambda: ledger.next_number("bench"),
+        }
+        for name, fn in cases.items():
+            median, p95 = timed(fn, args.repeat)
+            print(f"{name:<14} median {median:6.2f} ms   p95 {p95:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Several server processes rendering the same documents at once through shared storage.
+
+Each worker process starts with the same ORBIT_STORAGE, waits on a barrier and
+then renders every document of a fixed set (all three document types, DOCX
+and PDF) in its own shuffled order through the render service, like separate
+Streamlit servers behind a load balancer. Checks that:
+
+* nothing failed and no temporary files were left behind;
+* with a backend that locks across processes (shared, redis), each document
+  and template was built exactly once across all workers, and every worker
+  got byte-identical documents (one worker rendered, the rest read its result).
+
+local: only locks within a process, so run with it this shows the duplicate
+work that shared: avoids.
+
+Results go to benchmarks/results/multiworker.json. Exits non-zero on a failed check.
+
+Usage:
+    python benchmarks/bench_multiworker.py [--workers 4] [--documents 8] [--storage shared local redis://...]
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTPUT = os.path.join(ROOT, "benchmarks", "results", "multiworker.json")
+
+
+def requests(count):
+    kinds = ("quotation", "partial", "full")
+    return [({"document": kinds[i % 3], "receipt_no": f"{i + 1:04d}", "phone": "9876543210",
+              "customer_name": f"Worker Test {i + 1}", "amount_received": "50,000"}, output_format)
+            for i in range(count) for output_format in ("DOCX", "PDF")]
+
+
+def worker(index, count, barrier, results):
+    sys.path.insert(0, ROOT)
+    import engine
+    from render_service import get_render_service
+    from storage import get_storage
+
+    jobs = requests(count)
+    random.Random(index).shuffle(jobs)
+    digests, errors = {}, []
+    barrier.wait()
+    start = time.perf_counter()
+    for fields, output_format in jobs:
+        try:
+            kind, _, context = engine.build_context(fields)
+            data = engine.submit(kind, context, output_format).result()
+            digests[f"{fields['receipt_no']}.{output_format}"] = hashlib.sha256(data).hexdigest()
+        except Exception as e:
+            errors.append(repr(e))
+    elapsed = time.perf_counter() - start
+    get_render_service().shutdown()
+    storage = get_storage()
+    results.put({"worker": index, "elapsed_s": elapsed, "digests": digests, "errors": errors,
+                 "hits": storage.hits, "misses": storage.misses})
+
+
+def run(storage_url, workers, count):
+    os.environ["ORBIT_STORAGE"] = storage_url
+    ctx = multiprocessing.get_context("spawn")
+    barrier, results = ctx.Barrier(workers), ctx.Queue()
+    processes = [ctx.Process(target=worker, args=(i, count, barrier, results)) for i in range(workers)]
+    start = time.perf_counter()
+    for p in processes:
+        p.start()
+    outcomes = sorted((results.get(timeout=600) for _ in processes), key=lambda r: r["worker"])
+    for p in processes:
+        p.join()
+    elapsed = time.perf_counter() - start
+
+    documents = len(requests(count))
+    templates = 3  # compiled templates are stored too
+    mismatched = [name for name in outcomes[0]["digests"]
+                  if len({o["digests"].get(name) for o in outcomes}) != 1]
+    builds = sum(o["misses"] for o in outcomes)
+    return {
+        "storage": storage_url.partition(":")[0],
+        "workers": workers,
+        "documents": documents,
+        "elapsed_s": elapsed,
+        "worker_elapsed_s": [o["elapsed_s"] for o in outcomes],
+        "builds": builds,
+        "expected_builds": documents + templates,
+        "reads": sum(o["hits"] for o in outcomes),
+        "mismatched": mismatched,
+        "errors": [e for o in outcomes for e in o["errors"]][:10],
+    }
+
+
+def leftover_temp_files(directory):
+    return [name for _, _, names in os.walk(directory) for name in names if name.endswith(".tmp")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--documents", type=int, default=8, help="document numbers, each as DOCX and PDF")
+    parser.add_argument("--storage", nargs="+", default=["shared"],
+                        help="backends to run: shared, local, or a redis:// URL")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args(argv)
+
+    failed, runs = False, []
+    for backend in args.storage:
+        with tempfile.TemporaryDirectory() as directory:
+            os.environ["ORBIT_PDF_CACHE"] = os.path.join(directory, "pdf")
+            url = backend if ":" in backend else f"{backend}:{os.path.join(directory, 'store')}"
+            result = run(url, args.workers, args.documents)
+            result["leftover_temp_files"] = len(leftover_temp_files(directory))
+        # Per-process locks cannot stop two processes building the same entry
+        exactly_once = result["storage"] != "local"
+        ok = not result["errors"] and not result["leftover_temp_files"] and (
+            not exactly_once or (result["builds"] == result["expected_builds"] and not result["mismatched"]))
+        result["ok"] = ok
+        failed |= not ok
+        runs.append(result)
+        print(f"{result['storage']:<7} {result['workers']} workers  {result['documents']} documents  "
+              f"{result['builds']} builds (expected {result['expected_builds']})  {result['reads']} reads  "
+              f"{len(result['mismatched'])} mismatched  {len(result['errors'])} errors  "
+              f"{result['elapsed_s']:.1f}s  {'ok' if ok else 'FAILED'}")
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as fh:
+        json.dump({"cpus": os.cpu_count(), "runs": runs}, fh, indent=2)
+        fh.write("\n")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""Compare per-document render time of the DOCX templates and the reportlab PDFs.
+
+Usage:
+    python benchmarks/bench_pdf_vs_docx.py [--repeat 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from documents import (FULL_RECEIPT, PARTIAL_RECEIPT, QUOTATION, TEMPLATES,  # noqa: E402
+                       default_quantities, quotation_context, receipt_context)
+from pdf_export import PdfCache, render_pdf  # noqa: E402
+from rendering import render_docx  # noqa: E402
+from template_cache import get_template  # noqa: E402
+
+
+def sample_contexts():
+    common = dict(receipt_no="0042", date="17/10/2026", customer_name="Ramesh Patil",
+                  address="At Post Wadgaon, Tal. Haveli, Pune", phone="9876543210",
+                  email="", quantities=default_quantities())
+    receipt = dict(amount_received="50,000", payment_mode="Cashfree", reference_id="CF12345",
+                   payment_date="17/10/2026", delivery_date="01/11/2026")
+    return {
+        QUOTATION: quotation_context(subsidy=65000, form_filled_by="Manager", **common),
+        PARTIAL_RECEIPT: receipt_context(PARTIAL_RECEIPT, balance_due="1,31,000", **receipt, **common),
+        FULL_RECEIPT: receipt_context(FULL_RECEIPT, **receipt, **common),
+    }
+
+
+def timed(fn, repeat):
+    fn()  # warm up caches and imports
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        data = fn()
+        times.append(time.perf_counter() - start)
+    return times, len(data)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = PdfCache(cache_dir)
+        print(f"{'document':<10} {'format':<10} {'median ms':>10} {'p95 ms':>10} {'bytes':>10}")
+        for kind, context in sample_contexts().items():
+            template = os.path.join(root, TEMPLATES[kind])
+            runs = {
+                "docx": lambda: render_docx(get_template(template), context),
+                "pdf": lambda: render_pdf(kind, context),
+                "pdf-cached": lambda: cache.render(kind, context),
+            }
+            for name, fn in runs.items():
+                times, size = timed(fn, args.repeat)
+                p95 = sorted(times)[int(0.95 * (len(times) - 1))]
+                print(f"{kind:<10} {name:<10} {statistics.median(times) * 1000:>10.1f} {p95 * 1000:>10.1f} {size:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Time the vectorized pricing engine on synthetic quote histories.
+
+Random quotes (quantities, roles, asked-for subsidies) are priced under the
+current prices and a what-if scenario in single passes. A sample is checked
+against pricing one quote at a time the way the quotation page does, which
+also gives the per-quote loop time to compare with.
+
+Usage:
+    python benchmarks/bench_pricing.py [--rows 1000000 5000000] [--sample 20000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from documents import max_subsidy  # noqa: E402
+from pricing import ROLES, PriceBook, Quotes, Scenario, compare, get_price_book  # noqa: E402
+
+
+def synthetic_quotes(rows, book, seed=1):
+    rng = np.random.default_rng(seed)
+    quantities = rng.integers(0, 3, size=(rows, len(book.keys)), dtype=np.int64)
+    roles = np.array(list(ROLES) + [""], dtype=object)[rng.integers(0, len(ROLES) + 1, size=rows)]
+    subsidies = rng.integers(0, 13, size=rows, dtype=np.int64) * 10000
+    return Quotes(quantities, roles, subsidies)
+
+
+def loop_price(book, quotes, rows):
+    """The same numbers, one quote at a time in plain Python."""
+    prices = dict(zip(book.keys, book.prices.tolist()))
+    out = []
+    for i in range(rows):
+        quantities = dict(zip(book.keys, quotes.quantities[i].tolist()))
+        total = sum(prices[key] * qty for key, qty in quantities.items())
+        role = quotes.roles[i]
+        cap = max_subsidy(role, quantities["quantity_battery"]) if role else 0
+        subsidy = min(int(quotes.subsidies[i]), cap)
+        out.append((total, cap, subsidy, total - subsidy))
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000000, 5000000])
+    parser.add_argument("--sample", type=int, default=20000, help="quotes priced one at a time for comparison")
+    args = parser.parse_args(argv)
+
+    book = get_price_book()
+    scenarios = [Scenario("Current"), Scenario("What-if", {"quantity_pt_pro": 118000}, {"Manager": (90000, 90000)})]
+    for rows in args.rows:
+        quotes = synthetic_quotes(rows, book)
+        codes = book.role_codes(quotes.roles)
+        start = time.perf_counter()
+        result = book.price(quotes.quantities, codes, quotes.subsidies)
+        single = time.perf_counter() - start
+        start = time.perf_counter()
+        compare(quotes, scenarios)
+        both = time.perf_counter() - start
+
+        sample = min(args.sample, rows)
+        start = time.perf_counter()
+        expected = loop_price(book, quotes, sample)
+        loop = (time.perf_counter() - start) / sample
+        got = list(zip(*(result[name][:sample].tolist()
+                         for name in ("total", "max_subsidy", "subsidy", "final_price"))))
+        assert got == expected, "vectorized prices differ from the per-quote loop"
+        what_if = PriceBook(scenario=scenarios[1])
+        first = dict(zip(book.keys, quotes.quantities[0].tolist()))
+        assert what_if.quote(first, "Manager", 10 ** 6)["max_subsidy"] == 90000, "scenario caps not applied"
+        assert what_if.quote(first, "")["total"] - book.quote(first, "")["total"] == 6000 * first["quantity_pt_pro"]
+
+        print(f"{rows:>10,} quotes  one pass {single * 1000:8.1f} ms ({rows / single / 1e6:5.1f} M quotes/s)   "
+              f"2 scenarios incl. role coding {both * 1000:8.1f} ms   "
+              f"per-quote loop {loop * 1e6:5.1f} us/quote (~{loop * rows:6.1f} s)   "
+              f"{quotes.quantities.nbytes / 1e6:.0f} MB of quantities")
+
+
+if __name__ == "__main__":
+    main()
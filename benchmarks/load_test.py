@@ -0,0 +1,218 @@
+"""Load test of the three generator pages plus render microbenchmarks.
+
+End-to-end numbers come from driving streamlit_app.py with Streamlit's AppTest
+harness: every widget change is a full script rerun, and a Generate click is
+timed until the download appears. 1, 8 and 32 concurrent sessions are each
+run in a fresh interpreter (so peak RSS is per scenario), cycling through the
+quotation, partial and full receipt pages; the sessions take turns running
+their scripts while their renders share the render pool. Microbenchmarks call the render path
+directly, bypassing the render cache. Every document uses a new number so no
+cache can serve it.
+
+Results go to benchmarks/results/load.json for comparison between commits.
+
+Usage:
+    python benchmarks/load_test.py [--sessions 1 8 32] [--iterations 3] [--repeat 20]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "streamlit_app.py")
+DEFAULT_OUTPUT = os.path.join(ROOT, "benchmarks", "results", "load.json")
+
+PAGES = ("Quotation Summary", "Partial Proforma Receipt", "Full Proforma Receipt")
+
+
+def percentiles(values):
+    values = sorted(values)
+    if not values:
+        return {"count": 0}
+
+    def pick(q):
+        return values[min(int(q * len(values)), len(values) - 1)] * 1000
+
+    return {"count": len(values), "p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99),
+            "max_ms": values[-1] * 1000}
+
+
+def peak_rss_mb():
+    import resource
+
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1e6
+
+
+# -- children ---------------------------------------------------------------
+
+def session_steps(page, numbers, reruns, renders, errors):
+    """One user filling in and generating documents; yields after every script run."""
+    from streamlit.testing.v1 import AppTest
+
+    def timed_run(step):
+        start = time.perf_counter()
+        step.run()
+        reruns.append(time.perf_counter() - start)
+
+    app = AppTest.from_file(APP, default_timeout=120)
+    timed_run(app)
+    yield
+    app.radio[0].set_value(page)
+    timed_run(app)
+    yield
+    for number in numbers:
+        values = {"receipt_no": f"{number:04d}", "phone": "9876543210", "customer_name": f"Load Test {number}"}
+        for key in [w.key for w in app.text_input]:
+            field = next((f for f in values if f in key), None)
+            if field is not None:
+                # Look the widget up again: every rerun rebuilds the element tree
+                app.text_input(key=key).set_value(values[field])
+                timed_run(app)
+                yield
+        start = time.perf_counter()
+        [b for b in app.button if "Generate" in b.label][0].click().run()
+        while not any("generated" in s.value for s in app.success):
+            if app.error or app.exception:
+                errors.append([e.value for e in app.error] + [str(e.value) for e in app.exception])
+                break
+            yield "waiting"
+            app.run()
+        else:
+            renders.append(time.perf_counter() - start)
+        yield
+
+
+def sessions_child(sessions, iterations):
+    # AppTest is not thread-safe, so the sessions take turns on this thread,
+    # one script run each, while their renders overlap on the shared render
+    # pool just as concurrent browser sessions do on one Streamlit server
+    reruns, renders, errors = [], [], []
+    live = [session_steps(PAGES[i % len(PAGES)], [1 + i * iterations + n for n in range(iterations)],
+                          reruns, renders, errors)
+            for i in range(sessions)]
+    start = time.perf_counter()
+    while live:
+        waiting = 0
+        for steps in list(live):
+            try:
+                waiting += next(steps) == "waiting"
+            except StopIteration:
+                live.remove(steps)
+            except Exception as e:
+                errors.append(repr(e))
+                live.remove(steps)
+        if live and waiting == len(live):
+            time.sleep(0.02)  # everyone is waiting on a render
+    elapsed = time.perf_counter() - start
+    return {
+        "sessions": sessions,
+        "documents": len(renders),
+        "elapsed_s": elapsed,
+        "throughput_docs_per_s": len(renders) / elapsed,
+        "widget_rerun": percentiles(reruns),
+        "generate_to_download": percentiles(renders),
+        "peak_rss_mb": peak_rss_mb(),
+        "errors": errors[:10],
+    }
+
+
+def micro_child(repeat):
+    sys.path.insert(0, ROOT)
+    from documents import (FULL_RECEIPT, PARTIAL_RECEIPT, QUOTATION, default_quantities,
+                           quotation_context, receipt_context, template_path)
+    from pdf_export import render_pdf
+    from render_service import render_template
+
+    def context(kind, number):
+        common = dict(receipt_no=f"{number:04d}", date="17/10/2026", customer_name="Load Test",
+                      address="Pune", phone="9876543210", email="", quantities=default_quantities())
+        if kind == QUOTATION:
+            return quotation_context(**common)
+        return receipt_context(kind, amount_received="50,000", balance_due="1,31,000", **common)
+
+    results = {}
+    for kind in (QUOTATION, PARTIAL_RECEIPT, FULL_RECEIPT):
+        for output_format, render in (("docx", lambda k, c: render_template(template_path(k), c)),
+                                      ("pdf", render_pdf)):
+            render(kind, context(kind, 0))  # warm up
+            times, sizes = [], []
+            for number in range(1, repeat + 1):
+                start = time.perf_counter()
+                data = render(kind, context(kind, number))
+                times.append(time.perf_counter() - start)
+                sizes.append(len(data))
+            results[f"{kind}_{output_format}"] = {**percentiles(times), "bytes": max(sizes)}
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+
+# -- parent -----------------------------------------------------------------
+
+def run_child(args, ledger_dir):
+    env = dict(os.environ, ORBIT_LEDGER=os.path.join(ledger_dir, f"ledger-{'-'.join(args)}.sqlite3"))
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", *args],
+                          cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--iterations", type=int, default=3, help="documents generated per session")
+    parser.add_argument("--repeat", type=int, default=20, help="renders per microbenchmark")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--child", nargs="+", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        mode, value = args.child[0], int(args.child[1])
+        result = micro_child(value) if mode == "micro" else sessions_child(value, args.iterations)
+        print(json.dumps(result))
+        return
+
+    with tempfile.TemporaryDirectory() as ledger_dir:
+        results = {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "micro": run_child(["micro", str(args.repeat)], ledger_dir),
+            "sessions": [run_child(["sessions", str(n), "--iterations", str(args.iterations)], ledger_dir)
+                         for n in args.sessions],
+        }
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as fh:
+        json.dump(results, fh, indent=2)
+        fh.write("\n")
+
+    for name, r in results["micro"].items():
+        if isinstance(r, dict):
+            print(f"{name:<16} p50 {r['p50_ms']:6.1f} ms   p95 {r['p95_ms']:6.1f} ms   "
+                  f"p99 {r['p99_ms']:6.1f} ms   {r['bytes'] / 1024:6.0f} KB")
+    for r in results["sessions"]:
+        print(f"{r['sessions']:>3} sessions  {r['throughput_docs_per_s']:5.1f} docs/s   "
+              f"rerun p50/p95/p99 {r['widget_rerun']['p50_ms']:.0f}/{r['widget_rerun']['p95_ms']:.0f}/"
+              f"{r['widget_rerun']['p99_ms']:.0f} ms   "
+              f"generate p50/p95/p99 {r['generate_to_download']['p50_ms']:.0f}/"
+              f"{r['generate_to_download']['p95_ms']:.0f}/{r['generate_to_download']['p99_ms']:.0f} ms   "
+              f"peak RSS {r['peak_rss_mb']:.0f} MB   {len(r['errors'])} errors")
+    print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
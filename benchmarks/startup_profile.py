@@ -0,0 +1,137 @@
+"""Startup profile of the Streamlit app: cold boot, first render and warm rerun.
+
+Every scenario runs in a fresh interpreter and drives streamlit_app.py through
+Streamlit's AppTest harness. Import costs of the first page paint are captured
+with ``python -X importtime``. Results go to benchmarks/results/startup.json
+so they can be compared between commits.
+
+Usage:
+    python benchmarks/startup_profile.py [--output benchmarks/results/startup.json]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "streamlit_app.py")
+DEFAULT_OUTPUT = os.path.join(ROOT, "benchmarks", "results", "startup.json")
+
+# Executed in a child interpreter; prints one JSON line with the timings
+_CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file(sys.argv[1], default_timeout=120)
+t1 = time.perf_counter()
+app.run()
+t2 = time.perf_counter()
+render_stack_on_paint = any(m in sys.modules for m in ("docxtpl", "jinja2", "lxml.etree"))
+
+sys.path.insert(0, sys.argv[2])
+import warmup
+warmup.wait_for_warmup(60)
+t3 = time.perf_counter()
+
+def render():
+    for t in app.text_input:
+        if "receipt_no" in t.key:
+            t.set_value("1234")
+        elif "phone" in t.key:
+            t.set_value("9876543210")
+    app.run()
+    start = time.perf_counter()
+    [b for b in app.button if "Generate" in b.label][0].click().run()
+    while not app.success or "generated" not in app.success[-1].value:
+        time.sleep(0.01)
+        app.run()
+    return time.perf_counter() - start
+
+first_render = render()
+t4 = time.perf_counter()
+app.run()
+warm_rerun = time.perf_counter() - t4
+second_render = render()
+print(json.dumps({
+    "import_streamlit_s": t1 - t0,
+    "cold_paint_s": t2 - t1,
+    "render_stack_loaded_on_paint": render_stack_on_paint,
+    "warmup_wait_s": t3 - t2,
+    "warmup_timings_s": warmup.timings,
+    "first_render_s": first_render,
+    "warm_rerun_s": warm_rerun,
+    "second_render_s": second_render,
+}))
+"""
+
+_PAINT_IMPORTS = r"""
+import sys
+from streamlit.testing.v1 import AppTest
+AppTest.from_file(sys.argv[1], default_timeout=120).run()
+"""
+
+
+def run_child(code, env_overrides, extra_args=()):
+    env = dict(os.environ, **env_overrides)
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, *extra_args, "-c", code, APP, ROOT],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return proc, time.perf_counter() - start
+
+
+def scenario(warmup):
+    proc, wall = run_child(_CHILD, {"ORBIT_WARMUP": "1" if warmup else "0"})
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["process_wall_s"] = wall
+    return result
+
+
+def paint_imports(top=15):
+    """Top-level imports of the first page paint by cumulative time (warm-up off)."""
+    proc, _ = run_child(_PAINT_IMPORTS, {"ORBIT_WARMUP": "0"}, extra_args=("-X", "importtime"))
+    totals = {}
+    for line in proc.stderr.splitlines():
+        fields = line.removeprefix("import time:").split("|")
+        if not line.startswith("import time:") or not fields[0].strip().isdigit():
+            continue
+        name = fields[2]
+        # Nested imports are indented (and already counted in their parent)
+        if not name[1:2].isspace():
+            totals[name.strip()] = totals.get(name.strip(), 0) + int(fields[1])
+    ranked = sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:top]
+    return [{"module": name, "cumulative_ms": us / 1000} for name, us in ranked]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args(argv)
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "with_warmup": scenario(warmup=True),
+        "without_warmup": scenario(warmup=False),
+        "paint_imports": paint_imports(),
+    }
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as fh:
+        json.dump(results, fh, indent=2)
+        fh.write("\n")
+
+    for name in ("with_warmup", "without_warmup"):
+        r = results[name]
+        print(f"{name:<15} cold paint {r['cold_paint_s'] * 1000:7.0f} ms   "
+              f"first render {r['first_render_s'] * 1000:6.0f} ms   "
+              f"warm rerun {r['warm_rerun_s'] * 1000:5.0f} ms   "
+              f"second render {r['second_render_s'] * 1000:6.0f} ms")
+    print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
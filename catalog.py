@@ -0,0 +1,106 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+CATALOG_PATH = os.environ.get(
+    "ORBIT_CATALOG", os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog.json")
+)
+
+_REQUIRED_FIELDS = ("name", "price", "key")
+
+
+class Catalog:
+    """The item list with prices precomputed into a key -> position index.
+
+    Quantities are turned into a vector aligned with ``prices`` so a bill
+    total is a single dot product regardless of catalog size.
+    """
+
+    def __init__(self, items, version=None):
+        seen = set()
+        for item in items:
+            missing = [field for field in _REQUIRED_FIELDS if field not in item]
+            if missing:
+                raise ValueError(f"Catalog item {item!r} is missing {', '.join(missing)}.")
+            if item["key"] in seen:
+                raise ValueError(f"Duplicate catalog key {item['key']!r}.")
+            seen.add(item["key"])
+
+        self.items = [dict(item, default=item.get("default", 0)) for item in items]
+        self.keys = tuple(item["key"] for item in self.items)
+        self.index = {key: i for i, key in enumerate(self.keys)}
+        self.prices = np.array([item["price"] for item in self.items], dtype=np.int64)
+        self.price_of = dict(zip(self.keys, self.prices.tolist()))
+        self.version = version
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def defaults(self):
+        return {item["key"]: item["default"] for item in self.items}
+
+    def vector(self, quantities):
+        """Quantities dict -> int64 array aligned with ``prices`` (unknown keys ignored)."""
+        vec = np.zeros(len(self.keys), dtype=np.int64)
+        for key, qty in quantities.items():
+            pos = self.index.get(key)
+            if pos is not None:
+                vec[pos] = qty
+        return vec
+
+    def total(self, quantities):
+        return int(self.prices @ self.vector(quantities))
+
+    def bill_summary(self, quantities):
+        """Return (total_price, [{"name", "qty"}, ...]) for the selected items."""
+        vec = self.vector(quantities)
+        selected = np.flatnonzero(vec > 0)
+        summary = [{"name": self.items[i]["name"], "qty": int(vec[i])} for i in selected]
+        return int(self.prices @ vec), summary
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as fh:
+        if path.endswith((".yaml", ".yml")):
+            import yaml  # optional, only needed for YAML catalogs
+
+            try:
+                data = yaml.safe_load(fh)
+            except yaml.YAMLError as e:
+                # Same as a JSON syntax error (json.JSONDecodeError is a ValueError)
+                raise ValueError(f"Invalid catalog {path}: {e}") from e
+        else:
+            data = json.load(fh)
+    return data["items"] if isinstance(data, dict) else data
+
+
+_lock = threading.Lock()
+_loaded = {}  # path -> ((mtime_ns, size), Catalog)
+
+
+def get_catalog(path=None):
+    """Return the catalog at ``path``, re-reading it only when the file has changed.
+
+    If an edited file fails to load (invalid, half-written or briefly missing
+    while it is replaced), the last good catalog keeps being served.
+    """
+    path = os.path.abspath(path or CATALOG_PATH)
+    with _lock:
+        cached = _loaded.get(path)
+        try:
+            st = os.stat(path)
+            signature = (st.st_mtime_ns, st.st_size)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+            catalog = Catalog(_read(path), version=signature[0])
+        except (OSError, ValueError, KeyError, TypeError):
+            if cached is None:
+                raise
+            return cached[1]
+        _loaded[path] = (signature, catalog)
+        return catalog
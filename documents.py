@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+from datetime import date as _date, datetime
+
+from catalog import get_catalog
+from metrics import timed
+from pricing import get_price_book, quote
+
+# Document types shared by the Streamlit form, batch generation and the CLI
+QUOTATION = "quotation"
+PARTIAL_RECEIPT = "partial"
+FULL_RECEIPT = "full"
+
+TEMPLATES = {
+    QUOTATION: "Orbit Agritech Quotation Summary.docx",
+    PARTIAL_RECEIPT: "Orbit Agritech Proforma Receipt Partial.docx",
+    FULL_RECEIPT: "Orbit Agritech Proforma Receipt Full.docx",
+}
+
+TEMPLATE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Numbers restart every financial year, so the year is part of the name
+OUTPUT_FILENAMES = {
+    QUOTATION: "Orbit_Agritech_Quotation_{year}_{receipt_no}.docx",
+    PARTIAL_RECEIPT: "Orbit_Agritech_Proforma_Receipt_{year}_{receipt_no}.docx",
+    FULL_RECEIPT: "Orbit_Agritech_Proforma_Receipt_{year}_{receipt_no}.docx",
+}
+
+DATE_FORMAT = "%d/%m/%Y"
+_INPUT_DATE_FORMATS = (DATE_FORMAT, "%d-%m-%Y", "%Y-%m-%d", "%Y-%m-%d %H:%M:%S")
+
+
+def financial_year(day):
+    """(first day, last day, label such as "2026-27") of the April-March year containing ``day``."""
+    start = day.year if day.month >= 4 else day.year - 1
+    return _date(start, 4, 1), _date(start + 1, 3, 31), f"{start}-{(start + 1) % 100:02d}"
+
+
+def document_year(context):
+    """Financial year printed in a document's number ("ORBIT/2026-27/1/0001"), from its date."""
+    if context.get("financial_year"):
+        return context["financial_year"]
+    try:
+        day = datetime.strptime(context.get("date") or "", DATE_FORMAT).date()
+    except ValueError:
+        day = _date.today()
+    return financial_year(day)[2]
+
+
+def digits(value, max_length):
+    """Keep only the digits of ``value``, truncated like the form's numeric inputs."""
+    return "".join(filter(str.isdigit, str(value)))[:max_length]
+
+
+def validate_numbers(receipt_no, phone, number_label="Receipt Number"):
+    """Raise ValueError with the form's message if the number or phone is invalid."""
+    if not receipt_no or not receipt_no.isdigit() or len(receipt_no) > 4:
+        raise ValueError(f"{number_label} is required and must be numeric up to 4 digits.")
+    if len(phone) != 10 or not phone.isdigit():
+        raise ValueError("Phone Number must be exactly 10 digits.")
+
+
+def max_subsidy(role, battery_qty):
+    return get_price_book().max_subsidy(role, battery_qty)
+
+
+def validate_subsidy(subsidy, role, battery_qty):
+    if subsidy < 0:
+        raise ValueError("Subsidy cannot be negative.")
+    if not subsidy:
+        return
+    book = get_price_book()
+    if role not in book.role_index:
+        raise ValueError("A subsidy can only be applied when the form is filled by a known role.")
+    cap = book.max_subsidy(role, battery_qty)
+    if subsidy > cap:
+        raise ValueError(f"Subsidy Rs {subsidy:,.0f} exceeds the Rs {cap:,.0f} cap for {role}.")
+
+
+def default_quantities():
+    return get_catalog().defaults()
+
+
+def bill_summary(quantities):
+    """Return (total_price, [{"name", "qty"}, ...]) for the selected items."""
+    return get_catalog().bill_summary(quantities)
+
+
+def format_date(value=None):
+    """Format a date (or a date string in a common layout) as dd/mm/YYYY; blank means today."""
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return datetime.today().strftime(DATE_FORMAT)
+    if isinstance(value, (datetime, _date)):
+        return value.strftime(DATE_FORMAT)
+    value = str(value).strip()
+    for fmt in _INPUT_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).strftime(DATE_FORMAT)
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised date: {value!r}")
+
+
+@timed("context_build")
+def quotation_context(receipt_no, date, customer_name, address, phone, email,
+                      quantities, subsidy=0, form_filled_by=""):
+    validate_subsidy(subsidy, form_filled_by, quantities.get("quantity_battery", 0))
+    bill = quote(quantities, form_filled_by, subsidy)
+    total_price, final_price = bill["total"], bill["final_price"]
+    context = {
+        "receipt_no": receipt_no,
+        "financial_year": document_year({"date": date}),
+        "date": date,
+        "customer_name": customer_name,
+        "address_line1": address,
+        "phone": phone,
+        "email": email if email else "N/A",
+        "total_price": f"Rs {total_price:,.0f}",
+        "subsidy": f"Rs {subsidy:,.0f}",
+        "final_price": f"Rs {final_price:,.0f}",
+    }
+    context.update(quantities)
+    return context
+
+
+@timed("context_build")
+def receipt_context(kind, receipt_no, date, customer_name, address, phone, email,
+                    quantities, amount_received="", payment_mode="Cashfree",
+                    reference_id="", payment_date="", balance_due="", delivery_date=""):
+    """Context for the partial or full proforma receipt.
+
+    ``delivery_date`` fills the partial receipt's tentative delivery or the
+    full receipt's delivery date.
+    """
+    context = {
+        "receipt_no": receipt_no,
+        "financial_year": document_year({"date": date}),
+        "date": date,
+        "customer_name": customer_name,
+        "address_line1": address,
+        "phone": phone,
+        "email": email if email else "N/A",
+        "amount_received": amount_received,
+        "payment_mode": payment_mode,
+        "reference_id": reference_id if reference_id else "N/A",
+        "payment_date": payment_date,
+    }
+    if kind == PARTIAL_RECEIPT:
+        context["balance_due"] = balance_due
+        context["tentative_delivery"] = delivery_date
+    else:
+        context["delivery_date"] = delivery_date
+    context.update(quantities)
+    return context
+
+
+def template_path(kind):
+    return os.path.join(TEMPLATE_DIR, TEMPLATES[kind])
+
+
+def output_filename(kind, context):
+    return OUTPUT_FILENAMES[kind].format(year=document_year(context), receipt_no=context["receipt_no"])
+
+
+def context_hash(template_id, template_version, context):
+    """Stable sha256 of a template identity and its context, independent of dict order."""
+    payload = json.dumps([template_id, template_version, context], sort_keys=True,
+                         separators=(",", ":"), default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
@@ -0,0 +1,190 @@
+"""Headless document engine shared by the Streamlit app, batch.py and the HTTP API.
+
+Takes a flat dict of form fields (the same names as the batch sheet columns),
+validates it with the form's rules, builds the template context and renders it
+on the shared render service, so every entry point produces identical
+documents.
+
+Usage:
+    python engine.py request.json [-o out.docx] [--format pdf]    (- reads stdin)
+
+Example request:
+    {"document": "quotation", "receipt_no": "0042", "phone": "9876543210",
+     "customer_name": "Ramesh Patil", "subsidy": 65000,
+     "quantities": {"quantity_battery": 2}}
+"""
+import argparse
+import json
+import math
+import os
+import sys
+
+import documents
+from catalog import get_catalog
+from documents import FULL_RECEIPT, PARTIAL_RECEIPT, QUOTATION
+
+DOCUMENT_ALIASES = {
+    "quotation": QUOTATION,
+    "quotation summary": QUOTATION,
+    "partial": PARTIAL_RECEIPT,
+    "partial proforma receipt": PARTIAL_RECEIPT,
+    "full": FULL_RECEIPT,
+    "full proforma receipt": FULL_RECEIPT,
+}
+
+OUTPUT_FORMATS = ("DOCX", "PDF")
+
+
+def _cell(fields, key, default=""):
+    value = fields.get(key, "")
+    value = "" if value is None or (isinstance(value, float) and math.isnan(value)) else str(value).strip()
+    return value if value else default
+
+
+def _number(fields, key, default=0):
+    value = _cell(fields, key)
+    if not value:
+        return default
+    try:
+        number = float(value.replace(",", ""))
+    except ValueError:
+        raise ValueError(f"{key} must be a number, got {value!r}.")
+    if number < 0 or number != int(number):
+        raise ValueError(f"{key} must be a whole number of 0 or more, got {value!r}.")
+    return int(number)
+
+
+def _strict_digits(fields, key, max_length):
+    # The form silently truncates extra digits; from a sheet or another system
+    # that would hide typos, so keep one extra digit and let validation reject it
+    return documents.digits(_cell(fields, key), max_length + 1)
+
+
+def form_role(fields):
+    """Who filled the form ("role" or "form_filled_by" field); blank if not given."""
+    return _cell(fields, "role", _cell(fields, "form_filled_by"))
+
+
+def build_context(fields, default_document=QUOTATION):
+    """Validate a dict of form fields and return (document type, output filename, context).
+
+    Raises ValueError with the form's error messages.
+    """
+    if isinstance(fields.get("quantities"), dict):
+        fields = {**fields, **fields["quantities"]}
+    kind = DOCUMENT_ALIASES.get(_cell(fields, "document", default_document).lower())
+    if kind is None:
+        raise ValueError(f"Unknown document type {_cell(fields, 'document')!r}.")
+
+    receipt_no = _strict_digits(fields, "receipt_no", 4)
+    phone = _strict_digits(fields, "phone", 10)
+    number_label = "Quotation Number" if kind == QUOTATION else "Receipt Number"
+    documents.validate_numbers(receipt_no, phone, number_label)
+
+    quantities = {item["key"]: _number(fields, item["key"], item["default"]) for item in get_catalog()}
+    common = dict(
+        receipt_no=receipt_no,
+        date=documents.format_date(_cell(fields, "date")),
+        customer_name=_cell(fields, "customer_name"),
+        address=_cell(fields, "address", _cell(fields, "address_line1")),
+        phone=phone,
+        email=_cell(fields, "email"),
+        quantities=quantities,
+    )
+    if kind == QUOTATION:
+        context = documents.quotation_context(subsidy=_number(fields, "subsidy"), form_filled_by=form_role(fields),
+                                              **common)
+    else:
+        delivery = _cell(fields, "delivery_date", _cell(fields, "tentative_delivery"))
+        context = documents.receipt_context(
+            kind,
+            amount_received=_cell(fields, "amount_received"),
+            payment_mode=_cell(fields, "payment_mode", "Cashfree"),
+            reference_id=_cell(fields, "reference_id"),
+            payment_date=documents.format_date(_cell(fields, "payment_date")),
+            balance_due=_cell(fields, "balance_due"),
+            delivery_date=documents.format_date(delivery),
+            **common,
+        )
+    return kind, documents.output_filename(kind, context), context
+
+
+def output_file(kind, context, output_format="DOCX"):
+    """(filename, MIME type) of a rendered document."""
+    from pdf_export import PDF_MIME
+    from rendering import DOCX_MIME
+
+    filename = documents.output_filename(kind, context)
+    if output_format == "PDF":
+        return filename.removesuffix(".docx") + ".pdf", PDF_MIME
+    return filename, DOCX_MIME
+
+
+def submit(kind, context, output_format="DOCX", timeout=None, service=None):
+    """Queue a render on the shared render service and return its RenderJob.
+
+    Raises render_service.RenderServiceBusy when the queue is full.
+    """
+    from render_service import get_render_service
+
+    service = service or get_render_service()
+    if output_format == "PDF":
+        from pdf_export import pdf_key, render_pdf_cached
+
+        return service.submit_cached(pdf_key(kind, context), render_pdf_cached, kind, context, timeout=timeout)
+    return service.render(documents.template_path(kind), context, timeout=timeout)
+
+
+def template_version(kind, output_format="DOCX"):
+    """Version string stored in the ledger for documents rendered now."""
+    if output_format == "PDF":
+        from pdf_export import LAYOUT_VERSION
+
+        return f"pdf-{LAYOUT_VERSION}"
+    from template_cache import template_cache
+
+    return template_cache.version(documents.template_path(kind))
+
+
+def record(kind, context, output_format="DOCX", form_filled_by=""):
+    """Add a generated document to the ledger."""
+    from ledger import get_ledger, make_entry
+
+    get_ledger().record(make_entry(kind, context, output_format, template_version(kind, output_format),
+                                   form_filled_by))
+
+
+def render(fields, output_format="DOCX", default_document=QUOTATION, record_in_ledger=True):
+    """Validate, render and (optionally) record one document; returns (filename, MIME type, bytes)."""
+    kind, _, context = build_context(fields, default_document)
+    data = submit(kind, context, output_format).result()
+    if record_in_ledger:
+        record(kind, context, output_format, form_role(fields))
+    filename, mime = output_file(kind, context, output_format)
+    return filename, mime, data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render one Orbit document from a JSON request.")
+    parser.add_argument("request", help="JSON file with the form fields, or - for stdin")
+    parser.add_argument("-o", "--output", help="file to write (default: the document's usual filename)")
+    parser.add_argument("--format", default="DOCX", type=str.upper, choices=OUTPUT_FORMATS)
+    parser.add_argument("--no-ledger", action="store_true", help="do not record the document in the ledger")
+    args = parser.parse_args(argv)
+
+    with (sys.stdin if args.request == "-" else open(args.request)) as fh:
+        fields = json.load(fh)
+    try:
+        filename, _, data = render(fields, args.format, record_in_ledger=not args.no_ledger)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    output = args.output or filename
+    with open(output, "wb") as fh:
+        fh.write(data)
+    print(f"{len(data)} bytes -> {os.path.abspath(output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""Streaming ZIP export of the documents issued in a date range.
+
+Enumerates the ledger entries for the range and fetches each document through
+the render service, so documents still in the render cache or the shared
+storage are reused. Missing ones are re-rendered from the stored context with
+the current template. ``stream_export`` is a generator of ZIP bytes. A few
+documents ahead are always queued on the render pool while the current one is
+written, so memory holds that window of documents plus a few hundred bytes
+of ZIP directory per entry (the index is spooled to disk), however large the
+archive. Streamlit spools it to a temp file and api.py serves it directly at
+GET /export.
+
+Files keep their usual names (documents.OUTPUT_FILENAMES) in a folder per
+document type. An index.csv lists every entry and any that failed.
+
+Usage:
+    python export.py --from 2026-10-01 --to 2026-10-31 [--kind partial full] [-o receipts.zip]
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from datetime import date, datetime
+
+from documents import FULL_RECEIPT, PARTIAL_RECEIPT, QUOTATION
+
+EXPORT_PREFETCH = int(os.environ.get("ORBIT_EXPORT_PREFETCH", "4"))
+# Bytes handed to the consumer at a time
+CHUNK_SIZE = 256 * 1024
+
+FOLDERS = {QUOTATION: "quotations", PARTIAL_RECEIPT: "partial_receipts", FULL_RECEIPT: "full_receipts"}
+
+
+class _Chunks:
+    """Write-only, unseekable file for ZipFile that collects output until drained."""
+
+    def __init__(self):
+        self._parts = []
+        self.size = 0
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts.clear()
+        self.size = 0
+        return data
+
+
+def _archive_name(entry, names):
+    import engine
+
+    filename, _ = engine.output_file(entry["kind"], json.loads(entry["context"]), entry["output_format"])
+    name = f"{FOLDERS.get(entry['kind'], entry['kind'])}/{filename}"
+    if name in names:
+        # The same number issued twice: keep both, told apart by ledger id
+        stem, ext = os.path.splitext(name)
+        name = f"{stem}_{entry['id']}{ext}"
+    names.add(name)
+    return name
+
+
+def _submit(entry, service, window):
+    """Queue the render for ``entry``; returns a RenderJob or the exception."""
+    import engine
+    from render_service import RenderServiceBusy
+
+    context = json.loads(entry["context"])
+    while True:
+        try:
+            return engine.submit(entry["kind"], context, entry["output_format"], service=service)
+        except RenderServiceBusy:
+            # Other sessions filled the queue; let one of our own renders finish first
+            pending = [job.future for _, job in window if not isinstance(job, Exception) and not job.done()]
+            if pending:
+                wait(pending, timeout=1, return_when=FIRST_COMPLETED)
+            else:
+                time.sleep(0.1)
+        except (ValueError, KeyError) as e:
+            return e
+
+
+def _timestamp(entry):
+    try:
+        return datetime.fromisoformat(entry["created_at"]).timetuple()[:6]
+    except (KeyError, TypeError, ValueError):
+        return time.localtime()[:6]
+
+
+def stream_export(entries, prefetch=EXPORT_PREFETCH, service=None, compression=zipfile.ZIP_STORED,
+                  progress=None):
+    """Yield a ZIP of the documents for ``entries`` (ledger rows) as byte chunks.
+
+    .docx and .pdf files are already compressed, so by default they are
+    stored as they are; ``compression`` applies to them as well. index.csv is
+    always deflated. ``progress(done)`` is called after every document.
+    """
+    from render_service import get_render_service
+
+    service = service or get_render_service()
+    sink = _Chunks()
+    names, window = set(), deque()
+    entries = iter(entries)
+    index = tempfile.SpooledTemporaryFile(max_size=1024 * 1024, mode="w+", newline="", encoding="utf-8")
+    writer = csv.writer(index)
+    writer.writerow(["id", "type", "number", "issued_on", "customer_name", "format", "file", "status"])
+
+    def top_up():
+        while len(window) < max(1, prefetch):
+            entry = next(entries, None)
+            if entry is None:
+                return
+            window.append((entry, _submit(entry, service, window)))
+
+    with zipfile.ZipFile(sink, "w", compression=compression) as archive:
+        top_up()
+        done = 0
+        while window:
+            entry, job = window.popleft()
+            # Keep the pool busy with the next documents while this one is written
+            top_up()
+            name, status = "", "ok"
+            try:
+                if isinstance(job, Exception):
+                    raise job
+                data = job.result()
+            except Exception as e:
+                status = f"failed: {e}"
+            else:
+                name = _archive_name(entry, names)
+                info = zipfile.ZipInfo(name, date_time=_timestamp(entry))
+                info.compress_type = compression
+                info.file_size = len(data)
+                with archive.open(info, "w") as member:
+                    view = memoryview(data)
+                    for start in range(0, len(data), CHUNK_SIZE):
+                        member.write(view[start:start + CHUNK_SIZE])
+                        if sink.size >= CHUNK_SIZE:
+                            yield sink.drain()
+            writer.writerow([entry["id"], entry["kind"], entry["receipt_no"], entry["issued_on"],
+                             entry["customer_name"], entry["output_format"], name, status])
+            done += 1
+            if progress is not None:
+                progress(done)
+            if sink.size:
+                yield sink.drain()
+        index.seek(0)
+        info = zipfile.ZipInfo("index.csv", time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        with index, archive.open(info, "w") as member:
+            for text in iter(lambda: index.read(CHUNK_SIZE), ""):
+                member.write(text.encode("utf-8"))
+                yield sink.drain()
+    yield sink.drain()
+
+
+def export_range(date_from, date_to, kinds=None, ledger=None, **kwargs):
+    """stream_export over the ledger entries issued from ``date_from`` to ``date_to`` (inclusive)."""
+    from ledger import get_ledger
+
+    ledger = ledger or get_ledger()
+    return stream_export(ledger.issued_between(date_from, date_to, kinds), **kwargs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the documents issued in a date range as a ZIP.")
+    parser.add_argument("--from", dest="date_from", required=True, type=date.fromisoformat, help="YYYY-MM-DD")
+    parser.add_argument("--to", dest="date_to", required=True, type=date.fromisoformat, help="YYYY-MM-DD")
+    parser.add_argument("--kind", nargs="+", choices=list(FOLDERS), help="document types (default: all)")
+    parser.add_argument("-o", "--output", default="orbit_export.zip")
+    args = parser.parse_args(argv)
+
+    start, written = time.perf_counter(), 0
+    with open(args.output, "wb") as fh:
+        for chunk in export_range(args.date_from, args.date_to, args.kind):
+            fh.write(chunk)
+            written += len(chunk)
+    with zipfile.ZipFile(args.output) as archive:
+        count = len(archive.namelist()) - 1
+    print(f"{count} documents, {written / 1e6:.1f} MB in {time.perf_counter() - start:.1f}s -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+"""Precompiled fast path for rendering the .docx templates.
+
+docxtpl re-reads the whole package, compiles word/document.xml as a Jinja
+template and re-serializes and re-deflates every part (the letterhead image
+included) on each render, although only the body placeholders change. A
+CompiledTemplate does the context-independent work once:
+
+* the body is patched and compiled to a Jinja template with docxtpl's own
+  helpers, and the rest of word/document.xml is kept as a parsed skeleton;
+* a probe render through docxtpl gives the final, already deflated bytes of
+  every other zip member, which are then copied verbatim.
+
+A render substitutes the placeholders, applies docxtpl's post-processing to
+the body, deflates word/document.xml and writes the zip directly. The result
+is byte-for-byte what docxtpl produces, apart from the zip timestamps
+(benchmarks/bench_fast_template.py checks this with the clock frozen).
+
+Templates with placeholders outside the body (headers, footers, footnotes,
+document properties) and contexts holding anything but plain values are not
+supported; callers fall back to docxtpl for those.
+"""
+import binascii
+import copy
+import io
+import json
+import re
+import struct
+import sys
+import time
+import zipfile
+import zlib
+from types import SimpleNamespace
+
+from docx.opc.oxml import serialize_part_xml
+from docx.oxml.parser import parse_xml
+from docxtpl import DocxTemplate
+from jinja2 import Template
+from lxml import etree
+
+from metrics import span
+
+# Bump when dumps() output changes, so stale stored templates are recompiled
+FORMAT_VERSION = 1
+
+DOCUMENT_MEMBER = "word/document.xml"
+FOOTNOTES_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.footnotes+xml"
+_W_NS = {"w": "http://schemas.openxmlformats.org/wordprocessingml/2006/main"}
+_PLAIN_TYPES = (str, int, float, bool, type(None))
+_JINJA_SYNTAX = re.compile(r"\{[{%#]")
+
+# Zip record layouts, as written by the zipfile module
+_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+_CENTRAL_HEADER = struct.Struct("<4s4B4HL2L5H2L")
+_END_RECORD = struct.Struct("<4s4H2LH")
+_VERSION = 20
+_CREATE_SYSTEM = 0 if sys.platform == "win32" else 3
+_EXTERNAL_ATTR = 0o600 << 16
+
+
+class UnsupportedTemplate(ValueError):
+    """The template or context needs the full docxtpl render."""
+
+
+class _Member:
+    __slots__ = ("name", "flags", "method", "crc", "compressed", "size")
+
+    def __init__(self, name, flags, method, crc, compressed, size):
+        self.name = name
+        self.flags = flags
+        self.method = method
+        self.crc = crc
+        self.compressed = compressed
+        self.size = size
+
+
+def _deflate(data):
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _dos_datetime(date_time):
+    year, month, day, hour, minute, second = date_time
+    return (hour << 11) | (minute << 5) | (second // 2), ((year - 1980) << 9) | (month << 5) | day
+
+
+def _write_zip(members, date_time=None):
+    dostime, dosdate = _dos_datetime(date_time or time.localtime(time.time())[:6])
+    out = io.BytesIO()
+    central = []
+    for m in members:
+        offset = out.tell()
+        out.write(_LOCAL_HEADER.pack(b"PK\003\004", _VERSION, 0, m.flags, m.method, dostime, dosdate,
+                                     m.crc, len(m.compressed), m.size, len(m.name), 0))
+        out.write(m.name)
+        out.write(m.compressed)
+        central.append(_CENTRAL_HEADER.pack(b"PK\001\002", _VERSION, _CREATE_SYSTEM, _VERSION, 0, m.flags,
+                                            m.method, dostime, dosdate, m.crc, len(m.compressed), m.size,
+                                            len(m.name), 0, 0, 0, 0, _EXTERNAL_ATTR, offset) + m.name)
+    start = out.tell()
+    for record in central:
+        out.write(record)
+    out.write(_END_RECORD.pack(b"PK\005\006", 0, 0, len(central), len(central), out.tell() - start, start, 0))
+    return out.getvalue()
+
+
+def _has_placeholders(text):
+    return bool(text) and _JINJA_SYNTAX.search(text) is not None
+
+
+class CompiledTemplate:
+    """A .docx template prepared for fast repeated rendering (see module docstring)."""
+
+    def __init__(self, data):
+        doc = DocxTemplate(io.BytesIO(data))
+        doc.render_init()
+        self._check_supported(doc)
+
+        # Body: exactly the Jinja source docxtpl builds in render_xml_part
+        body_source = re.sub(r"<w:p([ >])", r"\n<w:p\1", doc.patch_xml(doc.get_xml()))
+
+        # Document element without its body; each render inserts a fresh body
+        skeleton = parse_xml(doc.docx.part.blob)
+        body_index = skeleton.index(skeleton.body)
+        skeleton.remove(skeleton.body)
+
+        # docxtpl only re-renders footnotes when the rendered body still has a
+        # section, which a value with unescaped markup can break; keep the
+        # untouched parts for that case
+        unrendered = {part.partname.lstrip("/").encode("utf-8"): part.blob
+                      for part in doc.docx.part.package.parts if part.content_type == FOOTNOTES_TYPE}
+
+        # Every other member exactly as docxtpl writes it
+        probe = DocxTemplate(io.BytesIO(data))
+        probe.render({})
+        buffer = io.BytesIO()
+        probe.save(buffer)
+        members = []
+        with zipfile.ZipFile(buffer) as archive:
+            for info in archive.infolist():
+                if info.filename == DOCUMENT_MEMBER:
+                    members.append(_Member(info.filename.encode("utf-8"), info.flag_bits,
+                                           info.compress_type, 0, b"", 0))
+                    continue
+                with archive.open(info) as member:
+                    member.read()  # validates the CRC
+                raw_offset = info.header_offset + _LOCAL_HEADER.size + len(info.orig_filename.encode("utf-8"))
+                raw = buffer.getbuffer()[raw_offset:raw_offset + info.compress_size].tobytes()
+                members.append(_Member(info.filename.encode("utf-8"), info.flag_bits,
+                                       info.compress_type, info.CRC, raw, info.file_size))
+        self._setup(body_source, skeleton, body_index, members, unrendered)
+
+    def _setup(self, body_source, skeleton, body_index, members, unrendered):
+        self._body_source = body_source
+        self._body = Template(body_source)
+        self._skeleton = skeleton
+        self._body_index = body_index
+        self._members = members
+        self._document = next(m for m in members if m.name == DOCUMENT_MEMBER.encode("utf-8"))
+        self._unrendered = unrendered
+        self._without_section = [
+            _Member(m.name, m.flags, m.method, binascii.crc32(unrendered[m.name]),
+                    _deflate(unrendered[m.name]), len(unrendered[m.name]))
+            if m.name in unrendered else m
+            for m in members
+        ]
+
+    def dumps(self):
+        """Serialize for storage.py, so other processes can skip compiling."""
+        blobs = [self._body_source.encode("utf-8"), etree.tostring(self._skeleton)]
+        blobs += [m.compressed for m in self._members] + list(self._unrendered.values())
+        header = json.dumps({
+            "format": FORMAT_VERSION,
+            "body_index": self._body_index,
+            "members": [[m.name.decode("utf-8"), m.flags, m.method, m.crc, m.size] for m in self._members],
+            "unrendered": [name.decode("utf-8") for name in self._unrendered],
+            "lengths": [len(blob) for blob in blobs],
+        }).encode("utf-8")
+        return b"".join([struct.pack("<L", len(header)), header] + blobs)
+
+    @classmethod
+    def loads(cls, data):
+        """Inverse of dumps(); raises ValueError for data from another format version."""
+        (header_length,) = struct.unpack_from("<L", data)
+        header = json.loads(data[4:4 + header_length])
+        if header.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Compiled template format {header.get('format')!r}, expected {FORMAT_VERSION}")
+        blobs, offset = [], 4 + header_length
+        for length in header["lengths"]:
+            blobs.append(bytes(data[offset:offset + length]))
+            offset += length
+        body_source, skeleton = blobs[0].decode("utf-8"), parse_xml(blobs[1])
+        compressed = blobs[2:2 + len(header["members"])]
+        members = [_Member(name.encode("utf-8"), flags, method, crc, raw, size)
+                   for (name, flags, method, crc, size), raw in zip(header["members"], compressed)]
+        unrendered = {name.encode("utf-8"): blob
+                      for name, blob in zip(header["unrendered"], blobs[2 + len(members):])}
+        template = cls.__new__(cls)
+        template._setup(body_source, skeleton, header["body_index"], members, unrendered)
+        return template
+
+    @staticmethod
+    def _check_supported(doc):
+        for uri in (doc.HEADER_URI, doc.FOOTER_URI):
+            for _, part in doc.get_headers_footers(uri):
+                if _has_placeholders(doc.patch_xml(doc.get_part_xml(part))):
+                    raise UnsupportedTemplate(f"{part.partname} has placeholders")
+        for part in doc.docx.part.package.parts:
+            if part.content_type == FOOTNOTES_TYPE and _has_placeholders(part.blob.decode("utf-8")):
+                raise UnsupportedTemplate(f"{part.partname} has placeholders")
+        for prop in ("author", "comments", "identifier", "language", "subject", "title"):
+            if _has_placeholders(getattr(doc.docx.core_properties, prop)):
+                raise UnsupportedTemplate(f"document property {prop} has placeholders")
+
+    def _document_xml(self, context):
+        # docxtpl's helpers below only keep state in docx_ids_index
+        helpers = SimpleNamespace(docx_ids_index=1000)
+        with span("docx_render"):
+            xml = self._body.render(context)
+            # Same post-processing as DocxTemplate.render_xml_part/render
+            xml = re.sub(r"\n<w:p([ >])", r"<w:p\1", xml)
+            xml = xml.replace("{_{", "{{").replace("}_}", "}}").replace("{_%", "{%").replace("%_}", "%}")
+            xml = DocxTemplate.resolve_listing(helpers, xml)
+            tree = DocxTemplate.fix_tables(helpers, xml)
+            DocxTemplate.fix_docpr_ids(helpers, tree)
+            has_section = bool(tree.xpath("./w:p/w:pPr/w:sectPr | ./w:sectPr", namespaces=_W_NS))
+            root = copy.deepcopy(self._skeleton)
+            root.insert(self._body_index, tree)
+            return serialize_part_xml(root), has_section
+
+    def render(self, context, date_time=None):
+        """Return the rendered .docx bytes; ``date_time`` fixes the zip timestamps."""
+        if any(not isinstance(value, _PLAIN_TYPES) for value in context.values()):
+            raise UnsupportedTemplate("context has rich values")
+        data, has_section = self._document_xml(context)
+        with span("docx_save"):
+            document = _Member(self._document.name, self._document.flags, self._document.method,
+                               binascii.crc32(data), _deflate(data), len(data))
+            members = self._members if has_section else self._without_section
+            return _write_zip([document if m is self._document else m for m in members], date_time)
@@ -0,0 +1,325 @@
+"""Persistent record of every generated quotation and receipt (SQLite, WAL mode).
+
+Each document is stored with its customer, quantities, subsidy, totals,
+template version and the full render context, so it can be looked up by
+number, phone or date and re-rendered later. Writes are buffered and inserted
+in batches by a background thread; reads flush the buffer first so a session
+always sees its own documents.
+"""
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+
+from documents import DATE_FORMAT, QUOTATION, bill_summary, financial_year
+
+LEDGER_PATH = os.environ.get(
+    "ORBIT_LEDGER", os.path.join(os.path.dirname(os.path.abspath(__file__)), "orbit_ledger.sqlite3")
+)
+
+# Quotations and receipts are numbered separately; partial and full receipts
+# share the Orbit_Agritech_Proforma_Receipt_{year}_{receipt_no} series. Each series
+# starts again from 0001 every financial year (April to March).
+QUOTATION_SERIES = "quotation"
+RECEIPT_SERIES = "receipt"
+SERIES = (QUOTATION_SERIES, RECEIPT_SERIES)
+MAX_NUMBER = 9999
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    series TEXT NOT NULL,
+    receipt_no TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    issued_on TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    customer_name TEXT,
+    phone TEXT,
+    form_filled_by TEXT,
+    quantities TEXT NOT NULL,
+    subsidy INTEGER,
+    total_price INTEGER,
+    final_price INTEGER,
+    output_format TEXT NOT NULL,
+    template_version TEXT,
+    context TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_documents_series_number ON documents (series, number);
+CREATE INDEX IF NOT EXISTS idx_documents_phone ON documents (phone);
+CREATE INDEX IF NOT EXISTS idx_documents_issued_on ON documents (issued_on);
+CREATE TABLE IF NOT EXISTS counters (
+    series TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+_COLUMNS = ("kind", "series", "receipt_no", "number", "issued_on", "created_at", "customer_name", "phone",
+            "form_filled_by", "quantities", "subsidy", "total_price", "final_price", "output_format",
+            "template_version", "context")
+_INSERT = f"INSERT INTO documents ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})"
+
+
+class NumbersExhausted(RuntimeError):
+    """Every number of a series has been issued in the current financial year."""
+
+
+def series_for(kind):
+    return QUOTATION_SERIES if kind == QUOTATION else RECEIPT_SERIES
+
+
+def _iso_date(value):
+    try:
+        return datetime.strptime(value, DATE_FORMAT).date().isoformat()
+    except (TypeError, ValueError):
+        return datetime.today().date().isoformat()
+
+
+def _parse_amount(value):
+    # "Rs 1,23,000" -> 123000
+    digits = "".join(ch for ch in str(value) if ch.isdigit())
+    return int(digits) if digits else None
+
+
+def make_entry(kind, context, output_format="DOCX", template_version=None, form_filled_by=""):
+    """Build a ledger row from a render context."""
+    quantities = {k: v for k, v in context.items() if k.startswith("quantity_")}
+    total_price, _ = bill_summary(quantities)
+    is_quotation = kind == QUOTATION
+    return (
+        kind,
+        series_for(kind),
+        context["receipt_no"],
+        int(context["receipt_no"]),
+        _iso_date(context.get("date")),
+        datetime.now().isoformat(timespec="seconds"),
+        context.get("customer_name", ""),
+        context.get("phone", ""),
+        form_filled_by,
+        json.dumps(quantities, sort_keys=True),
+        _parse_amount(context.get("subsidy")) if is_quotation else None,
+        total_price,
+        _parse_amount(context.get("final_price")) if is_quotation else None,
+        output_format,
+        template_version,
+        json.dumps(context, sort_keys=True, default=str, ensure_ascii=False),
+    )
+
+
+class Ledger:
+    def __init__(self, path=LEDGER_PATH, batch_size=200, flush_interval=0.5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._flusher = None
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        conn.commit()
+        atexit.register(self.flush)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    # -- writes -----------------------------------------------------------
+
+    def record(self, entry):
+        """Queue one entry (see make_entry); it is inserted with the next batch."""
+        with self._pending_lock:
+            self._pending.append(entry)
+            full = len(self._pending) >= self.batch_size
+        self._ensure_flusher()
+        if full:
+            self._wake.set()
+
+    def record_many(self, entries):
+        """Insert many entries at once in a single transaction."""
+        self.flush()
+        self._insert(list(entries))
+
+    def flush(self):
+        with self._flush_lock:
+            with self._pending_lock:
+                batch, self._pending = self._pending, []
+            try:
+                self._insert(batch)
+            except BaseException:
+                # Keep the entries for the next attempt rather than losing them
+                with self._pending_lock:
+                    self._pending[:0] = batch
+                raise
+
+    def _insert(self, batch):
+        if not batch:
+            return
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(_INSERT, batch)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _ensure_flusher(self):
+        if self._flusher is None:
+            with self._pending_lock:
+                if self._flusher is None:
+                    self._flusher = threading.Thread(target=self._flush_loop, name="orbit-ledger", daemon=True)
+                    self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except sqlite3.Error:
+                time.sleep(self.flush_interval)
+
+    def next_number(self, series, day=None):
+        """Atomically allocate the next free 4-digit number in ``series`` for the year of ``day``.
+
+        Safe across sessions and processes: the counter is bumped inside an
+        IMMEDIATE transaction and never hands out a number already issued in
+        the same financial year. Raises NumbersExhausted after 9999 in a year.
+        """
+        first, last, label = financial_year(day or date.today())
+        counter = f"{series}/{label}"
+        self.flush()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value FROM counters WHERE series = ?", (counter,)).fetchone()
+            issued = conn.execute(
+                "SELECT MAX(number) FROM documents WHERE series = ? AND issued_on BETWEEN ? AND ?",
+                (series, first.isoformat(), last.isoformat()),
+            ).fetchone()[0]
+            number = max(row["value"] if row else 0, issued or 0) + 1
+            if number > MAX_NUMBER:
+                raise NumbersExhausted(f"All {MAX_NUMBER} {series} numbers for {label} have been used.")
+            conn.execute(
+                "INSERT INTO counters (series, value) VALUES (?, ?) "
+                "ON CONFLICT(series) DO UPDATE SET value = excluded.value",
+                (counter, number),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return f"{number:04d}"
+
+    # -- reads ------------------------------------------------------------
+
+    def _query(self, sql, params=()):
+        self.flush()
+        return [dict(row) for row in self._connect().execute(sql, params)]
+
+    def find_number(self, kind, receipt_no, issued_on=None):
+        """Earlier documents with the same number in ``kind``'s series and financial year.
+
+        ``issued_on`` is the document date as entered on the form (DD/MM/YYYY), today if not given.
+        """
+        first, last, _ = financial_year(date.fromisoformat(_iso_date(issued_on)))
+        return self._query(
+            "SELECT * FROM documents WHERE series = ? AND number = ? AND issued_on BETWEEN ? AND ? "
+            "ORDER BY id DESC",
+            (series_for(kind), int(receipt_no), first.isoformat(), last.isoformat()),
+        )
+
+    def search(self, receipt_no=None, phone=None, date_from=None, date_to=None, kind=None, limit=200):
+        """Most recent documents matching all given filters (dates are datetime.date)."""
+        clauses, params = [], []
+        if receipt_no:
+            # Match on the numeric value so "42" finds "0042"; naming the
+            # series lets the (series, number) index serve the lookup
+            series = [series_for(kind)] if kind else list(SERIES)
+            clauses.append(f"series IN ({', '.join('?' * len(series))}) AND number = ?")
+            params += [*series, int(receipt_no)]
+        if phone:
+            clauses.append("phone = ?")
+            params.append(phone)
+        if date_from:
+            clauses.append("issued_on >= ?")
+            params.append(date_from.isoformat())
+        if date_to:
+            clauses.append("issued_on <= ?")
+            params.append(date_to.isoformat())
+        if kind:
+            clauses.append("kind = ?")
+            params.append(kind)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self._query(f"SELECT * FROM documents {where} ORDER BY id DESC LIMIT ?", (*params, limit))
+
+    def issued_between(self, date_from, date_to, kinds=None, chunk_size=500):
+        """Documents issued from ``date_from`` to ``date_to`` (inclusive), oldest first, one at a time.
+
+        Rows are read ``chunk_size`` at a time, each page by its own query
+        continuing after the last (issued_on, id) seen. No cursor is held
+        between pages, so the generator can be resumed from any thread (a
+        StreamingResponse moves between pool threads); each page runs on that
+        thread's own connection.
+        """
+        sql = "SELECT * FROM documents WHERE issued_on >= ? AND issued_on <= ?"
+        params = [date_from.isoformat(), date_to.isoformat()]
+        if kinds:
+            sql += f" AND kind IN ({', '.join('?' * len(kinds))})"
+            params += list(kinds)
+        sql += " AND (issued_on, id) > (?, ?) ORDER BY issued_on, id LIMIT ?"
+        after = ("", 0)
+        while True:
+            rows = self._query(sql, (*params, *after, chunk_size))
+            yield from rows
+            if len(rows) < chunk_size:
+                return
+            after = (rows[-1]["issued_on"], rows[-1]["id"])
+
+    def quotations(self, chunk_size=100000):
+        """Every quotation, oldest first, in lists of up to ``chunk_size`` rows (for pricing.py).
+
+        Paged by id like issued_between, so no cursor is held between lists.
+        """
+        self.flush()
+        after = 0
+        while True:
+            rows = self._connect().execute(
+                "SELECT id, receipt_no, issued_on, form_filled_by, quantities, subsidy FROM documents "
+                "WHERE kind = ? AND id > ? ORDER BY id LIMIT ?", (QUOTATION, after, chunk_size)).fetchall()
+            if not rows:
+                return
+            yield rows
+            after = rows[-1]["id"]
+
+    def get(self, document_id):
+        rows = self._query("SELECT * FROM documents WHERE id = ?", (document_id,))
+        return rows[0] if rows else None
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def get_ledger():
+    """Process-wide Ledger at LEDGER_PATH."""
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = Ledger()
+        return _ledger
@@ -0,0 +1,251 @@
+"""Always-on timing spans and counters for document generation, in Prometheus format.
+
+Spans go into fixed-bucket histograms, so recording one is a perf_counter call
+and a few additions under a lock. ``prometheus_text()`` renders everything,
+including the render service and cache statistics, in the Prometheus text
+exposition format; ``start_metrics_server()`` serves it on localhost for the
+Streamlit process and api.py serves it at /metrics.
+
+A single render can also be profiled on request (``profile_next_render()``),
+with pyinstrument when it is installed and cProfile otherwise.
+"""
+import bisect
+import functools
+import io
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_HOST = os.environ.get("ORBIT_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("ORBIT_METRICS_PORT", "9464"))
+
+PROMETHEUS_MIME = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; generation steps range from microseconds (context build) to seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_logger = logging.getLogger(__name__)
+_lock = threading.Lock()
+_spans = {}  # span name -> _Histogram
+_documents = {}  # (kind, role, format) -> count
+_server = None
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation (None if empty)."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, n in zip(BUCKETS + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+def observe(name, seconds):
+    index = bisect.bisect_left(BUCKETS, seconds)
+    with _lock:
+        histogram = _spans.get(name)
+        if histogram is None:
+            histogram = _spans[name] = _Histogram()
+        histogram.counts[index] += 1
+        histogram.total += seconds
+        histogram.count += 1
+
+
+@contextmanager
+def span(name):
+    """Time the enclosed block into the ``name`` histogram."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+def timed(name):
+    """Decorator form of span()."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count_document(kind, output_format, role=""):
+    key = (kind, role or "none", output_format)
+    with _lock:
+        _documents[key] = _documents.get(key, 0) + 1
+
+
+def snapshot():
+    """Copy of the span histograms and document counters."""
+    with _lock:
+        spans = {}
+        for name, h in _spans.items():
+            copy = _Histogram()
+            copy.counts, copy.total, copy.count = list(h.counts), h.total, h.count
+            spans[name] = copy
+        return spans, dict(_documents)
+
+
+def reset():
+    with _lock:
+        _spans.clear()
+        _documents.clear()
+
+
+# -- profiling ----------------------------------------------------------------
+
+_profile_armed = threading.Event()
+last_profile = {}
+
+
+def profile_next_render():
+    """Profile the next render that runs in this process (one-shot)."""
+    _profile_armed.set()
+
+
+def profiled(fn, *args, label=""):
+    """Call ``fn(*args)``, under a profiler if one was requested."""
+    if not _profile_armed.is_set():
+        return fn(*args)
+    _profile_armed.clear()
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        Profiler = None
+
+    start = time.perf_counter()
+    if Profiler is not None:
+        profiler = Profiler()
+        profiler.start()
+        try:
+            return fn(*args)
+        finally:
+            profiler.stop()
+            _store_profile(label, start, "pyinstrument", profiler.output_text(unicode=True))
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(fn, *args)
+    finally:
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(40)
+        _store_profile(label, start, "cProfile", out.getvalue())
+
+
+def _store_profile(label, start, tool, text):
+    last_profile.clear()
+    last_profile.update(label=label, tool=tool, seconds=time.perf_counter() - start,
+                        captured_at=time.strftime("%Y-%m-%d %H:%M:%S"), text=text)
+
+
+# -- Prometheus exposition ----------------------------------------------------
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _bound(value):
+    return "+Inf" if value == float("inf") else repr(value)
+
+
+def prometheus_text():
+    spans, documents = snapshot()
+    lines = [
+        "# HELP orbit_span_seconds Time spent in each step of document generation.",
+        "# TYPE orbit_span_seconds histogram",
+    ]
+    for name, h in sorted(spans.items()):
+        cumulative = 0
+        for bound, n in zip(BUCKETS + (float("inf"),), h.counts):
+            cumulative += n
+            lines.append(f"orbit_span_seconds_bucket{_labels(span=name, le=_bound(bound))} {cumulative}")
+        lines.append(f"orbit_span_seconds_sum{_labels(span=name)} {h.total}")
+        lines.append(f"orbit_span_seconds_count{_labels(span=name)} {h.count}")
+
+    lines += [
+        "# HELP orbit_documents_generated_total Documents generated by type, role and format.",
+        "# TYPE orbit_documents_generated_total counter",
+    ]
+    for (kind, role, output_format), n in sorted(documents.items()):
+        lines.append(f"orbit_documents_generated_total{_labels(kind=kind, role=role, format=output_format)} {n}")
+
+    # Only report components this process has actually started
+    service = getattr(sys.modules.get("render_service"), "_service", None)
+    if service is not None:
+        stats = service.metrics()
+        cache = stats.pop("cache")
+        for key in ("queue_depth", "running", "workers", "queue_capacity"):
+            lines += [f"# TYPE orbit_render_{key} gauge", f"orbit_render_{key} {stats[key]}"]
+        for key in ("completed", "failed", "rejected", "timed_out"):
+            lines += [f"# TYPE orbit_render_jobs_{key}_total counter", f"orbit_render_jobs_{key}_total {stats[key]}"]
+        for key in ("entries", "bytes", "max_bytes"):
+            lines += [f"# TYPE orbit_render_cache_{key} gauge", f"orbit_render_cache_{key} {cache[key]}"]
+        for key in ("hits", "misses", "evictions", "expirations"):
+            lines += [f"# TYPE orbit_render_cache_{key}_total counter", f"orbit_render_cache_{key}_total {cache[key]}"]
+    templates = getattr(sys.modules.get("template_cache"), "template_cache", None)
+    if templates is not None:
+        lines += [
+            "# TYPE orbit_template_cache_hits_total counter", f"orbit_template_cache_hits_total {templates.hits}",
+            "# TYPE orbit_template_cache_misses_total counter", f"orbit_template_cache_misses_total {templates.misses}",
+        ]
+    storage = getattr(sys.modules.get("storage"), "_storage", None)
+    if storage is not None:
+        for key in ("hits", "misses"):
+            lines += [f"# TYPE orbit_storage_{key}_total counter", f"orbit_storage_{key}_total {getattr(storage, key)}"]
+    return "\n".join(lines) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", PROMETHEUS_MIME)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """Serve /metrics on a daemon thread once per process; port 0 disables it."""
+    global _server
+    with _lock:
+        if _server is not None or not port:
+            return _server
+        try:
+            _server = ThreadingHTTPServer((host, port), _Handler)
+        except OSError as e:
+            # Another server process on this box already exports its metrics there
+            _logger.warning("Metrics endpoint not started on %s:%s: %s", host, port, e)
+            return None
+        threading.Thread(target=_server.serve_forever, name="orbit-metrics", daemon=True).start()
+        return _server
@@ -0,0 +1,267 @@
+"""Native PDF versions of the quotation and proforma receipts, built with reportlab.
+
+docx2pdf needs Microsoft Word, so on our Linux servers the PDFs are laid out
+directly from the same context dicts the .docx templates use, on top of the
+letterhead image (its optimized copy, see assets.py). Finished PDFs are stored
+in a content-addressed cache keyed by the context hash, so an identical
+document is only ever rendered once.
+"""
+import io
+import os
+import threading
+import time
+from xml.sax.saxutils import escape
+
+from catalog import get_catalog
+from documents import FULL_RECEIPT, PARTIAL_RECEIPT, QUOTATION, context_hash, document_year
+from metrics import timed
+from storage import FileStorage
+
+PDF_MIME = "application/pdf"
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+LETTERHEAD_PATH = os.path.join(_HERE, "letterpad design-01.jpg")
+PDF_CACHE_DIR = os.environ.get("ORBIT_PDF_CACHE", os.path.join(_HERE, ".cache", "pdf"))
+PDF_CACHE_BYTES = int(float(os.environ.get("ORBIT_PDF_CACHE_MB", "512")) * 1024 * 1024)
+PDF_CACHE_TTL = float(os.environ.get("ORBIT_PDF_CACHE_TTL", str(7 * 24 * 3600)))
+
+# Bump when the layout below changes so cached PDFs are not reused
+LAYOUT_VERSION = "2"
+
+TITLES = {
+    QUOTATION: "Quotation Summary",
+    PARTIAL_RECEIPT: "Proforma Receipt",
+    FULL_RECEIPT: "Proforma Receipt",
+}
+
+GST_NUMBER = "27AAHCH1976Q1ZS"
+
+# Receipt text that is fixed in the .docx templates
+TOWARDS = {
+    PARTIAL_RECEIPT: "Advance booking for Orbit PT Pro Electric Power Tiller",
+    FULL_RECEIPT: "Full Payment for Orbit PT Pro Electric Power Tiller",
+}
+ACKNOWLEDGEMENT = {
+    PARTIAL_RECEIPT: (
+        "We acknowledge receipt of the above-mentioned amount as advance towards booking of the "
+        "Orbit PT Pro Electric Power Tiller. This receipt confirms the reservation of your machine. "
+        "The final invoice will be issued at the time of full payment and delivery."
+    ),
+    FULL_RECEIPT: (
+        "We acknowledge receipt of the above-mentioned amount as the final installment towards booking "
+        "of the Orbit PT Pro Electric Power Tiller. This receipt confirms the reservation of your machine. "
+        "The final invoice will be issued 1 week after full payment and delivery."
+    ),
+}
+
+_letterhead = None
+_letterhead_lock = threading.Lock()
+
+
+def _letterhead_image():
+    # Decode the letterhead once per process
+    global _letterhead
+    with _letterhead_lock:
+        if _letterhead is None:
+            from reportlab.lib.utils import ImageReader
+
+            from assets import optimized_letterhead
+
+            _letterhead = ImageReader(io.BytesIO(optimized_letterhead(LETTERHEAD_PATH)))
+        return _letterhead
+
+
+def _styles():
+    from reportlab.lib.enums import TA_CENTER
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+
+    base = getSampleStyleSheet()
+    return {
+        "title": ParagraphStyle("title", parent=base["Title"], fontSize=16, spaceAfter=10, alignment=TA_CENTER),
+        "heading": ParagraphStyle("heading", parent=base["Normal"], fontName="Helvetica-Bold",
+                                  fontSize=11, spaceBefore=8, spaceAfter=3),
+        "body": ParagraphStyle("body", parent=base["Normal"], fontSize=10.5, leading=15),
+    }
+
+
+def _field(styles, label, value):
+    from reportlab.platypus import Paragraph
+
+    return Paragraph(f"<b>{escape(label)}:</b> {escape(str(value))}", styles["body"])
+
+
+def _items_table(context):
+    from reportlab.lib import colors
+    from reportlab.platypus import Table, TableStyle
+
+    rows = [["Item Name", "Quantity"]]
+    rows += [[item["name"], str(context.get(item["key"], 0))] for item in get_catalog()]
+    table = Table(rows, colWidths=[300, 90], hAlign="LEFT", repeatRows=1)
+    table.setStyle(TableStyle([
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTSIZE", (0, 0), (-1, -1), 10),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#E2EFD9")),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+        ("ALIGN", (1, 0), (1, -1), "CENTER"),
+        ("TOPPADDING", (0, 0), (-1, -1), 3),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 3),
+    ]))
+    return table
+
+
+def _story(kind, context, styles):
+    from reportlab.platypus import Paragraph, Spacer, Table
+
+    number_label = "Quotation No" if kind == QUOTATION else "Receipt No"
+    header = Table(
+        [[_field(styles, number_label, f"ORBIT/{document_year(context)}/1/{context.get('receipt_no', '')}"),
+          _field(styles, "Date", context.get("date", ""))]],
+        colWidths=[300, 130], hAlign="LEFT",
+    )
+    header.setStyle([("LEFTPADDING", (0, 0), (-1, -1), 0)])
+    story = [Paragraph(TITLES[kind], styles["title"]), header, Spacer(1, 6)]
+
+    if kind != QUOTATION:
+        story.append(Paragraph("Received from:", styles["heading"]))
+    story += [
+        _field(styles, "Customer Name", context.get("customer_name", "")),
+        _field(styles, "Address", context.get("address_line1", "")),
+        _field(styles, "Phone Number", context.get("phone", "")),
+        _field(styles, "Email (if available)", context.get("email", "")),
+    ]
+
+    if kind == QUOTATION:
+        story += [
+            Paragraph("Quotation Details:", styles["heading"]),
+            _items_table(context),
+            Spacer(1, 8),
+            _field(styles, "Total Price", context.get("total_price", "")),
+            _field(styles, "Subsidy Applied", context.get("subsidy", "")),
+            _field(styles, "Subsidised Price (All Inclusive)", context.get("final_price", "")),
+        ]
+    else:
+        balance = context.get("balance_due", "") if kind == PARTIAL_RECEIPT else "0"
+        delivery_label = "Tentative delivery date" if kind == PARTIAL_RECEIPT else "Delivery date"
+        delivery = context.get("tentative_delivery" if kind == PARTIAL_RECEIPT else "delivery_date", "")
+        story += [
+            Paragraph("Payment Details:", styles["heading"]),
+            # The base PDF fonts have no rupee glyph
+            _field(styles, "Amount Received", f"Rs {context.get('amount_received', '')}/-"),
+            _field(styles, "Payment Mode", context.get("payment_mode", "")),
+            _field(styles, "Reference ID (if available)", context.get("reference_id", "")),
+            _field(styles, "Date of Payment", context.get("payment_date", "")),
+            Paragraph("Towards:", styles["heading"]),
+            Paragraph(TOWARDS[kind], styles["body"]),
+            Paragraph(f"Balance amount of Rs {escape(str(balance))}/- to be paid before delivery.", styles["body"]),
+            _field(styles, delivery_label, delivery),
+            Paragraph("Acknowledgement:", styles["heading"]),
+            Paragraph(ACKNOWLEDGEMENT[kind], styles["body"]),
+            Paragraph("Annexure", styles["heading"]),
+            _items_table(context),
+        ]
+
+    story += [
+        Spacer(1, 30),
+        Paragraph("<b>Authorised Signatory</b>", styles["body"]),
+        Paragraph("For Higher Orbit Agritech Pvt. Ltd.", styles["body"]),
+    ]
+    if kind != QUOTATION:
+        story.append(Paragraph(f"GST: {GST_NUMBER}", styles["body"]))
+    return story
+
+
+@timed("pdf_render")
+def render_pdf(kind, context):
+    """Lay out ``kind`` ("quotation", "partial" or "full") with ``context`` and return PDF bytes."""
+    from reportlab import rl_config
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate
+
+    # Binary streams: ASCII85-encoding the 400 KB letterhead in pure Python
+    # would otherwise dominate the render time
+    rl_config.useA85 = 0
+
+    page_width, page_height = A4
+    letterhead = _letterhead_image()
+
+    def draw_letterhead(canvas, doc):
+        # Same placement as the anchored header image in the .docx templates
+        canvas.drawImage(letterhead, 0, page_height - 7.2 - 834.2, width=594.6, height=834.2)
+
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buffer, pagesize=A4, leftMargin=90, rightMargin=72, topMargin=140, bottomMargin=80,
+        title=f"{TITLES[kind]} {context.get('receipt_no', '')}", author="Higher Orbit Agritech Pvt. Ltd.",
+    )
+    doc.build(_story(kind, context, _styles()), onFirstPage=draw_letterhead, onLaterPages=draw_letterhead)
+    return buffer.getvalue()
+
+
+def pdf_key(kind, context):
+    """Content hash of a PDF: document type, layout, catalog and letterhead version, and context."""
+    from assets import asset_tag
+
+    # Item names in the annexure table come from the catalog
+    return context_hash(f"pdf:{kind}", f"{LAYOUT_VERSION}:{get_catalog().version}:{asset_tag()}", context)
+
+
+class PdfCache(FileStorage):
+    """Content-addressed store of rendered PDFs: ``<sha256 of pdf_key>.pdf``.
+
+    Files unused for ``ttl`` seconds expire (a hit refreshes the mtime), and
+    the directory is kept under ``max_bytes`` by deleting the least recently
+    used files. The sweep also runs after every eighth of ``max_bytes``
+    written, so several processes can share the directory.
+    """
+
+    suffix = ".pdf"
+
+    def __init__(self, directory=PDF_CACHE_DIR, max_bytes=PDF_CACHE_BYTES, ttl=PDF_CACHE_TTL, clock=time.time):
+        super().__init__(directory, ttl=ttl, clock=clock)
+        self.max_bytes = max_bytes
+        self._written = 0
+        self._written_lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        data = super().get(key)
+        if data is not None:
+            # Mark as recently used for the sweep
+            now = self._clock()
+            try:
+                os.utime(self._path(key), (now, now))
+            except FileNotFoundError:
+                pass
+        return data
+
+    def put(self, key, data):
+        super().put(key, data)
+        with self._written_lock:
+            self._written += len(data)
+            due = self._written >= self.max_bytes // 8
+            if due:
+                self._written = 0
+        if due:
+            self.sweep()
+
+    def _trim(self, entries):
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self.evictions += self._remove(path)
+            total -= size
+
+    def stats(self):
+        return dict(super().stats(), evictions=self.evictions)
+
+    def render(self, kind, context):
+        """Return the PDF for ``kind``/``context``, rendering it only on a cache miss."""
+        return self.get_or_create(pdf_key(kind, context), render_pdf, kind, context)
+
+
+pdf_cache = PdfCache()
+
+
+def render_pdf_cached(kind, context):
+    return pdf_cache.render(kind, context)
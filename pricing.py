@@ -0,0 +1,400 @@
+"""Vectorized quote pricing: totals, subsidy caps and final prices for many quotes at once.
+
+A PriceBook holds the catalog prices and the SUBSIDY_CAPS table as arrays,
+optionally with what-if overrides, and prices a whole matrix of quote
+quantities (one row per quote, one column per catalog item) with a role code
+per row in a single pass. quotation_context and the quotation page's running
+total price their one quote through the same book, and max_subsidy reads the
+same cap table.
+
+Scenario comparisons over the quote history in the ledger (or a CSV/XLSX
+sheet with the batch columns) are exported to XLSX:
+
+Usage:
+    python pricing.py [--input quotes.csv] [-o scenarios.xlsx]
+                      [--price quantity_pt_pro=118000] [--cap Manager=90000]
+                      [--scenarios scenarios.json]
+
+--cap ROLE=AMOUNT sets both caps, ROLE=SINGLE:DOUBLE sets them separately (an
+empty side keeps the current cap). A scenarios file is a list of
+{"name": ..., "prices": {key: price}, "caps": {role: [single, double]}}.
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+
+import numpy as np
+
+from catalog import get_catalog
+
+BATTERY_KEY = "quantity_battery"
+EXCEL_MAX_ROWS = 1048576
+
+# The only subsidy cap table; documents.max_subsidy and validate_subsidy read it
+# through the price book. (cap with at most one battery set, cap with two or more)
+SUBSIDY_CAPS = {
+    "Telecaller": (55000, 75000),
+    "Business Development Officer": (60000, 80000),
+    "Manager": (65000, 85000),
+    "Co-Founder": (100000, 120000),
+}
+ROLES = list(SUBSIDY_CAPS)
+
+
+class InvalidQuotes(ValueError):
+    """Rows of a quote sheet that fail validation; ``errors`` holds (row number, receipt_no, message)."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(f"{len(errors)} invalid cells in the quote sheet, first: row {errors[0][0]}: {errors[0][2]}")
+
+
+class Scenario:
+    """Named price and subsidy cap overrides; unset items and roles keep current values."""
+
+    def __init__(self, name, prices=None, caps=None):
+        self.name = name
+        self.prices = dict(prices or {})
+        self.caps = {role: tuple(cap) for role, cap in (caps or {}).items()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["name"], data.get("prices"), data.get("caps"))
+
+
+class PriceBook:
+    """Prices and subsidy caps as arrays, for one catalog and scenario.
+
+    Roles are coded by their position in ROLES; any other code (or a blank
+    role) gets no subsidy.
+    """
+
+    def __init__(self, catalog=None, scenario=None):
+        catalog = catalog or get_catalog()
+        scenario = scenario or Scenario("Current")
+        self.catalog = catalog
+        self.name = scenario.name
+        self.keys = catalog.keys
+        self.prices = catalog.prices.copy()
+        for key, price in scenario.prices.items():
+            if key not in catalog.index:
+                raise ValueError(f"Unknown catalog item {key!r} in scenario {scenario.name!r}.")
+            self.prices[catalog.index[key]] = price
+
+        self.roles = tuple(ROLES)
+        self.role_index = {role: i for i, role in enumerate(self.roles)}
+        caps = [list(SUBSIDY_CAPS[role]) for role in self.roles] + [[0, 0]]
+        for role, cap in scenario.caps.items():
+            if role not in self.role_index:
+                raise ValueError(f"Unknown role {role!r} in scenario {scenario.name!r}.")
+            row = caps[self.role_index[role]]
+            for side, value in enumerate(cap):
+                if value is not None:
+                    row[side] = value
+        # Last row: unknown or blank role
+        self.caps = np.array(caps, dtype=np.int64)
+        self.no_role = len(self.roles)
+        self.battery = catalog.index.get(BATTERY_KEY)
+
+    def role_codes(self, roles):
+        """Array of role names -> role codes, looking up each distinct name once."""
+        import pandas as pd
+
+        inverse, names = pd.factorize(np.asarray(roles, dtype=object))
+        table = np.array([self.role_index.get(name, self.no_role) for name in names] + [self.no_role],
+                         dtype=np.intp)
+        return table[inverse]  # factorize codes missing values as -1, the appended no-role entry
+
+    def matrix(self, quantities_list):
+        """Quantities dicts -> int64 matrix with one column per catalog item."""
+        matrix = np.zeros((len(quantities_list), len(self.keys)), dtype=np.int64)
+        columns = {key: i for i, key in enumerate(self.keys)}
+        for row, quantities in enumerate(quantities_list):
+            for key, qty in quantities.items():
+                col = columns.get(key)
+                if col is not None:
+                    matrix[row, col] = qty
+        return matrix
+
+    def price(self, quantities, role_codes, subsidies=None):
+        """Price a (quotes x items) quantity matrix.
+
+        ``subsidies`` are the subsidies asked for, clipped to each quote's cap;
+        None applies the full cap. Returns a dict of int64 arrays: total,
+        max_subsidy, subsidy and final_price.
+        """
+        quantities = np.asarray(quantities)
+        total = quantities @ self.prices
+        if self.battery is None:
+            double = np.zeros(len(quantities), dtype=np.intp)
+        else:
+            double = (quantities[:, self.battery] > 1).astype(np.intp)
+        cap = self.caps[np.asarray(role_codes, dtype=np.intp), double]
+        subsidy = cap if subsidies is None else np.minimum(np.asarray(subsidies, dtype=np.int64), cap)
+        return {"total": total, "max_subsidy": cap, "subsidy": subsidy, "final_price": total - subsidy}
+
+    def update_total(self, total, old, new):
+        """Adjust a quote's ``total`` for only the items whose quantity changed from ``old`` to ``new``."""
+        for key, qty in new.items():
+            delta = qty - old.get(key, 0)
+            pos = self.catalog.index.get(key)
+            if delta and pos is not None:
+                total += delta * int(self.prices[pos])
+        return total
+
+    def quote(self, quantities, role, subsidy=0):
+        """Price one quote given as a quantities dict; returns a dict of ints."""
+        result = self.price(self.matrix([quantities]), [self.role_index.get(role, self.no_role)], [subsidy])
+        return {name: int(values[0]) for name, values in result.items()}
+
+    def max_subsidy(self, role, battery_qty):
+        code = self.role_index.get(role, self.no_role)
+        return int(self.caps[code, int(battery_qty > 1)])
+
+
+_lock = threading.Lock()
+_book = None
+
+
+def get_price_book():
+    """PriceBook for the current catalog, rebuilt when the catalog changes."""
+    global _book
+    catalog = get_catalog()
+    with _lock:
+        if _book is None or _book.catalog is not catalog:
+            _book = PriceBook(catalog)
+        return _book
+
+
+def quote(quantities, role, subsidy=0):
+    """Total, max_subsidy, subsidy and final_price of one quote at current prices.
+
+    Unlike a scenario run, an over-cap subsidy is not clipped here; callers
+    validate it against max_subsidy.
+    """
+    book = get_price_book()
+    result = book.quote(quantities, role, 0)
+    result["subsidy"] = subsidy
+    result["final_price"] = result["total"] - subsidy
+    return result
+
+
+# -- quote history and scenario comparison -----------------------------------
+
+class Quotes:
+    """A batch of quotes as arrays: quantities matrix, roles, asked-for subsidies and labels."""
+
+    def __init__(self, quantities, roles, subsidies, labels=None):
+        self.quantities = quantities
+        self.roles = np.asarray(roles, dtype=object)
+        self.subsidies = np.asarray(subsidies, dtype=np.int64)
+        self.labels = labels
+
+    def __len__(self):
+        return len(self.quantities)
+
+    @classmethod
+    def from_ledger(cls, ledger=None, book=None):
+        """Every quotation in the ledger, as issued."""
+        from ledger import get_ledger
+
+        ledger = ledger or get_ledger()
+        book = book or get_price_book()
+        matrices, roles, subsidies, labels = [], [], [], []
+        for rows in ledger.quotations():
+            matrices.append(book.matrix([json.loads(row["quantities"]) for row in rows]))
+            roles += [row["form_filled_by"] or "" for row in rows]
+            subsidies += [row["subsidy"] or 0 for row in rows]
+            labels += [f"{row['receipt_no']} ({row['issued_on']})" for row in rows]
+        quantities = np.concatenate(matrices) if matrices else np.zeros((0, len(book.keys)), dtype=np.int64)
+        return cls(quantities, roles, subsidies, labels)
+
+    @classmethod
+    def from_frame(cls, frame, book=None):
+        """Quotes from a batch-style sheet (see batch.read_frame): quantity_* columns, role, subsidy.
+
+        Cells are checked with the same rules as batch rows (whole numbers of 0
+        or more); raises InvalidQuotes listing every bad cell.
+        """
+        import pandas as pd
+
+        book = book or get_price_book()
+        labels = frame["receipt_no"].fillna("").astype(str).str.strip().tolist() if "receipt_no" in frame else None
+        errors = []
+
+        def numbers(column, default=0):
+            # Blank or missing cells mean the default, as in batch generation
+            if column not in frame:
+                return np.full(len(frame), default, dtype=np.int64)
+            text = frame[column].fillna("").astype(str).str.strip()
+            values = pd.to_numeric(text.str.replace(",", ""), errors="coerce").to_numpy(dtype=np.float64)
+            blank = (text == "").to_numpy()
+            not_number = np.isnan(values) & ~blank
+            bad = not_number | (values < 0) | (~np.isnan(values) & (values != np.floor(values)))
+            for row in np.flatnonzero(bad).tolist():
+                value = text.iat[row]
+                message = (f"{column} must be a number, got {value!r}." if not_number[row] else
+                           f"{column} must be a whole number of 0 or more, got {value!r}.")
+                errors.append((row + 2, labels[row] if labels else "", message))  # row 1 is the header
+            return np.where(blank | bad, default, np.nan_to_num(values)).astype(np.int64)
+
+        defaults = book.catalog.defaults()
+        quantities = np.zeros((len(frame), len(book.keys)), dtype=np.int64)
+        for i, key in enumerate(book.keys):
+            quantities[:, i] = numbers(key, defaults[key])
+        subsidies = numbers("subsidy")
+        if errors:
+            raise InvalidQuotes(sorted(errors))
+        role_column = "role" if "role" in frame else "form_filled_by"
+        roles = frame[role_column].fillna("").tolist() if role_column in frame else [""] * len(frame)
+        return cls(quantities, roles, subsidies, labels)
+
+
+def compare(quotes, scenarios, catalog=None):
+    """Price ``quotes`` under each scenario; the first one is the baseline.
+
+    Returns [(PriceBook, results)], with results as from PriceBook.price.
+    """
+    catalog = catalog or get_catalog()
+    runs, codes = [], None
+    for scenario in scenarios:
+        book = PriceBook(catalog, scenario)
+        if codes is None:
+            codes = book.role_codes(quotes.roles)
+        runs.append((book, book.price(quotes.quantities, codes, quotes.subsidies)))
+    return runs
+
+
+def summary(quotes, runs):
+    """One dict per scenario with totals over all quotes and the change from the baseline."""
+    rows, baseline = [], None
+    for book, result in runs:
+        row = {"scenario": book.name, "quotes": len(quotes)}
+        for name in ("total", "subsidy", "final_price"):
+            row[f"{name}_sum"] = int(result[name].sum())
+        row["final_price_mean"] = float(result["final_price"].mean()) if len(quotes) else 0.0
+        row["capped_quotes"] = int((result["subsidy"] < quotes.subsidies).sum())
+        baseline = baseline or row
+        row["final_price_change"] = row["final_price_sum"] - baseline["final_price_sum"]
+        rows.append(row)
+    return rows
+
+
+def by_role(quotes, runs):
+    """Final price and subsidy totals per scenario and role."""
+    book = runs[0][0]
+    codes = book.role_codes(quotes.roles)
+    names = list(book.roles) + ["(none)"]
+    rows = []
+    for scenario_book, result in runs:
+        counts = np.bincount(codes, minlength=len(names))
+        subsidy = np.bincount(codes, weights=result["subsidy"], minlength=len(names))
+        final = np.bincount(codes, weights=result["final_price"], minlength=len(names))
+        for i, name in enumerate(names):
+            if counts[i]:
+                rows.append({"scenario": scenario_book.name, "role": name, "quotes": int(counts[i]),
+                             "subsidy_sum": int(subsidy[i]), "final_price_sum": int(final[i])})
+    return rows
+
+
+def export_xlsx(output, quotes, runs):
+    """Write the comparison to ``output`` (a path or binary file) with xlsxwriter.
+
+    Sheets: Summary, By role, and Quotes with one row per quote and a final
+    price column per scenario (cut at Excel's row limit).
+    """
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(output, {"constant_memory": True, "in_memory": not isinstance(output, str)})
+    money = workbook.add_format({"num_format": "#,##0"})
+    bold = workbook.add_format({"bold": True})
+
+    def table(sheet_name, rows):
+        sheet = workbook.add_worksheet(sheet_name)
+        columns = list(rows[0]) if rows else []
+        sheet.write_row(0, 0, columns, bold)
+        sheet.set_column(0, len(columns), 16, money)
+        for r, row in enumerate(rows, start=1):
+            sheet.write_row(r, 0, list(row.values()))
+        return sheet
+
+    table("Summary", summary(quotes, runs))
+    table("By role", by_role(quotes, runs))
+
+    sheet = workbook.add_worksheet("Quotes")
+    names = [book.name for book, _ in runs]
+    sheet.write_row(0, 0, ["quote", "role", "subsidy asked"] + [f"{name} total" for name in names]
+                    + [f"{name} subsidy" for name in names] + [f"{name} final" for name in names], bold)
+    sheet.set_column(0, 3 + 3 * len(names), 16, money)
+    limit = min(len(quotes), EXCEL_MAX_ROWS - 1)
+    # Columns of plain ints, so rows are written without per-cell numpy scalars
+    columns = [result[name][:limit].tolist() for name in ("total", "subsidy", "final_price") for _, result in runs]
+    labels = quotes.labels or range(1, limit + 1)
+    roles = quotes.roles[:limit].tolist()
+    subsidies = quotes.subsidies[:limit].tolist()
+    for r in range(limit):
+        sheet.write_row(r + 1, 0, [labels[r], roles[r], subsidies[r]] + [column[r] for column in columns])
+    workbook.close()
+    return limit
+
+
+def _parse_cap(text):
+    role, _, amounts = text.partition("=")
+    if ":" not in amounts:
+        return role, (int(amounts), int(amounts))
+    single, double = amounts.split(":")
+    return role, (int(single) if single else None, int(double) if double else None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare price and subsidy cap scenarios over past quotes.")
+    parser.add_argument("--input", help="CSV or XLSX of quotes (default: the quotations in the ledger)")
+    parser.add_argument("-o", "--output", default="scenarios.xlsx")
+    parser.add_argument("--price", action="append", default=[], metavar="KEY=PRICE")
+    parser.add_argument("--cap", action="append", default=[], metavar="ROLE=SINGLE[:DOUBLE]")
+    parser.add_argument("--scenarios", help="JSON list of scenarios to compare")
+    args = parser.parse_args(argv)
+
+    scenarios = [Scenario("Current")]
+    if args.price or args.cap:
+        prices = {key: int(price) for key, _, price in (p.partition("=") for p in args.price)}
+        scenarios.append(Scenario("What-if", prices, dict(_parse_cap(c) for c in args.cap)))
+    if args.scenarios:
+        with open(args.scenarios) as fh:
+            scenarios += [Scenario.from_dict(s) for s in json.load(fh)]
+    if len(scenarios) == 1:
+        parser.error("give --price, --cap or --scenarios to compare against the current prices")
+
+    start = time.perf_counter()
+    if args.input:
+        from batch import read_frame
+
+        try:
+            quotes = Quotes.from_frame(read_frame(args.input))
+        except InvalidQuotes as e:
+            for row_no, receipt_no, message in e.errors:
+                print(f"row {row_no} ({receipt_no or 'no number'}): {message}", file=sys.stderr)
+            return 2
+    else:
+        quotes = Quotes.from_ledger()
+    loaded = time.perf_counter()
+    try:
+        runs = compare(quotes, scenarios)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    priced = time.perf_counter()
+    rows = export_xlsx(args.output, quotes, runs)
+
+    for row in summary(quotes, runs):
+        print(f"{row['scenario']:<20} final Rs {row['final_price_sum']:>16,}   "
+              f"subsidy Rs {row['subsidy_sum']:>14,}   change Rs {row['final_price_change']:>+14,}")
+    print(f"{len(quotes)} quotes: loaded in {loaded - start:.2f}s, {len(runs)} scenarios priced in "
+          f"{priced - loaded:.3f}s, {rows} rows -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""In-memory memo of rendered documents, so an unchanged Generate click is instant.
+
+Keys are ``documents.context_hash`` of (template id, template version,
+context), so editing a template or any form field produces a new key. The
+cache is bounded by total size in bytes (least recently used first) and
+entries expire after a TTL.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+RENDER_CACHE_BYTES = int(float(os.environ.get("ORBIT_RENDER_CACHE_MB", "64")) * 1024 * 1024)
+RENDER_CACHE_TTL = float(os.environ.get("ORBIT_RENDER_CACHE_TTL", "900"))
+
+
+class RenderCache:
+    def __init__(self, max_bytes=RENDER_CACHE_BYTES, ttl=RENDER_CACHE_TTL, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (expires, bytes)
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self._clock():
+                self._drop(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, data):
+        # A single document larger than the whole cache is not worth keeping
+        if not self.max_bytes or len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (self._clock() + self.ttl if self.ttl else float("inf"), data)
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        _, data = self._entries.pop(key)
+        self.size -= len(data)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+render_cache = RenderCache()
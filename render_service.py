@@ -0,0 +1,251 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import metrics
+from render_cache import render_cache
+from storage import get_storage, stored_render
+
+RENDER_WORKERS = int(os.environ.get("ORBIT_RENDER_WORKERS", "4"))
+RENDER_QUEUE_SIZE = int(os.environ.get("ORBIT_RENDER_QUEUE", "32"))
+RENDER_TIMEOUT = float(os.environ.get("ORBIT_RENDER_TIMEOUT", "30"))
+
+_logger = logging.getLogger(__name__)
+
+
+class RenderServiceBusy(RuntimeError):
+    """All workers are busy and the job queue is full."""
+
+
+class RenderTimeout(TimeoutError):
+    """A job did not finish within its timeout."""
+
+
+def render_template(template_path, context):
+    """Render ``template_path`` with ``context`` to .docx bytes (runs in a worker)."""
+    from fast_template import UnsupportedTemplate
+    from rendering import render_docx
+    from template_cache import get_template, template_cache
+
+    compiled = template_cache.compiled(template_path)
+    if compiled is not None:
+        try:
+            return compiled.render(context)
+        except UnsupportedTemplate:
+            pass
+    return render_docx(get_template(template_path), context)
+
+
+def docx_key(template_path, context):
+    """Render cache key for a docx render: template name, template content hash and context."""
+    from documents import context_hash
+    from template_cache import template_cache
+
+    # The file name rather than the path, so workers with different checkouts share keys
+    return context_hash(f"docx:{os.path.basename(template_path)}", template_cache.version(template_path),
+                        context)
+
+
+class RenderJob:
+    def __init__(self, future, timeout, on_timeout):
+        self.future = future
+        self.submitted = time.monotonic()
+        self.deadline = self.submitted + timeout if timeout else None
+        self._on_timeout = on_timeout
+        self._timed_out = False
+
+    def done(self):
+        return self.future.done() or self.expired()
+
+    def expired(self):
+        return self.deadline is not None and time.monotonic() > self.deadline and not self.future.done()
+
+    def remaining(self):
+        """Seconds left until the deadline, or None without one."""
+        return None if self.deadline is None else max(self.deadline - time.monotonic(), 0)
+
+    def expire(self):
+        """Give up on the job: cancel it if still queued and count the timeout once."""
+        self.future.cancel()
+        if not self._timed_out:
+            self._timed_out = True
+            self._on_timeout()
+        return RenderTimeout("Rendering took too long, please try again.")
+
+    def on_success(self, fn, *args):
+        """Call ``fn(*args)`` once the document is rendered, whether or not anyone collects it.
+
+        Runs on the worker thread (or right away if the job is already done);
+        not for jobs that failed or were given up on.
+        """
+        def callback(future):
+            if future.cancelled() or future.exception() is not None or self._timed_out:
+                return
+            try:
+                fn(*args)
+            except Exception:
+                _logger.exception("Callback for a finished render failed")
+
+        self.future.add_done_callback(callback)
+
+    def result(self, timeout=None):
+        """Wait for the rendered bytes, at most until the job's own deadline."""
+        remaining = self.remaining()
+        if remaining is not None:
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        try:
+            return self.future.result(timeout=timeout)
+        except (FutureTimeout, CancelledError, RenderTimeout):
+            raise self.expire() from None
+
+
+class RenderService:
+    """Bounded pool that runs docx renders off the Streamlit script thread.
+
+    At most ``workers`` jobs run at once and at most ``queue_size`` more wait;
+    further submissions raise RenderServiceBusy instead of piling up.
+    """
+
+    def __init__(self, workers=RENDER_WORKERS, queue_size=RENDER_QUEUE_SIZE, timeout=RENDER_TIMEOUT):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._render_total = 0.0
+        self._render_max = 0.0
+        self._recent = deque(maxlen=1000)
+
+    def _started(self):
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+
+    def _finished(self, elapsed, ok):
+        with self._lock:
+            self._running -= 1
+            if not ok:
+                self._failed += 1
+                return
+            self._completed += 1
+            self._render_total += elapsed
+            self._render_max = max(self._render_max, elapsed)
+            self._recent.append(elapsed)
+
+    def _maybe_cancelled(self, future):
+        # Cancelled before a worker picked it up, so _run never started
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    def _timeout(self):
+        with self._lock:
+            self._timed_out += 1
+
+    def _run(self, submitted, deadline, fn, args):
+        self._started()
+        start = time.perf_counter()
+        metrics.observe("queue_wait", start - submitted)
+        ok = False
+        try:
+            if deadline is not None and time.monotonic() > deadline:
+                # Nobody is waiting for it any more
+                raise RenderTimeout("Job expired in the queue.")
+            result = metrics.profiled(fn, *args, label=getattr(fn, "__name__", ""))
+            ok = True
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.observe("render_job", elapsed)
+            self._finished(elapsed, ok)
+
+    def submit(self, fn, *args, timeout=None, block=0):
+        """Queue ``fn(*args)`` and return a RenderJob.
+
+        ``block`` is how many seconds to wait for a free queue slot before
+        raising RenderServiceBusy.
+        """
+        acquired = self._slots.acquire(timeout=block) if block else self._slots.acquire(blocking=False)
+        if not acquired:
+            with self._lock:
+                self._rejected += 1
+            raise RenderServiceBusy("The document renderer is busy, please try again in a moment.")
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout if timeout else None
+        with self._lock:
+            self._queued += 1
+        future = self._executor.submit(self._run, time.perf_counter(), deadline, fn, args)
+        future.add_done_callback(self._maybe_cancelled)
+        future.add_done_callback(lambda _: self._slots.release())
+        return RenderJob(future, timeout, self._timeout)
+
+    def submit_cached(self, key, fn, *args, timeout=None):
+        """Like submit, but memoised in render_cache under ``key``.
+
+        A cache hit returns an already finished job without touching the pool.
+        With shared storage configured (storage.py), the worker looks there
+        before rendering, so other server processes reuse the document.
+        """
+        data = render_cache.get(key)
+        if data is not None:
+            future = Future()
+            future.set_result(data)
+            return RenderJob(future, None, self._timeout)
+        if get_storage() is not None:
+            fn, args = stored_render, (key, fn, *args)
+        job = self.submit(fn, *args, timeout=timeout)
+        job.future.add_done_callback(
+            lambda f: f.cancelled() or f.exception() is not None or render_cache.put(key, f.result()))
+        return job
+
+    def render(self, template_path, context, timeout=None):
+        """Queue a docx render of ``template_path`` with ``context``."""
+        template_path = os.path.abspath(template_path)
+        return self.submit_cached(docx_key(template_path, context), render_template, template_path, context,
+                                  timeout=timeout)
+
+    def metrics(self):
+        with self._lock:
+            recent = sorted(self._recent)
+            completed = self._completed
+            return {
+                "workers": self.workers,
+                "queue_capacity": self.queue_size,
+                "queue_depth": self._queued,
+                "running": self._running,
+                "completed": completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+                "render_seconds_avg": self._render_total / completed if completed else 0.0,
+                "render_seconds_p95": recent[int(0.95 * (len(recent) - 1))] if recent else 0.0,
+                "render_seconds_max": self._render_max,
+                "cache": render_cache.stats(),
+            }
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_render_service():
+    """Process-wide RenderService shared by all Streamlit sessions."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = RenderService()
+        return _service
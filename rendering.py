@@ -0,0 +1,15 @@
+import io
+
+from metrics import span
+
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+def render_docx(doc, context):
+    """Render ``doc`` with ``context`` and return the .docx file as bytes."""
+    with span("docx_render"):
+        doc.render(context)
+    buffer = io.BytesIO()
+    with span("docx_save"):
+        doc.save(buffer)
+    return buffer.getvalue()
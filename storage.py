@@ -0,0 +1,336 @@
+"""Storage shared by several app processes for rendered documents and compiled templates.
+
+Every Streamlit (or api.py) process has its own render cache and compiled
+templates. When several run behind a load balancer, ORBIT_STORAGE points them
+at one store. A document or template is then built by whichever worker asks
+first, while the others wait for it and reuse it:
+
+    local:/var/cache/orbit    one process: files written by atomic rename
+    shared:/mnt/orbit-cache   several processes or hosts: the same, plus fcntl locks
+    redis://host:6379/0       a Redis server (needs the redis package)
+    memory:                   in-process stand-in for Redis, for trying things out
+
+Unset (the default) keeps everything in process. Stored entries expire after
+ORBIT_STORAGE_TTL seconds (default 900, like the render cache).
+"""
+import abc
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+STORAGE_URL = os.environ.get("ORBIT_STORAGE", "")
+STORAGE_TTL = float(os.environ.get("ORBIT_STORAGE_TTL", "900"))
+# Longest a worker waits for another one to finish building an entry
+LOCK_TIMEOUT = float(os.environ.get("ORBIT_STORAGE_LOCK_TIMEOUT", "60"))
+
+
+def write_atomic(path, data):
+    """Write ``data`` to ``path`` through a temp file and a rename, so readers never see a partial file."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class Storage(abc.ABC):
+    """get/put of bytes under string keys, plus a lock per key."""
+
+    def __init__(self, ttl=STORAGE_TTL):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @abc.abstractmethod
+    def get(self, key):
+        """Stored bytes for ``key``, or None if missing or expired."""
+
+    @abc.abstractmethod
+    def put(self, key, data):
+        """Store ``data`` under ``key`` for ``ttl`` seconds."""
+
+    @abc.abstractmethod
+    def lock(self, key, timeout=LOCK_TIMEOUT):
+        """Context manager held while building ``key``; yields False if it timed out."""
+
+    def get_or_create(self, key, create, *args):
+        """Return the stored bytes for ``key``, building them with ``create(*args)`` once."""
+        data = self.get(key)
+        if data is None:
+            with self.lock(key) as acquired:
+                # Another worker may have built it while we waited
+                data = self.get(key) if acquired else None
+                if data is None:
+                    self.misses += 1
+                    data = create(*args)
+                    self.put(key, data)
+                    return data
+        self.hits += 1
+        return data
+
+    def stats(self):
+        return {"backend": type(self).__name__, "hits": self.hits, "misses": self.misses}
+
+
+class FileStorage(Storage):
+    """Entries are files under ``directory``, replaced atomically.
+
+    Without ``shared`` the per-key locks only cover this process. With it they
+    are fcntl locks on a fixed set of lock files under ``locks/``, so they also
+    hold across processes and hosts mounting the same directory (NFS needs
+    lockd).
+
+    An expired entry is deleted when it is read, and a sweep run from put at
+    most once per ``ttl`` deletes the ones nobody reads again.
+    """
+
+    _STRIPES = 64
+    _LOCK_FILES = 256
+    # Appended to entry file names
+    suffix = ""
+
+    def __init__(self, directory, shared=False, ttl=STORAGE_TTL, clock=time.time):
+        super().__init__(ttl)
+        self.directory = directory
+        self.shared = shared
+        self._clock = clock
+        self._locks = [threading.Lock() for _ in range(self._STRIPES)]
+        self._sweep_lock = threading.Lock()
+        self._next_sweep = clock() + ttl
+        self.expirations = 0
+
+    def _path(self, key):
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest + self.suffix)
+
+    def _lock_path(self, key):
+        # A bounded set of lock files: they are never deleted, since removing
+        # one while another process waits on it would split the lock
+        stripe = int(hashlib.sha256(key.encode("utf-8")).hexdigest()[:8], 16) % self._LOCK_FILES
+        return os.path.join(self.directory, "locks", f"{stripe:03d}.lock")
+
+    def _expired(self, mtime):
+        return bool(self.ttl) and self._clock() - mtime > self.ttl
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as fh:
+                st = os.fstat(fh.fileno())
+                if not self._expired(st.st_mtime):
+                    return fh.read()
+            # Unless a fresh copy was renamed into place meanwhile
+            if os.stat(path).st_ino == st.st_ino:
+                self.expirations += self._remove(path)
+        except FileNotFoundError:
+            pass
+        return None
+
+    def put(self, key, data):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_atomic(path, data)
+        if self.ttl and self._clock() >= self._next_sweep:
+            self.sweep()
+
+    def sweep(self):
+        """Delete expired entries and the .tmp files of writers that died."""
+        if not self._sweep_lock.acquire(blocking=False):
+            return  # another thread is already sweeping
+        try:
+            self._next_sweep = self._clock() + self.ttl
+            entries = []
+            for root, _, names in os.walk(self.directory):
+                for name in names:
+                    if name.endswith(".lock"):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue  # removed by another process
+                    if self._expired(st.st_mtime):
+                        self.expirations += self._remove(path)
+                    elif not name.endswith(".tmp"):
+                        entries.append((st.st_mtime, st.st_size, path))
+            self._trim(entries)
+        finally:
+            self._sweep_lock.release()
+
+    def _trim(self, entries):
+        """Called by sweep with (mtime, size, path) of every live entry; subclasses may delete some."""
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return 1
+        except FileNotFoundError:
+            return 0
+
+    def stats(self):
+        return dict(super().stats(), expirations=self.expirations)
+
+    @contextmanager
+    def lock(self, key, timeout=LOCK_TIMEOUT):
+        if not self.shared:
+            stripe = self._locks[hash(key) % self._STRIPES]
+            acquired = stripe.acquire(timeout=timeout)
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    stripe.release()
+            return
+
+        import fcntl
+
+        path = self._lock_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a") as fh:
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    acquired = True
+                    break
+                except BlockingIOError:
+                    if time.monotonic() > deadline:
+                        acquired = False
+                        break
+                    time.sleep(0.01)
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+# Delete the lock only if it still holds our token, in one server-side step:
+# a separate get and delete could remove a lock that expired and was taken by
+# another worker in between
+_RELEASE_LOCK = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class RedisStorage(Storage):
+    """Entries and locks in a Redis server, or anything with redis-py's get/set/delete/eval."""
+
+    def __init__(self, client, prefix="orbit:", ttl=STORAGE_TTL):
+        super().__init__(ttl)
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def put(self, key, data):
+        self.client.set(self.prefix + key, data, ex=int(self.ttl) or None)
+
+    @contextmanager
+    def lock(self, key, timeout=LOCK_TIMEOUT):
+        name, token = f"{self.prefix}lock:{key}", uuid.uuid4().hex.encode("ascii")
+        deadline = time.monotonic() + timeout
+        # The lock expires by itself if its holder dies
+        while not self.client.set(name, token, nx=True, ex=int(timeout) + 1):
+            if time.monotonic() > deadline:
+                yield False
+                return
+            time.sleep(0.01)
+        try:
+            yield True
+        finally:
+            self.client.eval(_RELEASE_LOCK, 1, name, token)
+
+
+class MemoryRedis:
+    """The subset of redis-py's client that RedisStorage uses, kept in this process."""
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._values = {}  # name -> (expires or None, bytes)
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        with self._lock:
+            entry = self._values.get(name)
+            if entry is not None and entry[0] is not None and entry[0] <= self._clock():
+                del self._values[name]
+                entry = None
+            return None if entry is None else entry[1]
+
+    def set(self, name, value, ex=None, nx=False):
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        with self._lock:
+            entry = self._values.get(name)
+            if nx and entry is not None and (entry[0] is None or entry[0] > self._clock()):
+                return None
+            self._values[name] = (self._clock() + ex if ex else None, bytes(value))
+            return True
+
+    def delete(self, *names):
+        with self._lock:
+            return sum(self._values.pop(name, None) is not None for name in names)
+
+    def eval(self, script, numkeys, *keys_and_args):
+        """Runs only the lock release script, atomically like Redis does."""
+        if script != _RELEASE_LOCK:
+            raise NotImplementedError("MemoryRedis only runs RedisStorage's lock release script")
+        (name,), (token,) = keys_and_args[:numkeys], keys_and_args[numkeys:]
+        with self._lock:
+            entry = self._values.get(name)
+            if entry is None or entry[1] != token or (entry[0] is not None and entry[0] <= self._clock()):
+                return 0
+            del self._values[name]
+            return 1
+
+
+def open_storage(url):
+    """Storage for an ORBIT_STORAGE value (see the module docstring); None for ''."""
+    if not url:
+        return None
+    scheme, _, rest = url.partition(":")
+    if scheme == "local":
+        return FileStorage(rest)
+    if scheme == "shared":
+        return FileStorage(rest, shared=True)
+    if scheme in ("redis", "rediss", "unix"):
+        import redis
+
+        return RedisStorage(redis.Redis.from_url(url))
+    if scheme == "memory":
+        return RedisStorage(MemoryRedis())
+    raise ValueError(f"Unknown ORBIT_STORAGE backend {url!r}")
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """Process-wide Storage from ORBIT_STORAGE, or None when it is unset."""
+    global _storage
+    with _storage_lock:
+        if _storage is None and STORAGE_URL:
+            _storage = open_storage(STORAGE_URL)
+        return _storage
+
+
+def stored_render(key, fn, *args):
+    """``fn(*args)`` through the shared store under ``key`` (runs in a render worker)."""
+    storage = get_storage()
+    if storage is None:
+        return fn(*args)
+    return storage.get_or_create(f"render:{key}", fn, *args)
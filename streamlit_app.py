@@ -1,209 +1,232 @@
+import functools
+import json
+import os
+import tempfile
+import time
+
 import streamlit as st
-# The following imports are moved to their respective sections
-# to maintain the original structure of your code.
+from catalog import get_catalog
+import engine
+import metrics
+from ledger import NumbersExhausted, get_ledger, series_for
+from render_service import RenderServiceBusy, RenderTimeout
+from pdf_export import PDF_MIME
+from pricing import get_price_book
+from rendering import DOCX_MIME
+from warmup import start_background_warmup
 
 # App Title and Selector
 st.set_page_config(page_title="Orbit Docs Generator", layout="wide")
 st.title("Orbit Document Generator")
 
-# App Selector
-option = st.radio("Select Document Type:", ["Quotation Summary", "Partial Proforma Receipt", "Full Proforma Receipt" ])
 
-# ----------------------------------------------------------------------
-# Option 1: Quotation Summary (MODIFIED)
-# ----------------------------------------------------------------------
-if option == "Quotation Summary":
-    from docxtpl import DocxTemplate
-    from datetime import datetime
+@st.cache_resource
+def startup():
+    # Runs once per server process: load docxtpl and parse the templates in
+    # the background so the first Generate click does not pay for it
+    metrics.start_metrics_server()
+    return start_background_warmup()
 
-    TEMPLATE_PATH = "Orbit Agritech Quotation Summary.docx"
 
-    if "selected_subsidy" not in st.session_state:
-        st.session_state.selected_subsidy = 0
+def quantity_key(key_prefix, item):
+    return key_prefix + item["key"].removeprefix("quantity_")
 
-    if "form_filled_by" not in st.session_state:
-        st.session_state.form_filled_by = ""
 
-    st.subheader("Customer Information")
+def quantity_inputs(key_prefix):
+    """One number input per catalog item; returns {catalog key: quantity}."""
+    return {
+        item["key"]: st.number_input(
+            item["name"], min_value=0, step=1, value=item["default"],
+            key=quantity_key(key_prefix, item)
+        )
+        for item in get_catalog()
+    }
 
-    def numeric_input(label, max_length, key=None):
-        val = st.text_input(label, key=key)
-        val = ''.join(filter(str.isdigit, val))[:max_length]
-        return val
 
-    receipt_no = numeric_input("Quotation Number (4 digits)", max_length=4, key="quote_receipt_no")
-    date = st.date_input("Date", datetime.today(), key="quote_date").strftime("%d/%m/%Y")
-    customer_name = st.text_input("Customer Name *", key="quote_customer_name")
-    customer_address = st.text_area("Address *", key="quote_address")
-    customer_phone = numeric_input("Phone Number * (10 digits)", max_length=10, key="quote_phone")
-    email = st.text_input("Email (optional)", max_chars=50, key="quote_email")
+def session_quantities(key_prefix):
+    """Quantities from session state; catalog defaults for inputs not drawn yet."""
+    return {item["key"]: st.session_state.get(quantity_key(key_prefix, item), item["default"])
+            for item in get_catalog()}
 
-    st.subheader("Who is filling this form? *")
-    form_filled_by = st.selectbox("Select Role", ["", "Telecaller", "Business Development Officer", "Manager", "Co-Founder"], key="quote_filler")
-    st.session_state.form_filled_by = form_filled_by
 
-    subsidy_caps = {
-        "Telecaller": (55000, 75000),
-        "Business Development Officer": (60000, 80000),
-        "Manager": (65000, 85000),
-        "Co-Founder": (100000, 120000),
-    }
-    
-    # Master list of all items with their properties
-    items = [
-        {"name": "12 HP PT Pro", "price": 112000, "key": "quantity_pt_pro"},
-        {"name": "Battery Sets", "price": 56000, "key": "quantity_battery"},
-        {"name": "Fast Chargers", "price": 6500, "key": "quantity_charger"},
-        {"name": "1 Set of Sugarcane Blades(Weeding)", "price": 4400, "key": "quantity_blade_weeding"},
-        {"name": "1 Set of Sugarcane Blades(Earthing-up)", "price": 4400, "key": "quantity_blade_earthing"},
-        {"name": "1 Set of Tyres (5x10)", "price": 8000, "key": "quantity_tyres"},
-        {"name": "Toolkit", "price": 1200, "key": "quantity_toolkit"},
-        {"name": "Ginger Kit", "price": 10000, "key": "quantity_ginger"},
-        {"name": "Seat", "price": 6500, "key": "quantity_seat"},
-        {"name": "Jack", "price": 1100, "key": "quantity_jack"},
-        {"name": "BuyBack Guarantee", "price": 10000, "key": "quantity_buyback_guarantee"},
-        {"name":"Front Dead Weight", "price": 0, "key": "quantity_front_dead_weight"},
-        {"name":"Wheel Dead Weight", "price": 0, "key": "quantity_wheel_dead_weight"},
-    ]
+@st.fragment
+def quantity_grid(key_prefix):
+    # Editing a quantity reruns only this grid; the page reads the values
+    # back with session_quantities when it runs
+    quantity_inputs(key_prefix)
 
-    st.markdown("---")
-    st.subheader("Enter Quantities for Items")
 
-    # Static UI for item selection, similar to proforma receipts
-    quantity_pt_pro = st.number_input("12 HP PT Pro", min_value=0, step=1, value=1, key="quote_qty_pt_pro")
-    quantity_battery = st.number_input("Battery Sets", min_value=0, step=1, value=1, key="quote_qty_battery")
-    quantity_charger = st.number_input("Fast Chargers", min_value=0, step=1, value=2, key="quote_qty_charger")
-    quantity_blade_weeding = st.number_input("1 Set of Sugarcane Blades(Weeding)", min_value=0, step=1, value=0, key="quote_qty_blade_weeding")
-    quantity_blade_earthing = st.number_input("1 Set of Sugarcane Blades(Earthing-up)", min_value=0, step=1, value=0, key="quote_qty_blade_earthing")
-    quantity_tyres = st.number_input("1 Set of Tyres (5x10)", min_value=0, step=1, value=0, key="quote_qty_tyres")
-    quantity_toolkit = st.number_input("Toolkit", min_value=0, step=1, value=0, key="quote_qty_toolkit")
-    quantity_ginger = st.number_input("Ginger Kit", min_value=0, step=1, value=0, key="quote_qty_ginger")
-    quantity_seat = st.number_input("Seat", min_value=0, step=1, value=0, key="quote_qty_seat")
-    quantity_jack = st.number_input("Jack", min_value=0, step=1, value=0, key="quote_qty_jack")
-    quantity_buyback_guarantee = st.number_input("BuyBack Guarantee", min_value=0, step=1, value=0, key="quote_qty_buyback_guarantee")
-    quantity_front_dead_weight = st.number_input("Front Dead Weight", min_value=0, step=1, value=0, key="quote_qty_front_dead_weight")
-    quantity_wheel_dead_weight = st.number_input("Wheel Dead Weight", min_value=0, step=1, value=0, key="quote_qty_wheel_dead_weight")
-
-    # Consolidate quantities into a dictionary for processing
-    quantities = {
-        "quantity_pt_pro": quantity_pt_pro,
-        "quantity_battery": quantity_battery,
-        "quantity_charger": quantity_charger,
-        "quantity_blade_weeding": quantity_blade_weeding,
-        "quantity_blade_earthing": quantity_blade_earthing,
-        "quantity_tyres": quantity_tyres,
-        "quantity_toolkit": quantity_toolkit,
-        "quantity_ginger": quantity_ginger,
-        "quantity_seat": quantity_seat,
-        "quantity_jack": quantity_jack,
-        "quantity_buyback_guarantee": quantity_buyback_guarantee,
-        "quantity_front_dead_weight": quantity_front_dead_weight,
-        "quantity_wheel_dead_weight": quantity_wheel_dead_weight,
-    }
+def running_bill(key_prefix):
+    """Bill total for the quantities in session state, repriced only for the items that changed.
+
+    Priced by the same PriceBook as the quotation document, and recounted in
+    full whenever that book is rebuilt (catalog edits).
+    """
+    book = get_price_book()
+    quantities = session_quantities(key_prefix)
+    state_key = key_prefix + "running_bill"
+    bill = st.session_state.get(state_key)
+    if bill is None or bill["book"] is not book:
+        bill = {"book": book, "quantities": quantities, "total": book.quote(quantities, "")["total"]}
+    else:
+        bill["total"] = book.update_total(bill["total"], bill["quantities"], quantities)
+        bill["quantities"] = quantities
+    st.session_state[state_key] = bill
+    return bill
+
+
+def start_render(state_key, kind, context, output_format="DOCX", form_filled_by="", record=True):
+    """Queue a render on the shared worker pool; show_render_result picks it up.
+
+    With ``record`` the document is added to the ledger as soon as it is
+    rendered, even if the page is left before it is shown, and a warning is
+    shown with it if its number was already issued to someone else.
+    """
+    output_filename, _ = engine.output_file(kind, context, output_format)
+    warning = reused_number_warning(kind, context) if record else None
+    try:
+        job = engine.submit(kind, context, output_format)
+    except RenderServiceBusy as e:
+        st.error(str(e))
+    else:
+        if record:
+            job.on_success(engine.record, kind, context, output_format, form_filled_by)
+        job.on_success(metrics.count_document, kind, output_format, form_filled_by)
+        st.session_state[state_key] = {
+            "job": job,
+            "filename": output_filename,
+            "format": output_format,
+            # Drawn by show_render_result: anything drawn now is wiped by the fragment's rerun
+            "warning": warning,
+        }
+
+
+DOWNLOAD_DIR = os.path.join(tempfile.gettempdir(), "orbit-downloads")
+# Built ZIPs are kept this long for their download buttons
+DOWNLOAD_TTL = 3600
+
+
+def new_download_file(suffix=".zip"):
+    """Path of a new file to offer with download_file; ones older than DOWNLOAD_TTL are deleted first."""
+    os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+    cutoff = time.time() - DOWNLOAD_TTL
+    for name in os.listdir(DOWNLOAD_DIR):
+        path = os.path.join(DOWNLOAD_DIR, name)
+        try:
+            if os.stat(path).st_mtime < cutoff:
+                os.remove(path)
+        except FileNotFoundError:
+            pass  # removed by another session
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=DOWNLOAD_DIR)
+    os.close(fd)
+    return path
+
+
+def _read_file(path):
+    with open(path, "rb") as fh:
+        return fh.read()
+
+
+def download_file(label, path, file_name, mime):
+    """Download button for the file at ``path``, read only when the button is clicked.
+
+    Streamlit serves downloads from memory, so a click still loads the whole
+    file; until then it stays on disk, and nothing is loaded if nobody clicks.
+    """
+    st.download_button(label=label, data=functools.partial(_read_file, path), file_name=file_name, mime=mime)
+
+
+def reused_number_warning(kind, context):
+    """Warning text if the number was already issued for a different document, else None."""
+    earlier = [
+        row for row in get_ledger().find_number(kind, context["receipt_no"], context.get("date"))
+        if json.loads(row["context"]) != context
+    ]
+    if not earlier:
+        return None
+    last = earlier[0]
+    return (
+        f"⚠️ Number {context['receipt_no']} was already issued on {last['issued_on']} to "
+        f"{last['customer_name'] or 'an unnamed customer'} ({last['phone']}). "
+        "Both documents are kept in the ledger; use the next free number to avoid a duplicate."
+    )
 
-    # Calculate total price and create summary list for UI table
-    total_price = 0
-    selected_items_summary = []
-    for item in items:
-        qty = quantities.get(item["key"], 0)
-        if qty > 0:
-            total_price += qty * item["price"]
-            selected_items_summary.append({"name": item["name"], "qty": qty})
-    
-    battery_qty = quantities.get("quantity_battery", 0)
 
-    st.markdown("---")
-    st.write("### 💸 Subsidy Options")
-
-    apply_subsidy = st.radio("Do you want to apply a Subsidy?", ("No", "Yes"), key="quote_subsidy_radio")
-
-    if apply_subsidy == "Yes" and form_filled_by:
-        st.markdown("#### Select Subsidy Amount")
-        single_cap, double_cap = subsidy_caps[form_filled_by]
-        max_subsidy = single_cap if battery_qty <= 1 else double_cap
-        st.slider(
-            "Subsidy Slider",
-            min_value=0,
-            max_value=max_subsidy,
-            step=1000,
-            key="selected_subsidy"
+def fill_next_number(widget_key, kind):
+    try:
+        st.session_state[widget_key] = get_ledger().next_number(series_for(kind))
+    except NumbersExhausted as e:
+        # Callbacks run before the script, so the button draws the message
+        st.session_state[f"{widget_key}_next_error"] = str(e)
+
+
+def next_number_button(widget_key, kind):
+    st.button("🔢 Use next free number", key=f"{widget_key}_next", on_click=fill_next_number, args=(widget_key, kind))
+    error = st.session_state.pop(f"{widget_key}_next_error", None)
+    if error:
+        st.error(f"❌ {error} Enter a number by hand.")
+
+
+@st.fragment(run_every=0.3)
+def wait_for_render(state_key):
+    pending = st.session_state.get(state_key)
+    if pending is None:
+        return
+    if pending["job"].done():
+        st.rerun()
+    st.info("⏳ Rendering document...")
+
+
+def show_render_result(state_key, success_message, download_label, error_message="❌ Error rendering document."):
+    pending = st.session_state.get(state_key)
+    if pending is None:
+        return
+    if not pending["job"].done():
+        wait_for_render(state_key)
+        return
+
+    del st.session_state[state_key]
+    try:
+        data = pending["job"].result()
+    except RenderTimeout as e:
+        st.error(str(e))
+        return
+    except Exception as e:
+        st.error(error_message)
+        st.exception(e)
+        return
+
+    output_format = pending["format"]
+    st.success(f"{success_message}: {pending['filename']}")
+    if pending.get("warning"):
+        st.warning(pending["warning"])
+    with metrics.span("download_handoff"):
+        st.download_button(
+            label=download_label.format(format=output_format),
+            data=data,
+            file_name=pending["filename"],
+            mime=PDF_MIME if output_format == "PDF" else DOCX_MIME
         )
-        st.success(f"Selected Subsidy: ₹{st.session_state.selected_subsidy:,.0f}")
-    else:
-        st.session_state.selected_subsidy = 0
+    # Click to download button, including the wait for the fragment to notice
+    metrics.observe("generate", time.monotonic() - pending["job"].submitted)
 
-    selected_subsidy = st.session_state.selected_subsidy
-    final_price = total_price - selected_subsidy
 
-    st.markdown("---")
-    st.write("### 📟 Bill Summary")
-
-    if selected_items_summary:
-        st.table({
-            "Item Name": [item["name"] for item in selected_items_summary],
-            "Quantity": [item["qty"] for item in selected_items_summary]
-        })
-
-        st.write(f"**Total Price:** Rs {total_price:,.0f}")
-        st.write(f"**Subsidy Applied:** Rs {selected_subsidy:,.0f}")
-        st.write(f"**Subsidized Price (All Inclusive):** Rs {final_price:,.0f}")
-
-        if st.button("📄 Generate Quotation DOCX"):
-            if not receipt_no:
-                st.error("Quotation Number is required and must be numeric up to 4 digits.")
-            elif len(customer_phone) != 10:
-                st.error("Phone Number must be exactly 10 digits.")
-            else:
-                doc = DocxTemplate(TEMPLATE_PATH)
-                context = {
-                    "receipt_no": receipt_no,
-                    "date": date,
-                    "customer_name": customer_name,
-                    "address_line1": customer_address,
-                    "phone": customer_phone,
-                    "email": email if email else "N/A",
-                    "total_price": f"Rs {total_price:,.0f}",
-                    "subsidy": f"Rs {selected_subsidy:,.0f}",
-                    "final_price": f"Rs {final_price:,.0f}",
-                }
-                context.update(quantities)
-
-                try:
-                    doc.render(context)
-                    output_filename = f"Orbit_Agritech_Quotation_{receipt_no}.docx"
-                    doc.save(output_filename)
-                    st.success(f"Quotation generated: {output_filename}")
-
-                    with open(output_filename, "rb") as file:
-                        st.download_button(
-                            label="⬇️ Click here to Download DOCX Quotation",
-                            data=file,
-                            file_name=output_filename,
-                            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                        )
-                except Exception as e:
-                    st.error("❌ Error rendering document. Make sure 'Orbit Agritech Quotation Summary.docx' is in the same directory.")
-                    st.exception(e)
-    else:
-        st.info("Please enter quantities for items to see the bill.")
+def numeric_input(label, max_length, key=None):
+    val = st.text_input(label, key=key)
+    val = ''.join(filter(str.isdigit, val))[:max_length]
+    return val
 
-# ----------------------------------------------------------------------
-# Option 2: Proforma Receipt
-# ----------------------------------------------------------------------
-elif option == "Partial Proforma Receipt":
-    from docxtpl import DocxTemplate
-    from datetime import datetime
 
-    TEMPLATE_PATH = "Orbit Agritech Proforma Receipt Partial.docx"
+def receipt_page(kind):
+    """The partial or full proforma receipt form; they differ only in the balance and delivery fields."""
+    from datetime import datetime
+    from documents import PARTIAL_RECEIPT, receipt_context
 
+    partial = kind == PARTIAL_RECEIPT
     st.subheader("Proforma Receipt Generator")
 
-    def numeric_input(label, max_length, key=None):
-        val = st.text_input(label, key=key)
-        val = ''.join(filter(str.isdigit, val))[:max_length]
-        return val
-
     receipt_no = numeric_input("Receipt Number (4 digits)", max_length=4, key="receipt_no")
+    next_number_button("receipt_no", kind)
     date = st.date_input("Date", datetime.today(), key="date").strftime("%d/%m/%Y")
     customer_name = st.text_input("Customer Name", max_chars=50, key="customer_name")
     address_line1 = st.text_input("Address", max_chars=200, key="address_line1")
@@ -222,238 +245,387 @@ elif option == "Partial Proforma Receipt":
 
     reference_id = st.text_input("Reference ID (optional)", max_chars=20, key="reference_id")
     payment_date = st.date_input("Date of Payment", datetime.today(), key="payment_date").strftime("%d/%m/%Y")
-    balance_due = st.text_input("Balance Due (Rs.)", max_chars=10, key="balance_due")
-    tentative_delivery = st.date_input("Tentative Delivery Date", datetime.today(), key="tentative_delivery").strftime("%d/%m/%Y")
+    if partial:
+        balance_due = st.text_input("Balance Due (Rs.)", max_chars=10, key="balance_due")
+        delivery_date = st.date_input("Tentative Delivery Date", datetime.today(), key="tentative_delivery")
+    else:
+        balance_due = ""
+        delivery_date = st.date_input("Delivery Date", datetime.today(), key="delivery_date")
+    delivery_date = delivery_date.strftime("%d/%m/%Y")
 
     st.markdown("---")
     st.subheader("Enter Quantities for Items (Minimum quantities enforced)")
 
-    quantity_pt_pro = st.number_input(
-        "12 HP PT Pro", min_value=0, step=1, value=1, key="qty_pt_pro"
-    )
-    quantity_battery = st.number_input(
-        "Battery Sets", min_value=0, step=1, value=1, key="qty_battery"
-    )
-    quantity_charger = st.number_input(
-        "Fast Chargers", min_value=0, step=1, value=2, key="qty_charger"
-    )
-    quantity_blade_weeding = st.number_input(
-        "1 Set of Sugarcane Blades(Weeding)", min_value=0, step=1, value=0, key="qty_blade_weeding"
-    )
-    quantity_blade_earthing = st.number_input(
-        "1 Set of Sugarcane Blades(Earthing-up)", min_value=0, step=1, value=0, key="qty_blade_earthing"
-    )
-    quantity_tyres = st.number_input(
-        "1 Set of Tyres (5x10)", min_value=0, step=1, value=0, key="qty_tyres"
-    )
-    quantity_toolkit = st.number_input(
-        "Toolkit", min_value=0, step=1, value=0, key="qty_toolkit"
-    )
-    quantity_ginger = st.number_input(
-        "Ginger Kit", min_value=0, step=1, value=0, key="qty_ginger"
-    )
-    quantity_seat = st.number_input(
-        "Seat", min_value=0, step=1, value=0, key="qty_seat"
-    )
-    quantity_jack = st.number_input(
-        "Jack", min_value=0, step=1, value=0, key="qty_jack"
-    )
-    quantity_buyback_guarantee = st.number_input(
-        "BuyBack Guarantee", min_value=0, step=1, value=0, key="qty_buyback_guarantee"
-    )
-    quantity_front_dead_weight = st.number_input(
-        "Front Dead Weight", min_value=0, step=1, value=0, key="qty_front_dead_weight"
-    )
-    quantity_wheel_dead_weight = st.number_input(
-        "Wheel Dead Weight", min_value=0, step=1, value=0, key="qty_wheel_dead_weight"
-    )
+    quantity_grid("qty_")
+    quantities = session_quantities("qty_")
 
-    if st.button("Generate Receipt DOCX"):
+    prefix = "partial" if partial else "full"
+    output_format = st.radio("Output format", ["DOCX", "PDF"], horizontal=True, key=f"{prefix}_format")
+    if st.button(f"Generate Receipt {output_format}"):
         if not receipt_no:
             st.error("Receipt Number is required and must be numeric up to 4 digits.")
         elif len(phone) != 10:
             st.error("Phone Number must be exactly 10 digits.")
         else:
-            doc = DocxTemplate(TEMPLATE_PATH)
-
-            context = {
-                "receipt_no": receipt_no,
-                "date": date,
-                "customer_name": customer_name,
-                "address_line1": address_line1,
-                "phone": phone,
-                "email": email if email else "N/A",
-                "amount_received": amount_received,
-                "payment_mode": final_payment_mode,
-                "reference_id": reference_id if reference_id else "N/A",
-                "payment_date": payment_date,
-                "balance_due": balance_due,
-                "tentative_delivery": tentative_delivery,
-
-                # Quantities passed as placeholders
-                "quantity_pt_pro": quantity_pt_pro,
-                "quantity_battery": quantity_battery,
-                "quantity_charger": quantity_charger,
-                "quantity_blade_weeding": quantity_blade_weeding,
-                "quantity_blade_earthing": quantity_blade_earthing,
-                "quantity_tyres": quantity_tyres,
-                "quantity_toolkit": quantity_toolkit,
-                "quantity_ginger": quantity_ginger,
-                "quantity_seat": quantity_seat,
-                "quantity_jack": quantity_jack,
-                "quantity_buyback_guarantee": quantity_buyback_guarantee,
-                "quantity_front_dead_weight": quantity_front_dead_weight,
-                "quantity_wheel_dead_weight": quantity_wheel_dead_weight
-            }
+            context = receipt_context(
+                kind, receipt_no, date, customer_name, address_line1, phone, email, quantities,
+                amount_received=amount_received,
+                payment_mode=final_payment_mode,
+                reference_id=reference_id,
+                payment_date=payment_date,
+                balance_due=balance_due,
+                delivery_date=delivery_date,
+            )
+            start_render(f"{prefix}_render_job", kind, context, output_format)
 
-            try:
-                doc.render(context)
-                output_filename = f"Orbit_Agritech_Proforma_Receipt_{receipt_no}.docx"
-                doc.save(output_filename)
-                st.success(f"Receipt generated: {output_filename}")
-
-                with open(output_filename, "rb") as file:
-                    st.download_button(
-                        label="Download Receipt DOCX",
-                        data=file,
-                        file_name=output_filename,
-                        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                    )
-            except Exception as e:
-                st.error("❌ Error rendering document.")
-                st.exception(e)
+    show_render_result(f"{prefix}_render_job", "Receipt generated", "Download Receipt {format}")
+
+
+ADMIN_PASSWORD = os.environ.get("ORBIT_ADMIN_PASSWORD", "")
+
+# App Selector
+options = ["Quotation Summary", "Partial Proforma Receipt", "Full Proforma Receipt", "Batch Generation", "Document Ledger"]
+if ADMIN_PASSWORD:
+    options.append("Admin: Metrics")
+option = st.radio("Select Document Type:", options)
 
 # ----------------------------------------------------------------------
-# Option 3: FULL Proforma Receipt
+# Option 1: Quotation Summary (MODIFIED)
 # ----------------------------------------------------------------------
-elif option == "Full Proforma Receipt":
-    from docxtpl import DocxTemplate
+if option == "Quotation Summary":
+    from documents import QUOTATION, max_subsidy, quotation_context
     from datetime import datetime
 
-    TEMPLATE_PATH = "Orbit Agritech Proforma Receipt Full.docx"
-
-    st.subheader("Proforma Receipt Generator")
 
-    def numeric_input(label, max_length, key=None):
-        val = st.text_input(label, key=key)
-        val = ''.join(filter(str.isdigit, val))[:max_length]
-        return val
+    if "selected_subsidy" not in st.session_state:
+        st.session_state.selected_subsidy = 0
 
-    receipt_no = numeric_input("Receipt Number (4 digits)", max_length=4, key="receipt_no")
-    date = st.date_input("Date", datetime.today(), key="date").strftime("%d/%m/%Y")
-    customer_name = st.text_input("Customer Name", max_chars=50, key="customer_name")
-    address_line1 = st.text_input("Address", max_chars=200, key="address_line1")
-    phone = numeric_input("Phone Number (10 digits)", max_length=10, key="phone")
-    email = st.text_input("Email (optional)", max_chars=50, key="email")
-    amount_received = st.text_input("Amount Received (₹)", max_chars=10, key="amount_received")
+    if "form_filled_by" not in st.session_state:
+        st.session_state.form_filled_by = ""
 
-    st.markdown("**Payment Mode:**")
-    payment_mode = st.selectbox("", ["Cashfree", "Cash", "Other"], key="payment_mode")
+    st.subheader("Customer Information")
 
-    if payment_mode == "Other":
-        custom_payment_mode = st.text_input("Enter Other Payment Mode", key="custom_payment_mode")
-        final_payment_mode = custom_payment_mode.strip() if custom_payment_mode else "Other"
-    else:
-        final_payment_mode = payment_mode
+    receipt_no = numeric_input("Quotation Number (4 digits)", max_length=4, key="quote_receipt_no")
+    next_number_button("quote_receipt_no", QUOTATION)
+    date = st.date_input("Date", datetime.today(), key="quote_date").strftime("%d/%m/%Y")
+    customer_name = st.text_input("Customer Name *", key="quote_customer_name")
+    customer_address = st.text_area("Address *", key="quote_address")
+    customer_phone = numeric_input("Phone Number * (10 digits)", max_length=10, key="quote_phone")
+    email = st.text_input("Email (optional)", max_chars=50, key="quote_email")
 
-    reference_id = st.text_input("Reference ID (optional)", max_chars=20, key="reference_id")
-    payment_date = st.date_input("Date of Payment", datetime.today(), key="payment_date").strftime("%d/%m/%Y")
-    delivery_date = st.date_input("Delivery Date", datetime.today(), key="delivery_date").strftime("%d/%m/%Y")
+    st.subheader("Who is filling this form? *")
+    form_filled_by = st.selectbox("Select Role", ["", "Telecaller", "Business Development Officer", "Manager", "Co-Founder"], key="quote_filler")
+    st.session_state.form_filled_by = form_filled_by
 
     st.markdown("---")
-    st.subheader("Enter Quantities for Items (Minimum quantities enforced)")
+    st.subheader("Enter Quantities for Items")
+    batch_edits = st.toggle("Update the bill only when I press 'Update bill'", key="quote_batch_edits",
+                            help="Fewer round trips on slow connections.")
+
+    # Quantities, subsidy and bill summary rerun on their own, without the
+    # customer fields above
+    @st.fragment
+    def quotation_bill(receipt_no, date, customer_name, customer_address, customer_phone, email, form_filled_by):
+        # One input per catalog item, similar to proforma receipts
+        if batch_edits:
+            with st.form("quote_quantities_form", border=False):
+                quantity_inputs("quote_qty_")
+                st.form_submit_button("Update bill")
+        else:
+            quantity_inputs("quote_qty_")
+
+        bill = running_bill("quote_qty_")
+        quantities, total_price = bill["quantities"], bill["total"]
+        selected_items_summary = [
+            {"name": item["name"], "qty": quantities[item["key"]]} for item in get_catalog() if quantities[item["key"]]
+        ]
+
+        st.markdown("---")
+        st.write("### 💸 Subsidy Options")
+
+        apply_subsidy = st.radio("Do you want to apply a Subsidy?", ("No", "Yes"), key="quote_subsidy_radio")
+
+        if apply_subsidy == "Yes" and form_filled_by:
+            st.markdown("#### Select Subsidy Amount")
+            st.slider(
+                "Subsidy Slider",
+                min_value=0,
+                max_value=max_subsidy(form_filled_by, quantities.get("quantity_battery", 0)),
+                step=1000,
+                key="selected_subsidy"
+            )
+            st.success(f"Selected Subsidy: ₹{st.session_state.selected_subsidy:,.0f}")
+        else:
+            st.session_state.selected_subsidy = 0
+
+        selected_subsidy = st.session_state.selected_subsidy
+        final_price = total_price - selected_subsidy
+
+        st.markdown("---")
+        st.write("### 📟 Bill Summary")
+
+        if selected_items_summary:
+            st.table({
+                "Item Name": [item["name"] for item in selected_items_summary],
+                "Quantity": [item["qty"] for item in selected_items_summary]
+            })
+
+            st.write(f"**Total Price:** Rs {total_price:,.0f}")
+            st.write(f"**Subsidy Applied:** Rs {selected_subsidy:,.0f}")
+            st.write(f"**Subsidized Price (All Inclusive):** Rs {final_price:,.0f}")
+
+            output_format = st.radio("Output format", ["DOCX", "PDF"], horizontal=True, key="quote_format")
+            if st.button(f"📄 Generate Quotation {output_format}"):
+                if not receipt_no:
+                    st.error("Quotation Number is required and must be numeric up to 4 digits.")
+                elif len(customer_phone) != 10:
+                    st.error("Phone Number must be exactly 10 digits.")
+                else:
+                    try:
+                        context = quotation_context(
+                            receipt_no, date, customer_name, customer_address, customer_phone, email, quantities,
+                            subsidy=selected_subsidy, form_filled_by=form_filled_by,
+                        )
+                    except ValueError as e:
+                        st.error(str(e))
+                    else:
+                        start_render("quote_render_job", QUOTATION, context, output_format, form_filled_by=form_filled_by)
+        else:
+            st.info("Please enter quantities for items to see the bill.")
 
-    quantity_pt_pro = st.number_input(
-        "12 HP PT Pro", min_value=0, step=1, value=1, key="qty_pt_pro"
-    )
-    quantity_battery = st.number_input(
-        "Battery Sets", min_value=0, step=1, value=1, key="qty_battery"
-    )
-    quantity_charger = st.number_input(
-        "Fast Chargers", min_value=0, step=1, value=2, key="qty_charger"
-    )
-    quantity_blade_weeding = st.number_input(
-        "1 Set of Sugarcane Blades(Weeding)", min_value=0, step=1, value=0, key="qty_blade_weeding"
-    )
-    quantity_blade_earthing = st.number_input(
-        "1 Set of Sugarcane Blades(Earthing-up)", min_value=0, step=1, value=0, key="qty_blade_earthing"
-    )
-    quantity_tyres = st.number_input(
-        "1 Set of Tyres (5x10)", min_value=0, step=1, value=0, key="qty_tyres"
-    )
-    quantity_toolkit = st.number_input(
-        "Toolkit", min_value=0, step=1, value=0, key="qty_toolkit"
-    )
-    quantity_ginger = st.number_input(
-        "Ginger Kit", min_value=0, step=1, value=0, key="qty_ginger"
+        show_render_result(
+            "quote_render_job", "Quotation generated", "⬇️ Click here to Download {format} Quotation",
+            error_message="❌ Error rendering document. Make sure 'Orbit Agritech Quotation Summary.docx' is in the same directory."
+        )
+
+    quotation_bill(receipt_no, date, customer_name, customer_address, customer_phone, email, form_filled_by)
+
+# ----------------------------------------------------------------------
+# Option 2: Proforma Receipt
+# ----------------------------------------------------------------------
+elif option == "Partial Proforma Receipt":
+    from documents import PARTIAL_RECEIPT
+
+    receipt_page(PARTIAL_RECEIPT)
+
+# ----------------------------------------------------------------------
+# Option 3: FULL Proforma Receipt
+# ----------------------------------------------------------------------
+elif option == "Full Proforma Receipt":
+    from documents import FULL_RECEIPT
+
+    receipt_page(FULL_RECEIPT)
+
+# ----------------------------------------------------------------------
+# Option 4: Batch Generation from CSV / Excel
+# ----------------------------------------------------------------------
+elif option == "Batch Generation":
+    from batch import generate_batch, read_rows
+    from engine import DOCUMENT_ALIASES
+
+    st.subheader("Batch Document Generator")
+    st.caption(
+        "Upload a CSV or Excel sheet with one document per row. Columns: receipt_no, phone, "
+        "customer_name, address, email, date, role, subsidy and the quantity_* item keys "
+        "(blank quantities use the form defaults). Receipts also take amount_received, "
+        "payment_mode, reference_id, payment_date, balance_due and delivery_date."
     )
-    quantity_seat = st.number_input(
-        "Seat", min_value=0, step=1, value=0, key="qty_seat"
+
+    batch_document = st.selectbox(
+        "Document type (for rows without a 'document' column)",
+        ["Quotation Summary", "Partial Proforma Receipt", "Full Proforma Receipt"],
+        key="batch_document",
     )
-    quantity_jack = st.number_input(
-        "Jack", min_value=0, step=1, value=0, key="qty_jack"
+    uploaded = st.file_uploader("Customer sheet", type=["csv", "xlsx"], key="batch_file")
+
+    if uploaded is not None and st.button("Generate Batch ZIP"):
+        try:
+            rows = read_rows(uploaded, filename=uploaded.name)
+        except Exception as e:
+            st.error("❌ Could not read the uploaded sheet.")
+            st.exception(e)
+        else:
+            progress_bar = st.progress(0.0, text=f"Rendering {len(rows)} rows...")
+
+            def report_progress(done, total):
+                progress_bar.progress(done / total, text=f"{done}/{total} rows")
+
+            zip_path = new_download_file()
+            try:
+                result = generate_batch(
+                    rows, zip_path,
+                    default_document=DOCUMENT_ALIASES[batch_document.lower()],
+                    progress=report_progress if rows else None,
+                    ledger=get_ledger(),
+                )
+            except BaseException:
+                os.remove(zip_path)
+                raise
+            st.success(result.summary().split(" -> ")[0])
+            if result.errors:
+                st.warning(f"{len(result.errors)} rows were skipped (listed in errors.csv inside the ZIP).")
+                st.table({
+                    "Row": [row_no for row_no, _, _ in result.errors],
+                    "Number": [receipt_no for _, receipt_no, _ in result.errors],
+                    "Error": [message for _, _, message in result.errors],
+                })
+            download_file("⬇️ Download Batch ZIP", zip_path, "Orbit_Agritech_Batch.zip", "application/zip")
+
+# ----------------------------------------------------------------------
+# Option 5: Document Ledger (search and re-download)
+# ----------------------------------------------------------------------
+elif option == "Document Ledger":
+    from datetime import date, timedelta
+    from documents import FULL_RECEIPT, PARTIAL_RECEIPT, QUOTATION
+
+    kind_labels = {QUOTATION: "Quotation", PARTIAL_RECEIPT: "Partial Receipt", FULL_RECEIPT: "Full Receipt"}
+
+    st.subheader("Document Ledger")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        search_no = numeric_input("Quotation / Receipt Number", max_length=4, key="ledger_number")
+    with col2:
+        search_phone = numeric_input("Phone Number", max_length=10, key="ledger_phone")
+    with col3:
+        search_kind = st.selectbox("Document Type", ["All"] + list(kind_labels.values()), key="ledger_kind")
+    date_range = st.date_input(
+        "Issued between", (date.today() - timedelta(days=30), date.today()), key="ledger_dates"
     )
-    quantity_buyback_guarantee = st.number_input(
-        "BuyBack Guarantee", min_value=0, step=1, value=0, key="qty_buyback_guarantee"
+    # The range has a single date while the second one is still being picked
+    date_from, date_to = (tuple(date_range) + (None,))[:2]
+
+    kind_filter = next((k for k, label in kind_labels.items() if label == search_kind), None)
+    rows = get_ledger().search(
+        receipt_no=search_no, phone=search_phone, date_from=date_from, date_to=date_to, kind=kind_filter
     )
-    quantity_front_dead_weight = st.number_input(
-        "Front Dead Weight", min_value=0, step=1, value=0, key="qty_front_dead_weight"
+
+    if rows:
+        st.dataframe(
+            {
+                "ID": [row["id"] for row in rows],
+                "Type": [kind_labels.get(row["kind"], row["kind"]) for row in rows],
+                "Number": [row["receipt_no"] for row in rows],
+                "Date": [row["issued_on"] for row in rows],
+                "Customer": [row["customer_name"] for row in rows],
+                "Phone": [row["phone"] for row in rows],
+                "Total (Rs)": [row["total_price"] for row in rows],
+                "Subsidy (Rs)": [row["subsidy"] for row in rows],
+                "Final (Rs)": [row["final_price"] for row in rows],
+                "Filled by": [row["form_filled_by"] for row in rows],
+            },
+            hide_index=True,
+        )
+
+        by_id = {row["id"]: row for row in rows}
+        selected_id = st.selectbox(
+            "Document to re-download",
+            list(by_id),
+            format_func=lambda i: f"#{i} {kind_labels.get(by_id[i]['kind'])} {by_id[i]['receipt_no']} - {by_id[i]['customer_name']}",
+            key="ledger_selected",
+        )
+        output_format = st.radio("Output format", ["DOCX", "PDF"], horizontal=True, key="ledger_format")
+        if st.button(f"Re-generate {output_format}"):
+            row = by_id[selected_id]
+            # Re-rendered from the stored context with the current template
+            start_render("ledger_render_job", row["kind"], json.loads(row["context"]), output_format, record=False)
+    else:
+        st.info("No documents match these filters.")
+
+    show_render_result("ledger_render_job", "Document regenerated", "⬇️ Download {format}")
+
+    st.markdown("---")
+    st.subheader("Export Date Range")
+    st.caption(
+        "Every document issued in the dates above as one ZIP, one folder per document type. Documents "
+        "no longer cached are re-rendered from the ledger; index.csv inside lists them all."
     )
-    quantity_wheel_dead_weight = st.number_input(
-        "Wheel Dead Weight", min_value=0, step=1, value=0, key="qty_wheel_dead_weight"
+    export_kinds = st.multiselect(
+        "Document types", list(kind_labels), default=[PARTIAL_RECEIPT, FULL_RECEIPT],
+        format_func=kind_labels.get, key="ledger_export_kinds",
     )
+    if date_from and date_to and export_kinds and st.button("Build Export ZIP"):
+        from export import export_range
+
+        status = st.empty()
+
+        def report_progress(done):
+            status.text(f"{done} documents added...")
+
+        zip_path = new_download_file()
+        try:
+            # Written to disk as it streams
+            with open(zip_path, "wb") as spool:
+                for chunk in export_range(date_from, date_to, export_kinds, progress=report_progress):
+                    spool.write(chunk)
+        except BaseException:
+            os.remove(zip_path)
+            raise
+        status.empty()
+        st.success(f"Export ready: {os.path.getsize(zip_path) / 1e6:.1f} MB")
+        download_file("⬇️ Download Export ZIP", zip_path, f"Orbit_Agritech_Documents_{date_from}_{date_to}.zip",
+                      "application/zip")
+        st.caption("The download is read into the app's memory when clicked. For very large ranges, "
+                   "GET /export on api.py streams the ZIP straight to the client instead.")
 
-    if st.button("Generate Receipt DOCX"):
-        if not receipt_no:
-            st.error("Receipt Number is required and must be numeric up to 4 digits.")
-        elif len(phone) != 10:
-            st.error("Phone Number must be exactly 10 digits.")
-        else:
-            doc = DocxTemplate(TEMPLATE_PATH)
-
-            context = {
-                "receipt_no": receipt_no,
-                "date": date,
-                "customer_name": customer_name,
-                "address_line1": address_line1,
-                "phone": phone,
-                "email": email if email else "N/A",
-                "amount_received": amount_received,
-                "payment_mode": final_payment_mode,
-                "reference_id": reference_id if reference_id else "N/A",
-                "payment_date": payment_date,
-                # "balance_due": balance_due,
-                "delivery_date": delivery_date,
-
-                # Quantities passed as placeholders
-                "quantity_pt_pro": quantity_pt_pro,
-                "quantity_battery": quantity_battery,
-                "quantity_charger": quantity_charger,
-                "quantity_blade_weeding": quantity_blade_weeding,
-                "quantity_blade_earthing": quantity_blade_earthing,
-                "quantity_tyres": quantity_tyres,
-                "quantity_toolkit": quantity_toolkit,
-                "quantity_ginger": quantity_ginger,
-                "quantity_seat": quantity_seat,
-                "quantity_jack": quantity_jack,
-                "quantity_buyback_guarantee": quantity_buyback_guarantee,
-                "quantity_front_dead_weight": quantity_front_dead_weight,
-                "quantity_wheel_dead_weight": quantity_wheel_dead_weight
-            }
-
-            try:
-                doc.render(context)
-                output_filename = f"Orbit_Agritech_Proforma_Receipt_{receipt_no}.docx"
-                doc.save(output_filename)
-                st.success(f"Receipt generated: {output_filename}")
-
-                with open(output_filename, "rb") as file:
-                    st.download_button(
-                        label="Download Receipt DOCX",
-                        data=file,
-                        file_name=output_filename,
-                        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                    )
-            except Exception as e:
-                st.error("❌ Error rendering document.")
-                st.exception(e)
\ No newline at end of file
+# ----------------------------------------------------------------------
+# Option 6: Admin metrics (only offered when ORBIT_ADMIN_PASSWORD is set)
+# ----------------------------------------------------------------------
+elif option == "Admin: Metrics":
+    import hmac
+
+    # st.stop() below ends the script before the startup() call at the bottom
+    startup()
+    st.subheader("Live Metrics")
+    password = st.text_input("Admin password", type="password", key="admin_password")
+    if not hmac.compare_digest(password, ADMIN_PASSWORD):
+        if password:
+            st.error("Wrong password.")
+        st.stop()
+
+    @st.fragment(run_every=2)
+    def live_metrics():
+        spans, documents = metrics.snapshot()
+        st.markdown("**Generation steps** (p50/p95 are histogram bucket upper bounds)")
+        st.dataframe(
+            {
+                "Step": list(spans),
+                "Count": [h.count for h in spans.values()],
+                "Avg (ms)": [round(h.total / h.count * 1000, 2) for h in spans.values()],
+                "p50 (ms) ≤": [h.quantile(0.5) * 1000 for h in spans.values()],
+                "p95 (ms) ≤": [h.quantile(0.95) * 1000 for h in spans.values()],
+            },
+            hide_index=True,
+        )
+        st.markdown("**Documents generated**")
+        st.dataframe(
+            {
+                "Type": [kind for kind, _, _ in documents],
+                "Filled by": [role for _, role, _ in documents],
+                "Format": [output_format for _, _, output_format in documents],
+                "Count": list(documents.values()),
+            },
+            hide_index=True,
+        )
+        from render_service import get_render_service
+
+        st.markdown("**Render service**")
+        st.json(get_render_service().metrics(), expanded=False)
+
+    live_metrics()
+    if metrics.METRICS_PORT:
+        st.caption(f"Prometheus: http://{metrics.METRICS_HOST}:{metrics.METRICS_PORT}/metrics")
+
+    st.markdown("**Profile a single render**")
+    if st.button("Profile the next render"):
+        metrics.profile_next_render()
+        st.info("The next document rendered by any session will be profiled.")
+    if metrics.last_profile:
+        profile = metrics.last_profile
+        st.caption(f"{profile['tool']} capture of {profile['label']} at {profile['captured_at']}, "
+                   f"{profile['seconds'] * 1000:.0f} ms")
+        st.code(profile["text"], language=None)
+
+# Kick off the warm-up only after the page has been drawn so the background
+# imports do not compete with the first paint
+startup()
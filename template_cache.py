@@ -0,0 +1,145 @@
+import copy
+import hashlib
+import io
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from docx import Document
+from docxtpl import DocxTemplate
+
+from assets import optimized_template
+from metrics import span
+
+_logger = logging.getLogger(__name__)
+
+# Render through fast_template.CompiledTemplate where the template allows it
+FAST_TEMPLATES = os.environ.get("ORBIT_FAST_TEMPLATES", "1") != "0"
+
+
+class _Entry:
+    def __init__(self, signature, source, digest, data, document):
+        self.signature = signature
+        self.source = source  # file the template is rendered from (the optimized copy if any)
+        self.digest = digest
+        self.data = data
+        self.document = document
+        self.compiled = None  # CompiledTemplate, False if unsupported, None until built
+
+
+class TemplateCache:
+    """Parses each .docx template once per process and hands out per-render copies.
+
+    Entries are keyed by absolute path. A changed mtime/size triggers a re-read;
+    the template is only re-parsed if the content hash changed too. Templates
+    are rendered from their optimized copies (see assets.py). At most
+    ``max_entries`` parsed templates are kept (least recently used is dropped).
+    """
+
+    def __init__(self, max_entries=8, verify_hash=False):
+        self.max_entries = max_entries
+        # Re-hash the file on every lookup, for filesystems with coarse mtimes
+        self.verify_hash = verify_hash
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _signature(path):
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load(self, path):
+        path = os.path.abspath(path)
+        signature = self._signature(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.signature == signature and not self.verify_hash:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry
+
+        with open(path, "rb") as fh:
+            data = fh.read()
+        source, data = optimized_template(path, data)
+        digest = hashlib.sha256(data).hexdigest()
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.digest == digest:
+                # Touched but unchanged: keep the parsed document
+                entry.signature = signature
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry
+
+        # Parse outside the lock so other templates are not held up
+        entry = _Entry(signature, source, digest, data, Document(io.BytesIO(data)))
+        with self._lock:
+            self.misses += 1
+            self._entries[path] = entry
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def get(self, path):
+        """Return a fresh DocxTemplate backed by a copy of the cached document."""
+        with span("template_load"):
+            entry = self._load(path)
+            doc = DocxTemplate(entry.source)
+            doc.docx = copy.deepcopy(entry.document)
+        return doc
+
+    def compiled(self, path):
+        """CompiledTemplate for ``path``, or None if fast rendering is off or unsupported."""
+        if not FAST_TEMPLATES:
+            return None
+        entry = self._load(path)
+        if entry.compiled is None:
+            from fast_template import FORMAT_VERSION, CompiledTemplate, UnsupportedTemplate
+            from storage import get_storage
+
+            storage = get_storage()
+            with span("template_compile"):
+                try:
+                    # Two threads may both compile once; either result is fine
+                    if storage is None:
+                        entry.compiled = CompiledTemplate(entry.data)
+                    else:
+                        # Compiled by one worker, loaded by the others
+                        data = storage.get_or_create(f"template:{entry.digest}:{FORMAT_VERSION}",
+                                                     lambda: CompiledTemplate(entry.data).dumps())
+                        entry.compiled = CompiledTemplate.loads(data)
+                except UnsupportedTemplate as e:
+                    _logger.info("Rendering %s with docxtpl: %s", path, e)
+                    entry.compiled = False
+        return entry.compiled or None
+
+    def version(self, path):
+        """Content hash of the template currently in use for ``path``."""
+        return self._load(path).digest
+
+    def data(self, path):
+        """Raw bytes of the template currently in use for ``path``."""
+        return self._load(path).data
+
+    def invalidate(self, path=None):
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.abspath(path), None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Shared by every Streamlit session in this process
+template_cache = TemplateCache()
+
+
+def get_template(path):
+    return template_cache.get(path)
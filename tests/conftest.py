@@ -0,0 +1,24 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Settings are read at import time: keep the tests off the real ledger, PDF
+# cache and shared storage
+_scratch = tempfile.mkdtemp(prefix="orbit-tests-")
+os.environ["ORBIT_LEDGER"] = os.path.join(_scratch, "ledger.sqlite3")
+os.environ["ORBIT_PDF_CACHE"] = os.path.join(_scratch, "pdf-cache")
+os.environ.pop("ORBIT_STORAGE", None)
+os.environ.pop("ORBIT_API_TOKEN", None)
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    from ledger import Ledger
+
+    return Ledger(str(tmp_path / "ledger.sqlite3"))
+
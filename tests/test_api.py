@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+import pytest
+
+import api
+
+
+def call(method, path, body=b"", token=None):
+    """(status, headers, body) of one request to the app, without a server."""
+
+    async def run():
+        response, finished = {"body": []}, asyncio.Event()
+        requests = [{"type": "http.request", "body": body, "more_body": False}]
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            await finished.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = {k.decode(): v.decode() for k, v in message["headers"]}
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+                if not message.get("more_body"):
+                    finished.set()
+
+        headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+        scope = {"type": "http", "method": method, "path": path, "root_path": "", "scheme": "http",
+                 "query_string": b"", "headers": headers, "http_version": "1.1",
+                 "server": ("test", 80), "client": ("test", 1)}
+        await api.app(scope, receive, send)
+        return response["status"], response["headers"], b"".join(response["body"])
+
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def token(monkeypatch):
+    monkeypatch.setattr(api, "API_TOKEN", "secret")
+    return "secret"
+
+
+@pytest.mark.parametrize("path", ["/health", "/metrics"])
+def test_monitoring_endpoints_need_the_token(token, path):
+    assert call("GET", path)[0] == 401
+    assert call("GET", path, token="wrong")[0] == 401
+    status, headers, body = call("GET", path, token=token)
+    assert status == 200
+    if path == "/health":
+        assert "queue_depth" in json.loads(body)
+    else:
+        assert headers["content-type"].startswith("text/plain")
+
+
+@pytest.mark.parametrize("path", ["/health", "/metrics"])
+def test_monitoring_endpoints_are_open_without_a_token(path):
+    assert call("GET", path)[0] == 200
+
+
+def render(payload, token=None):
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+    return call("POST", "/render", body, token=token)
+
+
+REQUEST = {"receipt_no": "0042", "phone": "9876543210", "customer_name": "API Test", "record": False}
+
+
+@pytest.mark.parametrize("body", [b"{not json", b"", b"[1, 2]", b'"text"'])
+def test_render_rejects_a_body_that_is_not_a_json_object(body):
+    status, _, data = render(body)
+    assert status == 400
+    assert json.loads(data) == {"error": "Request body must be a JSON object."}
+
+
+@pytest.mark.parametrize("fields, message", [
+    ({"format": "odt"}, "Unknown format 'ODT'."),
+    ({"phone": "12345"}, "10"),
+    ({"receipt_no": "12345"}, "Quotation Number"),
+    ({"document": "full", "receipt_no": ""}, "Receipt Number"),
+    ({"document": "invoice"}, "Unknown document type"),
+])
+def test_render_reports_invalid_fields_as_422(fields, message):
+    status, _, data = render({**REQUEST, **fields})
+    assert status == 422
+    assert message in json.loads(data)["error"]
+
+
+def test_render_needs_the_token_when_one_is_set(token):
+    assert render(REQUEST)[0] == 401
+    assert render(REQUEST, token="wrong")[0] == 401
+    # Checked before the body is looked at
+    assert render(b"{not json")[0] == 401
+    status, headers, data = render(REQUEST, token=token)
+    assert status == 200
+    assert data[:2] == b"PK"
+    assert headers["content-disposition"].endswith('_0042.docx"')
+
+
+def test_render_returns_a_pdf_when_asked():
+    status, headers, data = render({**REQUEST, "format": "pdf"})
+    assert status == 200
+    assert headers["content-type"] == "application/pdf"
+    assert data.startswith(b"%PDF")
@@ -0,0 +1,66 @@
+import itertools
+import json
+import os
+
+import pytest
+
+from catalog import get_catalog
+
+_writes = itertools.count(1)
+
+
+def write_catalog(path, price=100, text=None):
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write(text if text is not None else json.dumps({"items": [
+            {"name": "Pump", "key": "pump", "price": price},
+            {"name": "Panel", "key": "panel", "price": 50},
+        ]}))
+    # Make every write visible even on filesystems with coarse mtimes
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + next(_writes) * 10**9))
+
+
+def test_an_unchanged_catalog_is_read_once(tmp_path):
+    path = str(tmp_path / "catalog.json")
+    write_catalog(path)
+    assert get_catalog(path) is get_catalog(path)
+
+
+def test_an_edited_catalog_is_picked_up(tmp_path):
+    path = str(tmp_path / "catalog.json")
+    write_catalog(path)
+    assert get_catalog(path).total({"pump": 2, "panel": 1}) == 250
+    write_catalog(path, price=120)
+    catalog = get_catalog(path)
+    assert catalog.total({"pump": 2, "panel": 1}) == 290
+    assert catalog.version == os.stat(path).st_mtime_ns
+
+
+@pytest.mark.parametrize("broken", [
+    "{\"items\": [",  # half-written
+    json.dumps({"items": [{"name": "Pump", "key": "pump"}]}),  # no price
+    json.dumps({"items": [{"name": "A", "key": "a", "price": 1}, {"name": "B", "key": "a", "price": 2}]}),
+    json.dumps({"products": []}),
+    None,  # briefly missing while it is replaced
+])
+def test_a_broken_edit_keeps_the_last_good_catalog(tmp_path, broken):
+    path = str(tmp_path / "catalog.json")
+    write_catalog(path)
+    good = get_catalog(path)
+    if broken is None:
+        os.remove(path)
+    else:
+        write_catalog(path, text=broken)
+    assert get_catalog(path) is good
+    # and the fixed file is loaded again
+    write_catalog(path, price=120)
+    assert get_catalog(path).price_of["pump"] == 120
+
+
+def test_a_broken_catalog_fails_when_there_is_no_good_one(tmp_path):
+    path = str(tmp_path / "catalog.json")
+    write_catalog(path, text="{")
+    with pytest.raises(ValueError):
+        get_catalog(path)
+    with pytest.raises(OSError):
+        get_catalog(str(tmp_path / "missing.json"))
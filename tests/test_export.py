@@ -0,0 +1,105 @@
+import asyncio
+import io
+import threading
+import zipfile
+from datetime import date
+
+import engine
+from ledger import make_entry
+
+
+def fill(ledger, count):
+    entries = []
+    for i in range(count):
+        fields = {"document": ("quotation", "partial", "full")[i % 3], "receipt_no": str(i + 1),
+                  "phone": "9876543210", "customer_name": f"Export Test {i + 1}", "amount_received": "50,000"}
+        kind, _, context = engine.build_context(fields)
+        entries.append(make_entry(kind, context, "DOCX"))
+    ledger.record_many(entries)
+
+
+def on_new_thread(fn, *args):
+    """``fn(*args)`` on a thread of its own, as a StreamingResponse may resume a generator."""
+    result = {}
+
+    def run():
+        try:
+            result["value"] = fn(*args)
+        except BaseException as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    thread.join()
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+
+def test_issued_between_resumes_on_other_threads(ledger):
+    fill(ledger, 7)
+    today = date.today()
+    readers = [ledger.issued_between(today, today, chunk_size=2) for _ in range(3)]
+    seen = [[] for _ in readers]
+    # Interleave the readers and move every step to a different thread
+    for _ in range(8):
+        for reader, rows in zip(readers, seen):
+            row = on_new_thread(next, reader, None)
+            if row is not None:
+                rows.append(row["id"])
+    expected = [row["id"] for row in ledger.search(limit=10)][::-1]
+    assert seen == [expected] * 3
+
+
+def test_issued_between_filters_kinds_across_pages(ledger):
+    fill(ledger, 9)
+    today = date.today()
+    rows = list(ledger.issued_between(today, today, kinds=["partial", "full"], chunk_size=2))
+    assert len(rows) == 6
+    assert {row["kind"] for row in rows} == {"partial", "full"}
+    assert [row["id"] for row in rows] == sorted(row["id"] for row in rows)
+
+
+def test_concurrent_api_exports(monkeypatch, ledger):
+    import api
+    import ledger as ledger_module
+
+    fill(ledger, 6)
+    monkeypatch.setattr(ledger_module, "get_ledger", lambda: ledger)
+    today = date.today().isoformat()
+
+    async def export():
+        body, status, finished = [], {}, asyncio.Event()
+        requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            # The client stays connected until the whole response is sent
+            await finished.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            elif message["type"] == "http.response.body":
+                body.append(message.get("body", b""))
+                if not message.get("more_body"):
+                    finished.set()
+
+        scope = {"type": "http", "method": "GET", "path": "/export", "root_path": "", "scheme": "http",
+                 "query_string": f"from={today}&to={today}".encode(), "headers": [],
+                 "http_version": "1.1", "server": ("test", 80), "client": ("test", 1)}
+        await api.app(scope, receive, send)
+        return status["code"], b"".join(body)
+
+    async def run_all():
+        return await asyncio.gather(*(export() for _ in range(4)))
+
+    for code, data in asyncio.run(run_all()):
+        assert code == 200
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            assert archive.testzip() is None
+            names = archive.namelist()
+        assert len(names) == 7  # six documents and index.csv
+        assert "index.csv" in names
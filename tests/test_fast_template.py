@@ -0,0 +1,63 @@
+import io
+import os
+import time
+from unittest import mock
+
+import pytest
+
+from documents import (FULL_RECEIPT, PARTIAL_RECEIPT, QUOTATION, default_quantities, quotation_context,
+                       receipt_context, template_path)
+from fast_template import CompiledTemplate, UnsupportedTemplate
+from template_cache import get_template, template_cache
+
+DATE_TIME = (2026, 10, 17, 12, 30, 44)
+
+
+def contexts(kind):
+    for number, name, address in (("0042", "Ramesh Patil", "At Post Wadgaon, Tal. Haveli, Pune"),
+                                  ("0043", "रमेश पाटील <& Sons>", "Flat 4\nShivaji Nagar\nPune"),
+                                  ("9999", "", "")):
+        common = dict(receipt_no=number, date="17/03/2027", customer_name=name, address=address,
+                      phone="9876543210", email="ramesh@example.com", quantities=default_quantities())
+        if kind == QUOTATION:
+            yield quotation_context(subsidy=65000, form_filled_by="Manager", **common)
+        else:
+            yield receipt_context(kind, amount_received="50,000", payment_mode="Cashfree", reference_id="CF12345",
+                                  payment_date="17/03/2027", balance_due="1,31,000", delivery_date="01/04/2027",
+                                  **common)
+
+
+def docxtpl_render(path, context):
+    doc = get_template(path)
+    doc.render(context)
+    buffer = io.BytesIO()
+    # zipfile stamps every member with time.localtime(time.time())
+    with mock.patch("time.localtime", lambda *args: time.struct_time(DATE_TIME + (0, 0, -1))):
+        doc.save(buffer)
+    return buffer.getvalue()
+
+
+@pytest.fixture(scope="module", params=[QUOTATION, PARTIAL_RECEIPT, FULL_RECEIPT])
+def template(request):
+    path = os.path.abspath(template_path(request.param))
+    return request.param, path, CompiledTemplate(template_cache.data(path))
+
+
+def test_compiled_render_is_byte_identical_to_docxtpl(template):
+    kind, path, compiled = template
+    for context in contexts(kind):
+        assert compiled.render(context, DATE_TIME) == docxtpl_render(path, context)
+
+
+def test_a_stored_template_renders_the_same(template):
+    kind, _, compiled = template
+    loaded = CompiledTemplate.loads(compiled.dumps())
+    for context in contexts(kind):
+        assert loaded.render(context, DATE_TIME) == compiled.render(context, DATE_TIME)
+
+
+def test_rich_context_values_need_docxtpl(template):
+    kind, _, compiled = template
+    context = dict(next(contexts(kind)), items=[{"name": "Pump"}])
+    with pytest.raises(UnsupportedTemplate):
+        compiled.render(context)
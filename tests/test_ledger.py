@@ -0,0 +1,82 @@
+import multiprocessing
+import threading
+from datetime import date
+
+import pytest
+
+import engine
+from ledger import QUOTATION_SERIES, Ledger, NumbersExhausted, make_entry
+
+
+def issue(ledger, receipt_no, day):
+    fields = {"document": "quotation", "receipt_no": str(receipt_no), "phone": "9876543210",
+              "date": day.isoformat()}
+    kind, _, context = engine.build_context(fields)
+    ledger.record_many([make_entry(kind, context)])
+
+
+def allocate(path, count, results):
+    ledger = Ledger(path)
+    results.put([ledger.next_number(QUOTATION_SERIES) for _ in range(count)])
+
+
+def test_next_number_is_unique_across_threads(ledger):
+    numbers, lock = [], threading.Lock()
+
+    def run():
+        mine = [ledger.next_number(QUOTATION_SERIES) for _ in range(25)]
+        with lock:
+            numbers.extend(mine)
+
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(numbers) == [f"{n:04d}" for n in range(1, 201)]
+
+
+def test_next_number_is_unique_across_processes(ledger):
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    processes = [ctx.Process(target=allocate, args=(ledger.path, 20, results)) for _ in range(3)]
+    for process in processes:
+        process.start()
+    numbers = [number for _ in processes for number in results.get(timeout=60)]
+    for process in processes:
+        process.join()
+    assert sorted(numbers) == [f"{n:04d}" for n in range(1, 61)]
+
+
+def test_next_number_skips_numbers_already_issued(ledger):
+    today = date.today()
+    issue(ledger, 42, today)
+    assert ledger.next_number(QUOTATION_SERIES, today) == "0043"
+
+
+def test_next_number_rolls_over_each_financial_year(ledger):
+    assert ledger.next_number(QUOTATION_SERIES, date(2026, 3, 31)) == "0001"
+    assert ledger.next_number(QUOTATION_SERIES, date(2026, 3, 31)) == "0002"
+    assert ledger.next_number(QUOTATION_SERIES, date(2026, 4, 1)) == "0001"
+    assert ledger.next_number(QUOTATION_SERIES, date(2027, 3, 31)) == "0002"
+
+
+def test_next_number_raises_when_the_year_is_used_up(ledger):
+    issue(ledger, 9999, date(2026, 6, 1))
+    with pytest.raises(NumbersExhausted):
+        ledger.next_number(QUOTATION_SERIES, date(2026, 6, 2))
+    # Nothing was allocated by the failed call, and the next year starts over
+    with pytest.raises(NumbersExhausted):
+        ledger.next_number(QUOTATION_SERIES, date(2026, 6, 2))
+    assert ledger.next_number(QUOTATION_SERIES, date(2027, 4, 1)) == "0001"
+
+
+def test_same_number_in_two_years_gets_two_file_names():
+    names = set()
+    for day in ("31/03/2026", "01/04/2026"):
+        fields = {"document": "full", "receipt_no": "0001", "phone": "9876543210", "date": day}
+        kind, filename, context = engine.build_context(fields)
+        assert engine.output_file(kind, context, "PDF")[0] == filename[:-len(".docx")] + ".pdf"
+        names.add(filename)
+    assert names == {"Orbit_Agritech_Proforma_Receipt_2025-26_0001.docx",
+                     "Orbit_Agritech_Proforma_Receipt_2026-27_0001.docx"}
@@ -0,0 +1,48 @@
+import hashlib
+import multiprocessing
+import os
+import random
+
+WORKERS = 3
+REQUESTS = [({"document": kind, "receipt_no": f"{i + 1:04d}", "phone": "9876543210",
+              "customer_name": f"Worker Test {i + 1}", "amount_received": "50,000"}, output_format)
+            for i, kind in enumerate(("quotation", "partial", "full")) for output_format in ("DOCX", "PDF")]
+
+
+def render_all(index, barrier, results):
+    import engine
+    from render_service import get_render_service
+    from storage import get_storage
+
+    jobs = list(REQUESTS)
+    random.Random(index).shuffle(jobs)
+    digests = {}
+    barrier.wait()
+    for fields, output_format in jobs:
+        kind, _, context = engine.build_context(fields)
+        data = engine.submit(kind, context, output_format).result()
+        digests[f"{fields['receipt_no']}.{output_format}"] = hashlib.sha256(data).hexdigest()
+    get_render_service().shutdown()
+    storage = get_storage()
+    results.put((digests, storage.misses))
+
+
+def test_workers_build_each_document_once_and_get_the_same_bytes(tmp_path, monkeypatch):
+    # Read by the spawned workers when they import storage and pdf_export
+    monkeypatch.setenv("ORBIT_STORAGE", f"shared:{tmp_path / 'store'}")
+    monkeypatch.setenv("ORBIT_PDF_CACHE", str(tmp_path / "pdf"))
+    ctx = multiprocessing.get_context("spawn")
+    barrier, results = ctx.Barrier(WORKERS), ctx.Queue()
+    processes = [ctx.Process(target=render_all, args=(i, barrier, results)) for i in range(WORKERS)]
+    for process in processes:
+        process.start()
+    outcomes = [results.get(timeout=300) for _ in processes]
+    for process in processes:
+        process.join()
+
+    digests = [outcome[0] for outcome in outcomes]
+    assert len(digests[0]) == len(REQUESTS)
+    assert digests == [digests[0]] * WORKERS
+    # Every document and each of the three compiled templates, built by one worker only
+    assert sum(outcome[1] for outcome in outcomes) == len(REQUESTS) + 3
+    assert not [name for _, _, names in os.walk(tmp_path) for name in names if name.endswith(".tmp")]
@@ -0,0 +1,85 @@
+import os
+
+from pdf_export import PdfCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def put(cache, clock, key, size):
+    cache.put(key, b"x" * size)
+    # The file system's clock, not ours, stamped the file
+    os.utime(cache._path(key), (clock.now, clock.now))
+
+
+def test_entries_expire_after_the_ttl(tmp_path):
+    clock = Clock()
+    cache = PdfCache(str(tmp_path), max_bytes=10_000, ttl=60, clock=clock)
+    put(cache, clock, "a", 10)
+    clock.now += 59
+    assert cache.get("a") == b"x" * 10
+    clock.now += 61
+    assert cache.get("a") is None
+    assert not os.path.exists(cache._path("a"))
+    assert cache.expirations == 1
+
+
+def test_a_hit_keeps_the_entry_alive(tmp_path):
+    clock = Clock()
+    cache = PdfCache(str(tmp_path), max_bytes=10_000, ttl=60, clock=clock)
+    put(cache, clock, "a", 10)
+    clock.now += 50
+    assert cache.get("a") is not None
+    clock.now += 50
+    assert cache.get("a") is not None
+
+
+def test_sweep_deletes_expired_files_and_dead_writers_temp_files(tmp_path):
+    clock = Clock()
+    cache = PdfCache(str(tmp_path), max_bytes=10_000, ttl=60, clock=clock)
+    put(cache, clock, "old", 10)
+    stale = os.path.join(os.path.dirname(cache._path("old")), "left-behind.tmp")
+    with open(stale, "wb") as fh:
+        fh.write(b"partial")
+    os.utime(stale, (clock.now, clock.now))
+    clock.now += 100
+    put(cache, clock, "new", 10)
+    cache.sweep()
+    assert not os.path.exists(cache._path("old"))
+    assert not os.path.exists(stale)
+    assert cache.get("new") is not None
+    assert cache.expirations == 2
+
+
+def test_sweep_keeps_the_directory_under_max_bytes(tmp_path):
+    clock = Clock()
+    cache = PdfCache(str(tmp_path), max_bytes=400, ttl=0, clock=clock)
+    for key in "abc":
+        put(cache, clock, key, 100)
+        clock.now += 1
+    assert cache.get("a") is not None  # now b is the least recently used
+    clock.now += 1
+    # Passing an eighth of max_bytes written triggers the sweep
+    put(cache, clock, "d", 150)
+    assert cache.get("b") is None
+    assert [cache.get(key) is not None for key in "acd"] == [True, True, True]
+    assert cache.evictions == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_render_builds_each_pdf_once(tmp_path, monkeypatch):
+    import pdf_export
+
+    calls = []
+    monkeypatch.setattr(pdf_export, "pdf_key", lambda kind, context: f"{kind}:{context['receipt_no']}")
+    monkeypatch.setattr(pdf_export, "render_pdf", lambda kind, context: calls.append(kind) or b"%PDF")
+    cache = PdfCache(str(tmp_path), max_bytes=10_000, ttl=60)
+    for _ in range(3):
+        assert cache.render("quotation", {"receipt_no": "0001"}) == b"%PDF"
+    assert calls == ["quotation"]
+    assert (cache.hits, cache.misses) == (2, 1)
@@ -0,0 +1,85 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from catalog import get_catalog
+from documents import max_subsidy, quotation_context
+from pricing import ROLES, SUBSIDY_CAPS, InvalidQuotes, PriceBook, Quotes, Scenario
+
+
+def random_quantities(catalog, rng):
+    return {key: rng.choice([0, 0, 1, 2, 5]) for key in catalog.keys}
+
+
+def test_price_book_totals_match_the_catalog():
+    catalog = get_catalog()
+    book = PriceBook(catalog)
+    rng = random.Random(1)
+    quotes = [random_quantities(catalog, rng) for _ in range(200)]
+    result = book.price(book.matrix(quotes), [book.no_role] * len(quotes))
+    assert result["total"].tolist() == [catalog.total(quantities) for quantities in quotes]
+    for quantities in quotes[:20]:
+        assert book.quote(quantities, "")["total"] == catalog.total(quantities)
+
+
+def test_incremental_total_matches_a_full_recount():
+    catalog = get_catalog()
+    book = PriceBook(catalog, Scenario("Dearer pumps", prices={catalog.keys[0]: 999999}))
+    rng = random.Random(2)
+    old = catalog.defaults()
+    total = book.quote(old, "")["total"]
+    for _ in range(50):
+        new = dict(old, **{rng.choice(catalog.keys): rng.randint(0, 6)})
+        total = book.update_total(total, old, new)
+        assert total == book.quote(new, "")["total"]
+        old = new
+
+
+def test_caps_follow_role_and_battery_count():
+    book = PriceBook()
+    for role in ROLES:
+        single, double = SUBSIDY_CAPS[role]
+        assert book.max_subsidy(role, 1) == max_subsidy(role, 1) == single
+        assert book.max_subsidy(role, 2) == max_subsidy(role, 2) == double
+    assert book.max_subsidy("", 1) == book.max_subsidy("Intern", 2) == 0
+
+
+def test_scenario_subsidies_are_clipped_to_the_cap():
+    catalog = get_catalog()
+    book = PriceBook(catalog, Scenario("Lower caps", caps={"Manager": (1000, 2000)}))
+    quantities = book.matrix([catalog.defaults(), dict(catalog.defaults(), quantity_battery=2)])
+    codes = book.role_codes(["Manager", "Manager"])
+    result = book.price(quantities, codes, np.array([5000, 5000]))
+    assert result["subsidy"].tolist() == [1000, 2000]
+    assert (result["final_price"] == result["total"] - result["subsidy"]).all()
+
+
+def test_quotation_context_prices_like_the_price_book():
+    catalog = get_catalog()
+    quantities = dict(catalog.defaults(), quantity_battery=2)
+    context = quotation_context("0001", "01/10/2026", "Test", "Address", "9876543210", "", quantities,
+                                subsidy=50000, form_filled_by="Manager")
+    total = catalog.total(quantities)
+    assert context["total_price"] == f"Rs {total:,.0f}"
+    assert context["final_price"] == f"Rs {total - 50000:,.0f}"
+    assert "form_filled_by" not in context
+
+
+def test_quote_sheets_are_validated_like_batch_rows():
+    frame = pd.DataFrame({"receipt_no": ["0001", "0002", "0003", "0004"],
+                          "quantity_battery": ["2", "-1", "1.5", ""],
+                          "subsidy": ["1,000", "", "lots", "0"]})
+    with pytest.raises(InvalidQuotes) as raised:
+        Quotes.from_frame(frame)
+    assert raised.value.errors == [
+        (3, "0002", "quantity_battery must be a whole number of 0 or more, got '-1'."),
+        (4, "0003", "quantity_battery must be a whole number of 0 or more, got '1.5'."),
+        (4, "0003", "subsidy must be a number, got 'lots'."),
+    ]
+
+    quotes = Quotes.from_frame(frame.iloc[[0, 3]])
+    battery = quotes.quantities[:, PriceBook().catalog.index["quantity_battery"]]
+    assert battery.tolist() == [2, get_catalog().defaults()["quantity_battery"]]
+    assert quotes.subsidies.tolist() == [1000, 0]
@@ -0,0 +1,61 @@
+from render_cache import RenderCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_evicts_least_recently_used_beyond_max_bytes():
+    cache = RenderCache(max_bytes=10, ttl=0)
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    assert cache.get("a") == b"aaaa"  # now b is the least recently used
+    cache.put("c", b"cccc")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"aaaa"
+    assert cache.get("c") == b"cccc"
+    assert cache.size == 8
+    assert cache.evictions == 1
+
+
+def test_replacing_an_entry_keeps_the_size_right():
+    cache = RenderCache(max_bytes=10, ttl=0)
+    cache.put("a", b"aaaa")
+    cache.put("a", b"aa")
+    assert cache.size == 2
+    assert len(cache) == 1
+
+
+def test_documents_larger_than_the_cache_are_not_kept():
+    cache = RenderCache(max_bytes=4, ttl=0)
+    cache.put("small", b"ab")
+    cache.put("big", b"abcde")
+    assert cache.get("big") is None
+    assert cache.get("small") == b"ab"
+
+
+def test_entries_expire_after_the_ttl():
+    clock = Clock()
+    cache = RenderCache(max_bytes=100, ttl=60, clock=clock)
+    cache.put("a", b"aaaa")
+    clock.now += 59
+    assert cache.get("a") == b"aaaa"
+    clock.now += 2
+    assert cache.get("a") is None
+    assert cache.size == 0
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"]) == (1, 1, 1)
+
+
+def test_a_hit_does_not_extend_the_ttl():
+    clock = Clock()
+    cache = RenderCache(max_bytes=100, ttl=60, clock=clock)
+    cache.put("a", b"aaaa")
+    clock.now += 50
+    cache.get("a")
+    clock.now += 11
+    assert cache.get("a") is None
@@ -0,0 +1,97 @@
+import threading
+import time
+from concurrent.futures import wait
+
+import pytest
+
+from render_service import RenderService, RenderServiceBusy, RenderTimeout
+
+
+@pytest.fixture
+def service():
+    service = RenderService(workers=1, queue_size=1, timeout=0)
+    yield service
+    service.shutdown(wait=False)
+
+
+def blocked(release):
+    release.wait(5)
+    return b"done"
+
+
+def test_submissions_beyond_the_queue_are_rejected(service):
+    release = threading.Event()
+    running = service.submit(blocked, release)
+    queued = service.submit(blocked, release)
+    with pytest.raises(RenderServiceBusy):
+        service.submit(blocked, release)
+    assert service.metrics()["rejected"] == 1
+
+    release.set()
+    assert running.result() == queued.result() == b"done"
+    # The slots are free again
+    assert service.submit(lambda: b"again").result(timeout=5) == b"again"
+    stats = service.metrics()
+    assert (stats["completed"], stats["queue_depth"], stats["running"]) == (3, 0, 0)
+
+
+def test_block_waits_for_a_free_slot(service):
+    release = threading.Event()
+    jobs = [service.submit(blocked, release) for _ in range(2)]
+    threading.Timer(0.05, release.set).start()
+    job = service.submit(lambda: b"late", block=5)
+    assert job.result(timeout=5) == b"late"
+    assert [j.result() for j in jobs] == [b"done", b"done"]
+
+
+def test_a_job_past_its_deadline_times_out_once(service):
+    release = threading.Event()
+    job = service.submit(blocked, release, timeout=0.05)
+    with pytest.raises(RenderTimeout):
+        job.result()
+    assert job.done() and job.expired()
+    with pytest.raises(RenderTimeout):
+        job.result()
+    release.set()
+    assert service.metrics()["timed_out"] == 1
+
+
+def test_a_job_that_expires_in_the_queue_never_runs(service):
+    release, ran = threading.Event(), []
+    running = service.submit(blocked, release)
+    queued = service.submit(ran.append, 1, timeout=0.05)
+    time.sleep(0.1)
+    with pytest.raises(RenderTimeout):
+        queued.result()
+    release.set()
+    running.result()
+    service.shutdown()
+    assert ran == []
+    stats = service.metrics()
+    assert (stats["queue_depth"], stats["running"], stats["timed_out"]) == (0, 0, 1)
+
+
+def test_on_success_runs_only_for_documents_that_were_rendered(service):
+    calls = []
+    done = service.submit(lambda: b"done")
+    done.result()
+    done.on_success(calls.append, "already done")
+
+    failed = service.submit(lambda: 1 / 0)
+    failed.on_success(calls.append, "failed")
+    with pytest.raises(ZeroDivisionError):
+        failed.result()
+
+    release = threading.Event()
+    late = service.submit(blocked, release, timeout=0.05)
+    late.on_success(calls.append, "timed out")
+    with pytest.raises(RenderTimeout):
+        late.result()
+    release.set()
+
+    # Nobody asks this job for its result
+    uncollected = service.submit(lambda: b"left behind")
+    uncollected.on_success(calls.append, "uncollected")
+    wait([uncollected.future], timeout=5)
+    service.shutdown()  # and the callbacks have run on the worker
+    assert calls == ["already done", "uncollected"]
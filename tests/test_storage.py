@@ -0,0 +1,90 @@
+import os
+import threading
+import time
+
+import pytest
+
+from storage import FileStorage, MemoryRedis, RedisStorage, Storage
+
+
+@pytest.fixture(params=["local", "shared", "memory"])
+def storage(request, tmp_path):
+    if request.param == "memory":
+        return RedisStorage(MemoryRedis())
+    return FileStorage(str(tmp_path / "store"), shared=request.param == "shared")
+
+
+def test_storage_is_abstract():
+    with pytest.raises(TypeError):
+        Storage()
+
+
+def test_get_or_create_builds_once_under_contention(storage):
+    builds = []
+
+    def create():
+        builds.append(1)
+        time.sleep(0.05)
+        return b"document"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(storage.get_or_create("key", create)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [b"document"] * 8
+    assert len(builds) == 1
+    assert (storage.hits, storage.misses) == (7, 1)
+
+
+def test_lock_times_out_while_another_holder_has_it(storage):
+    held, release = threading.Event(), threading.Event()
+
+    def holder():
+        with storage.lock("key") as acquired:
+            assert acquired
+            held.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=holder)
+    thread.start()
+    held.wait(5)
+    try:
+        with storage.lock("key", timeout=0.05) as acquired:
+            assert acquired is False
+    finally:
+        release.set()
+        thread.join()
+    with storage.lock("key", timeout=1) as acquired:
+        assert acquired
+
+
+def test_redis_lock_release_leaves_a_lock_taken_by_someone_else():
+    now = [0.0]
+    client = MemoryRedis(clock=lambda: now[0])
+    storage = RedisStorage(client)
+    with storage.lock("key", timeout=1) as acquired:
+        assert acquired
+        now[0] += 5  # our lock expired and another worker took it
+        assert client.set("orbit:lock:key", b"other", nx=True, ex=2)
+    assert client.get("orbit:lock:key") == b"other"
+
+
+def test_file_storage_deletes_expired_entries(tmp_path):
+    now = [1000.0]
+    storage = FileStorage(str(tmp_path / "store"), ttl=60, clock=lambda: now[0])
+    storage.put("old", b"1")
+    storage.put("read", b"2")
+    for key in ("old", "read"):
+        os.utime(storage._path(key), (now[0], now[0]))
+    now[0] += 61
+    # Deleted on read...
+    assert storage.get("read") is None
+    assert not os.path.exists(storage._path("read"))
+    # ...or by the sweep the next put runs
+    storage.put("new", b"3")
+    assert not os.path.exists(storage._path("old"))
+    assert storage.get("new") == b"3"
+    assert storage.expirations == 2
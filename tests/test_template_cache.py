@@ -0,0 +1,60 @@
+import io
+import os
+
+from docx import Document
+
+from rendering import render_docx
+from template_cache import TemplateCache
+
+
+def write_template(path, text):
+    document = Document()
+    document.add_paragraph(text)
+    document.save(str(path))
+    return str(path)
+
+
+def rendered_text(doc, context):
+    return [p.text for p in Document(io.BytesIO(render_docx(doc, context))).paragraphs]
+
+
+def test_repeated_gets_parse_once_and_hand_out_copies(tmp_path):
+    path = write_template(tmp_path / "t.docx", "Hello {{ name }}")
+    cache = TemplateCache()
+    assert rendered_text(cache.get(path), {"name": "Asha"}) == ["Hello Asha"]
+    # The first render did not change the cached document
+    assert rendered_text(cache.get(path), {"name": "Ravi"}) == ["Hello Ravi"]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_an_edited_template_is_reparsed(tmp_path):
+    path = write_template(tmp_path / "t.docx", "Hello {{ name }}")
+    cache = TemplateCache()
+    cache.get(path)
+    write_template(path, "Goodbye {{ name }}")
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10**9))
+    assert rendered_text(cache.get(path), {"name": "Asha"}) == ["Goodbye Asha"]
+    assert cache.misses == 2
+
+
+def test_a_touched_but_unchanged_template_is_not_reparsed(tmp_path):
+    path = write_template(tmp_path / "t.docx", "Hello {{ name }}")
+    cache = TemplateCache()
+    cache.get(path)
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10**9))
+    cache.get(path)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_template_is_dropped(tmp_path):
+    a, b, c = (write_template(tmp_path / f"{name}.docx", name) for name in "abc")
+    cache = TemplateCache(max_entries=2)
+    cache.get(a)
+    cache.get(b)
+    cache.get(a)  # now b is the least recently used
+    cache.get(c)
+    assert cache.misses == 3
+    cache.get(a)
+    assert cache.misses == 3
+    cache.get(b)
+    assert cache.misses == 4
@@ -0,0 +1,69 @@
+"""Background warm-up so the first generated document is as fast as later ones.
+
+The heavy render stack (docxtpl, jinja2, python-docx/lxml) is only needed once
+someone clicks Generate, so it is kept off the first page paint and loaded on
+a daemon thread right after startup instead, together with the parsed
+templates.
+"""
+import io
+import logging
+import os
+import threading
+import time
+
+from documents import TEMPLATES, template_path
+
+WARMUP_ENABLED = os.environ.get("ORBIT_WARMUP", "1") != "0"
+
+_logger = logging.getLogger(__name__)
+_thread = None
+_done = threading.Event()
+_lock = threading.Lock()
+timings = {}
+
+
+def warm_up():
+    """Import the render stack and parse, render and save every template once."""
+    start = time.perf_counter()
+    import docxtpl  # noqa: F401
+    import jinja2  # noqa: F401
+    import lxml.etree  # noqa: F401
+
+    from template_cache import get_template, template_cache
+
+    timings["imports"] = time.perf_counter() - start
+    for kind in TEMPLATES:
+        t = time.perf_counter()
+        # An empty render exercises the same code paths as a real one
+        doc = get_template(template_path(kind))
+        doc.render({})
+        doc.save(io.BytesIO())
+        template_cache.compiled(template_path(kind))
+        timings[kind] = time.perf_counter() - t
+    timings["total"] = time.perf_counter() - start
+
+
+def _run():
+    try:
+        warm_up()
+    except Exception:
+        # Warm-up is an optimisation only; the first real render will retry
+        _logger.exception("Template warm-up failed")
+    finally:
+        _done.set()
+
+
+def start_background_warmup():
+    """Start the warm-up thread once per process; later calls are no-ops."""
+    global _thread
+    with _lock:
+        if _thread is None and WARMUP_ENABLED:
+            _thread = threading.Thread(target=_run, name="orbit-warmup", daemon=True)
+            _thread.start()
+        elif not WARMUP_ENABLED:
+            _done.set()
+    return _thread
+
+
+def wait_for_warmup(timeout=None):
+    return _done.wait(timeout)